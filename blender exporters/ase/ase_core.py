@@ -0,0 +1,705 @@
+## ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+"""
+--  ASE encoding without any dependency on Blender: the header, scene,
+--  material and geometry blocks. Objects are extracted into plain snapshots
+--  (see mesh_snapshot.py) and materials into cMaterialData records on
+--  Blender's main thread; everything here only reads those, so whole
+--  files can be encoded and written by worker processes.
+
+--  Install this file next to io_export_ase.py.
+"""
+
+import io
+import copy
+
+from export_profile import ExportProfile, CountingFile
+
+# settings
+aseFloat = lambda x: '''{0:0.4f}'''.format( x )
+aseVector = lambda values: '\t'.join( ['%.4f'] * len( values ) ) % tuple( values )
+aseBufferSize = 1024 * 1024
+
+#== Header =================================================================
+class cHeader:
+    def __init__( self ):
+        self.comment = "Ascii Scene Exporter v2.52"
+
+    def __repr__( self ):
+        return '''*3DSMAX_ASCIIEXPORT\t200\n*COMMENT "{0}"\n'''.format( self.comment )
+
+#== Scene ==================================================================
+class cScene:
+    def __init__( self, filename ):
+        self.filename = filename
+        self.firstframe = 0
+        self.lastframe = 100
+        self.framespeed = 30
+        self.ticksperframe = 160
+        self.backgroundstatic = aseVector( [0.0, 0.0, 0.0] )
+        self.ambientstatic = aseVector( [0.0, 0.0, 0.0] )
+
+    def __repr__( self ):
+        return ("*SCENE {{\n\t*SCENE_FILENAME \"{0}\""+
+               "\n\t*SCENE_FIRSTFRAME {1}"+
+               "\n\t*SCENE_LASTFRAME {2}"+
+               "\n\t*SCENE_FRAMESPEED {3}"+
+               "\n\t*SCENE_TICKSPERFRAME {4}"+
+               "\n\t*SCENE_BACKGROUND_STATIC {5}"+
+               "\n\t*SCENE_AMBIENT_STATIC {6}"+
+               "\n}}\n").format( self.filename, self.firstframe, self.lastframe, self.framespeed, self.ticksperframe, self.backgroundstatic, self.ambientstatic )
+
+#== Materials ==============================================================
+# Material properties used by the material blocks, copied out of Blender
+class cMaterialData:
+    def __init__( self, name ):
+        self.name = name
+        self.diffuse_color = ( 0.8, 0.8, 0.8 )
+        self.specular_color = ( 1.0, 1.0, 1.0 )
+        self.specular_hardness = 50
+        self.specular_intensity = 0.5
+        self.translucency = 0.0
+        self.alpha = 1.0
+        self.specular_shader = 'COOKTORR'
+        self.emit = 0.0
+class cMultiMaterials:
+    def __init__( self, material_list ):
+        self.numMtls = len( material_list )
+        # Initialize material information
+        self.dump = ("*MATERIAL_LIST {{"+
+                    "\n\t*MATERIAL_COUNT {0}").format( str( self.numMtls ) )
+
+        for index, slot in enumerate( material_list ):
+            self.dump += ("\n\t*MATERIAL {0} {{"+
+                         "{1}\n\t}}").format( index, cMaterial( slot ) )
+
+        self.dump += '\n}'
+
+    def __repr__( self ):
+        return self.dump
+class cSubMaterials:
+    def __init__( self, material_list ):
+        slot = material_list[0]
+        # Initialize material information
+        self.dump = ("*MATERIAL_LIST {"+
+                    "\n\t*MATERIAL_COUNT 1"+
+                    "\n\t*MATERIAL 0 {")
+        self.matDump = ''
+        self.name = material_list[0].name
+        self.numSubMtls = len( material_list )
+        self.diffusemap = cDiffusemap( slot )
+        if ( self.numSubMtls > 1 ):
+            self.matClass = 'Multi/Sub-Object'
+            self.diffuseDump = ''
+        else:
+            self.matClass = 'Standard'
+            self.numSubMtls = 0
+            self.diffuseDump = self.diffdump()
+        self.ambient = aseVector( [0.0, 0.0, 0.0] )
+        self.diffuse = aseVector( slot.diffuse_color )
+        self.specular = aseVector( slot.specular_color )
+        self.shine = aseFloat( slot.specular_hardness / 511 )
+        self.shinestrength = aseFloat( slot.specular_intensity )
+        self.transparency = aseFloat( slot.translucency * slot.alpha )
+        self.wiresize = aseFloat( 1.0 )
+        self.shading = str( material_list[0].specular_shader ).capitalize()
+        self.xpfalloff = aseFloat( 0.0 )
+        self.xptype = 'Filter'
+        self.falloff = 'In'
+        self.soften = False
+        self.submtls = []
+        self.selfillum = aseFloat( material_list[0].emit )
+
+        if ( len( material_list ) > 1 ):
+            # Build SubMaterials
+            for index, slot in enumerate( material_list ):
+                self.matDump += ("\n\t\t*SUBMATERIAL {0} {{"+
+                                "{1}"+
+                                "\n\t\t}}").format( index, cMaterial( slot ) )
+
+        self.dump += ("\n\t\t*MATERIAL_NAME \"{0}\""+
+                     "\n\t\t*MATERIAL_CLASS \"{1}\""+
+                     "\n\t\t*MATERIAL_AMBIENT {2}"+
+                     "\n\t\t*MATERIAL_DIFFUSE {3}"+
+                     "\n\t\t*MATERIAL_SPECULAR {4}"+
+                     "\n\t\t*MATERIAL_SHINE {5}"+
+                     "\n\t\t*MATERIAL_SHINESTRENGTH {6}"+
+                     "\n\t\t*MATERIAL_TRANSPARENCY {7}"+
+                     "\n\t\t*MATERIAL_WIRESIZE {8}"+
+                     "\n\t\t*MATERIAL_SHADING {9}"+
+                     "\n\t\t*MATERIAL_XP_FALLOFF {10}"+
+                     "\n\t\t*MATERIAL_SELFILLUM {11}"+
+                     "\n\t\t*MATERIAL_FALLOFF {12}"+
+                     "\n\t\t*MATERIAL_XP_TYPE {13}"+
+                     "{14}"+
+                     "\n\t\t*NUMSUBMTLS {15}"+
+                     "{16}").format( self.name, self.matClass, self.ambient, self.diffuse, self.specular, self.shine, self.shinestrength, self.transparency, self.wiresize, self.shading, self.xpfalloff, self.selfillum, self.falloff, self.xptype, self.diffuseDump, self.numSubMtls, self.matDump )
+
+        self.dump += '\n\t}'
+        self.dump += '\n}'
+
+    def diffdump( self ):
+        for x in [self.diffusemap]:
+            return x
+
+    def __repr__( self ):
+        return self.dump
+class cMaterial:
+    def __init__( self, slot ):
+        self.dump = ''
+        self.name = slot.name
+        self.matClass = 'Standard'
+        self.ambient = aseVector( [0.0, 0.0, 0.0] )
+        self.diffuse = aseVector( slot.diffuse_color )
+        self.specular = aseVector( slot.specular_color )
+        self.shine = aseFloat( slot.specular_hardness / 511 )
+        self.shinestrength = aseFloat( slot.specular_intensity )
+        self.transparency = aseFloat( slot.translucency * slot.alpha )
+        self.wiresize = aseFloat( 1.0 )
+
+        # Material Definition
+        self.shading = str( slot.specular_shader ).capitalize()
+        self.xpfalloff = aseFloat( 0.0 )
+        self.xptype = 'Filter'
+        self.falloff = 'In'
+        self.soften = False
+        self.diffusemap = cDiffusemap( slot )
+        self.submtls = []
+        self.selfillum = aseFloat( slot.emit )
+        self.dump = ("\n\t\t*MATERIAL_NAME \"{0}\""+
+                    "\n\t\t*MATERIAL_CLASS \"{1}\""+
+                    "\n\t\t*MATERIAL_AMBIENT {2}"+
+                    "\n\t\t*MATERIAL_DIFFUSE {3}"+
+                    "\n\t\t*MATERIAL_SPECULAR {4}"+
+                    "\n\t\t*MATERIAL_SHINE {5}"+
+                    "\n\t\t*MATERIAL_SHINESTRENGTH {6}"+
+                    "\n\t\t*MATERIAL_TRANSPARENCY {7}"+
+                    "\n\t\t*MATERIAL_WIRESIZE {8}"+
+                    "\n\t\t*MATERIAL_SHADING {9}"+
+                    "\n\t\t*MATERIAL_XP_FALLOFF {10}"+
+                    "\n\t\t*MATERIAL_SELFILLUM {11}"+
+                    "\n\t\t*MATERIAL_FALLOFF {12}"+
+                    "\n\t\t*MATERIAL_XP_TYPE {13}"+
+                    "{14}").format( self.name, self.matClass, self.ambient, self.diffuse, self.specular, self.shine, self.shinestrength, self.transparency, self.wiresize, self.shading, self.xpfalloff, self.selfillum, self.falloff, self.xptype, self.diffdump() )
+
+    def diffdump( self ):
+        for x in [self.diffusemap]:
+            return x
+
+    def __repr__( self ):
+        return self.dump
+class cDiffusemap:
+    def __init__( self, slot ):
+        self.dump = ''
+        if slot is None:
+            self.name = 'default'
+            self.mapclass = 'Bitmap'
+            self.bitmap = 'None'
+        else:
+            self.name = slot.name
+            self.mapclass = 'Bitmap'
+            self.bitmap = '\\\\base\\' + self.name.replace( '/', '\\' )
+        self.subno = 1
+        self.amount = aseFloat( 1.0 )
+        self.type = 'Screen'
+        self.uoffset = aseFloat( 0.0 )
+        self.voffset = aseFloat( 0.0 )
+        self.utiling = aseFloat( 1.0 )
+        self.vtiling = aseFloat( 1.0 )
+        self.angle = aseFloat( 0.0 )
+        self.blur = aseFloat( 1.0 )
+        self.bluroffset = aseFloat( 0.0 )
+        self.noiseamt = aseFloat( 1.0 )
+        self.noisesize = aseFloat( 1.0 )
+        self.noiselevel = 1
+        self.noisephase = aseFloat( 0.0 )
+        self.bitmapfilter = 'Pyramidal'
+
+        self.dump = ("\n\t\t*MAP_DIFFUSE {{"+
+                    "\n\t\t\t*MAP_NAME \"{0}\""+
+                    "\n\t\t\t*MAP_CLASS \"{1}\""+
+                    "\n\t\t\t*MAP_SUBNO {2}"+
+                    "\n\t\t\t*MAP_AMOUNT {3}"+
+                    "\n\t\t\t*BITMAP \"{4}\""+
+                    "\n\t\t\t*MAP_TYPE {5}"+
+                    "\n\t\t\t*UVW_U_OFFSET {6}"+
+                    "\n\t\t\t*UVW_V_OFFSET {7}"+
+                    "\n\t\t\t*UVW_U_TILING {8}"+
+                    "\n\t\t\t*UVW_V_TILING {9}"+
+                    "\n\t\t\t*UVW_ANGLE {10}"+
+                    "\n\t\t\t*UVW_BLUR {11}"+
+                    "\n\t\t\t*UVW_BLUR_OFFSET {12}"+
+                    "\n\t\t\t*UVW_NOUSE_AMT {13}"+
+                    "\n\t\t\t*UVW_NOISE_SIZE {14}"+
+                    "\n\t\t\t*UVW_NOISE_LEVEL {15}"+
+                    "\n\t\t\t*UVW_NOISE_PHASE {16}"+
+                    "\n\t\t\t*BITMAP_FILTER {17}"+
+                    "\n\t\t}}").format( self.name, self.mapclass, self.subno, self.amount, self.bitmap, self.type, self.uoffset, self.voffset, self.utiling, self.vtiling, self.angle, self.blur, self.bluroffset, self.noiseamt, self.noisesize, self.noiselevel, self.noisephase, self.bitmapfilter )
+
+    def __repr__( self ):
+        return self.dump
+
+#== Geometry ===============================================================
+# Export options, handed to the encoders instead of module settings
+class cOptions:
+    def __init__( self, scale = 1.0, smoothing_groups = True, allow_multi_mats = False, profile = None ):
+        self.scale = scale
+        self.smoothing_groups = smoothing_groups
+        self.allow_multi_mats = allow_multi_mats
+        self.profile = profile if profile is not None else ExportProfile()
+
+# A prepared mesh standing in for its scene object while it is exported
+class cExportObject:
+    def __init__( self, name, snapshot ):
+        self.name = name
+        self.snapshot = snapshot
+        self.collision = collisionObject( name )
+        self.material_ids = []      # material list index of every material slot
+        self.material_id = 0        # material of the whole object without multi materials
+class cGeomObject:
+    def __init__( self, object, options ):
+        print( object.name + ": Constructing Geometry" )
+
+        self.name = object.name
+        self.prop_motionblur = 0
+        self.prop_castshadow = 1
+        self.prop_recvshadow = 1
+
+        if options.allow_multi_mats:
+            self.material_ref = 0
+        else:
+            self.material_ref = object.material_id
+
+        self.nodetm = cNodeTM( object )
+        self.mesh = cMesh( object, options )
+
+        options.profile.count( 'objects' )
+        options.profile.count( 'vertices', object.snapshot.vertex_count )
+        options.profile.count( 'faces', object.snapshot.polygon_count )
+
+    def write( self, file ):
+        file.write( '''\n*GEOMOBJECT {{\n\t*NODE_NAME "{0}"\n{1}\n'''.format( self.name, self.nodetm ) )
+        self.mesh.write( file )
+        file.write( '''\n\t*PROP_MOTIONBLUR {0}\n\t*PROP_CASTSHADOW {1}\n\t*PROP_RECVSHADOW {2}\n\t*MATERIAL_REF {3}\n}}'''.format( self.prop_motionblur, self.prop_castshadow, self.prop_recvshadow, self.material_ref ) )
+
+    def __repr__( self ):
+        return aseString( self )
+class cNodeTM:
+    def __init__( self, object ):
+        self.name = object.name
+        self.inherit_pos = '0 0 0'
+        self.inherit_rot = '0 0 0'
+        self.inherit_scl = '0 0 0'
+        self.tm_row0 = aseVector( [1.0, 0.0, 0.0] )
+        self.tm_row1 = aseVector( [0.0, 1.0, 0.0] )
+        self.tm_row2 = aseVector( [0.0, 0.0, 1.0] )
+        self.tm_row3 = aseVector( [0.0, 0.0, 0.0] )
+        self.tm_pos = aseVector( [0.0, 0.0, 0.0] )
+        self.tm_rotaxis = aseVector( [0.0, 0.0, 0.0] )
+        self.tm_rotangle = aseFloat( 0.0 )
+        self.tm_scale = aseVector( [1.0, 1.0, 1.0] )
+        self.tm_scaleaxis = aseVector( [0.0, 0.0, 0.0] )
+        self.tm_scaleaxisang = aseFloat( 0.0 )
+
+        self.dump = ("\t*NODE_TM {{"+
+                    "\n\t\t*NODE_NAME \"{0}\""+
+                    "\n\t\t*INHERIT_POS {1}"+
+                    "\n\t\t*INHERIT_ROT {2}"+
+                    "\n\t\t*INHERIT_SCL {3}"+
+                    "\n\t\t*TM_ROW0 {4}"+
+                    "\n\t\t*TM_ROW1 {5}"+
+                    "\n\t\t*TM_ROW2 {6}"+
+                    "\n\t\t*TM_ROW3 {7}"+
+                    "\n\t\t*TM_POS {8}"+
+                    "\n\t\t*TM_ROTAXIS {9}"+
+                    "\n\t\t*TM_ROTANGLE {10}"+
+                    "\n\t\t*TM_SCALE {11}"+
+                    "\n\t\t*TM_SCALEAXIS {12}"+
+                    "\n\t\t*TM_SCALEAXISANG {13}"+
+                    "\n\t}}").format( self.name, self.inherit_pos, self.inherit_rot, self.inherit_scl, self.tm_row0, self.tm_row1, self.tm_row2, self.tm_row3, self.tm_pos, self.tm_rotaxis, self.tm_rotangle, self.tm_scale, self.tm_scaleaxis, self.tm_scaleaxisang )
+
+    def __repr__( self ):
+        return self.dump
+class cMesh:
+    def __init__( self, object, options ):
+        # Bulk read of the mesh data shared by all the lists below
+        snapshot = object.snapshot
+        self.profile = options.profile
+
+        with self.profile.stage( 'uvs' ):
+            self.uvdata = cUVdata( object, snapshot )
+
+        self.timevalue = '0'
+        self.numvertex = snapshot.vertex_count
+        self.numfaces = snapshot.polygon_count
+        with self.profile.stage( 'vertices' ):
+            self.vertlist = cVertlist( snapshot, options )
+        self.facelist = cFacelist( object, snapshot, options )
+
+
+        # Vertex Paint
+        if len( snapshot.vertex_colors ) > 0:
+            with self.profile.stage( 'vertex colors' ):
+                self.cvertlist = cCVertlist( snapshot )
+            self.numcvertex = self.cvertlist.length
+            self.numcvfaces = snapshot.polygon_count
+            self.cfacelist = cCFacelist( self.numcvfaces )
+        else:
+            self.numcvertex = 0
+            self.cvertlist = None
+            self.numcvfaces = 0
+            self.cfacelist = None
+
+        with self.profile.stage( 'normals' ):
+            self.normals = cNormallist( snapshot )
+
+    def write( self, file ):
+        file.write( '''\t*MESH {{\n\t\t*TIMEVALUE {0}\n\t\t*MESH_NUMVERTEX {1}\n\t\t*MESH_NUMFACES {2}\n\t\t*MESH_VERTEX_LIST '''.format( self.timevalue, self.numvertex, self.numfaces ) )
+        with self.profile.block( 'MESH_VERTEX_LIST', file ):
+            self.vertlist.write( file )
+        file.write( '''\n\t\t*MESH_FACE_LIST ''' )
+        with self.profile.block( 'MESH_FACE_LIST', file ):
+            self.facelist.write( file )
+        with self.profile.block( 'MESH_TVERTLIST', file ):
+            self.uvdata.write( file )
+        file.write( '''\n\t\t*MESH_NUMCVERTEX {0}'''.format( self.numcvertex ) )
+        if self.cvertlist is not None:
+            file.write( '\n' )
+            with self.profile.block( 'MESH_CVERTLIST', file ):
+                self.cvertlist.write( file )
+                file.write( '''\n\t\t*MESH_NUMCVFACES {0}\n'''.format( self.numcvfaces ) )
+                self.cfacelist.write( file )
+        file.write( '\n' )
+        with self.profile.block( 'MESH_NORMALS', file ):
+            self.normals.write( file )
+        file.write( '\n\t}' )
+
+    def __repr__( self ):
+        return aseString( self )
+class cVertlist:
+    def __init__( self, snapshot, options ):
+        self.dump = aseRows( '\t\t\t*MESH_VERTEX %4d\t%.4f\t%.4f\t%.4f\n',
+                             [round( x, 4 ) * options.scale for x in snapshot.co], 3 )
+
+    def write( self, file ):
+        file.write( '{\n' )
+        file.write( self.dump )
+        file.write( '\t\t}' )
+
+    def __repr__( self ):
+        return aseString( self )
+class cFacelist:
+    def __init__( self, object, snapshot, options ):
+        self.facelist = []
+        sgID = 0
+
+        # Define smoothing groups (if enabled)
+        if ( object.collision == 0 ):
+            if ( options.smoothing_groups ):
+                with options.profile.stage( 'smoothing groups' ):
+                    self.smoothing_groups = defineSmoothing( object.name, snapshot )
+            else:
+                self.smoothing_groups = ''
+
+        with options.profile.stage( 'faces' ):
+            for index in range( snapshot.polygon_count ):
+                if options.allow_multi_mats:
+                    if ( object.collision < 2 ):
+                        self.matid = object.material_ids[snapshot.polygon_material_index[index]]
+                    else:
+                        self.matid = 0
+                else:
+                    self.matid = object.material_id
+                if ( object.collision == 0 ):
+                    if ( options.smoothing_groups ):
+                        sgID = self.smoothing_groups[index]
+
+                vertices = snapshot.polygonVertices( index )
+                temp = '''\t\t\t*MESH_FACE {0:4d}:    A: {1:4d} B: {2:4d} C: {3:4d} AB:    0 BC:    0 CA:    0\t *MESH_SMOOTHING {4}\t *MESH_MTLID {5}\n'''.format( index, vertices[0], vertices[1], vertices[2], sgID, self.matid )
+                self.facelist.append( temp )
+
+    def write( self, file ):
+        file.write( '{\n' )
+        file.write( ''.join( self.facelist ) )
+        file.write( '\t\t}' )
+
+    def __repr__( self ):
+        return aseString( self )
+class cUVdata:
+    def __init__( self, object, snapshot ):
+        self.channels = []
+        
+        if ( len( snapshot.uv_layers ) == 0 ) or ( object.collision > 0 ):
+            return
+
+        numtvfaces = snapshot.polygon_count
+        for channel, ( name, uvs ) in enumerate( snapshot.uv_layers ): #iterate over mapping channels
+            # extra mapping channels are nested one level deeper
+            indent = "\n\t" if channel > 0 else "\n"
+            uvtext = aseColumns( uvs, 2 )
+            tvindex = {} #unique uvs as printed -> tvert index
+            tvdata = []
+            tfdata = []
+            for index in range( snapshot.polygon_count ):
+                tface = []
+                start = snapshot.polygon_loop_start[index]
+                for loop in range( start, start + 3 ):
+                    uvvert = uvtext[loop]
+                    tvert = tvindex.get( uvvert )
+                    if tvert is None:
+                        tvert = tvindex[uvvert] = len( tvindex ) #only append vertices with unique uvs
+                        tvdata.append( ( indent + "\t\t\t*MESH_TVERT {0}\t{1}\t{2}"
+                                       ).format( tvert, uvvert, aseFloat( 0.0 ) ) )
+                    tface.append( tvert )
+                tfdata.append( ( indent + "\t\t\t*MESH_TFACE {0}\t{1}\t{2}\t{3}"
+                               ).format( index, tface[0], tface[1], tface[2] ) )
+
+            head = ( indent + "\t\t*MESH_NUMTVERTEX " + str( len( tvindex ) ) +
+                     indent + "\t\t*MESH_TVERTLIST {" )
+            middle = ( indent + "\t\t}" +
+                       indent + "\t\t*MESH_NUMTVFACES " + str( numtvfaces ) +
+                       indent + "\t\t*MESH_TFACELIST {" )
+            tail = indent + "\t\t}"
+            if channel > 0:
+                head = "\n\t\t*MESH_MAPPINGCHANNEL " + str( channel + 1 ) + " {" + head
+                tail = tail + "\n\t\t}"
+            self.channels.append( ( head, tvdata, middle, tfdata, tail ) )
+
+    def write( self, file ):
+        if len( self.channels ) == 0:
+            file.write( "\n\t\t*MESH_NUMTVERTEX 0" )
+            return
+
+        for head, tvdata, middle, tfdata, tail in self.channels:
+            file.write( head )
+            file.writelines( tvdata )
+            file.write( middle )
+            file.writelines( tfdata )
+            file.write( tail )
+
+    def __repr__( self ):
+        return aseString( self )
+class cCVertlist:
+    def __init__( self, snapshot ):
+        name, colors = snapshot.vertex_colors[0]
+        values = []
+        for face in range( snapshot.polygon_count ):
+            start = snapshot.polygon_loop_start[face]
+            values.extend( colors[start * 3:start * 3 + 9] )
+
+        self.length = len( values ) // 3
+        self.dump = aseRows( '\t\t\t*MESH_VERTCOL %d %.4f %.4f %.4f\n', values, 3 )
+
+    def write( self, file ):
+        file.write( '\t\t*MESH_CVERTLIST {\n' )
+        file.write( self.dump )
+        file.write( '\t\t}' )
+
+    def __repr__( self ):
+        return aseString( self )
+class cCFacelist:
+    def __init__( self, facecount ):
+        self.dump = aseRows( '\t\t\t*MESH_CFACE %d %d %d %d\n', range( facecount * 3 ), 3 )
+
+    def write( self, file ):
+        file.write( '\t\t*MESH_CFACELIST {\n' )
+        file.write( self.dump )
+        file.write( '\t\t}' )
+
+    def __repr__( self ):
+        return aseString( self )
+class cNormallist:
+    faceTemplate = '\t\t\t*MESH_FACENORMAL %d\t%.4f\t%.4f\t%.4f\n'
+    vertTemplate = '\t\t\t\t*MESH_VERTEXNORMAL %d\t%.4f\t%.4f\t%.4f\n'
+
+    def __init__( self, snapshot ):
+        # Split normals were computed once for the whole mesh by the snapshot
+        facenormals = [round( x, 4 ) for x in snapshot.polygon_normal]
+        loopvertices = snapshot.loop_vertex_index
+        loopnormals = snapshot.loop_normal
+
+        templates = []
+        values = []
+        for index in range( snapshot.polygon_count ):
+            start = snapshot.polygon_loop_start[index]
+            total = snapshot.polygon_loop_total[index]
+            templates.append( self.faceTemplate + self.vertTemplate * total )
+            values.append( index )
+            values.extend( facenormals[index * 3:index * 3 + 3] )
+            for i in range( start, start + total ):
+                values.append( loopvertices[i] )
+                values.extend( loopnormals[i * 3:i * 3 + 3] )
+
+        self.dump = ''.join( templates ) % tuple( values )
+
+    def write( self, file ):
+        file.write( '\t\t*MESH_NORMALS {\n' )
+        file.write( self.dump )
+        file.write( '\t\t}' )
+
+    def __repr__( self ):
+        return aseString( self )
+
+#== Smoothing Groups and Helper Methods =================================
+def defineSmoothing( name, snapshot ):
+    print( name + ": Constructing Smoothing Groups" )
+
+    # Sharp edges act as barriers between smoothing groups
+    sharp = snapshot.edge_sharp
+
+    # Union faces sharing a smooth edge, one pass over the loops
+    parent = list( range( snapshot.polygon_count ) )
+    edge_faces = {}
+
+    def findRoot( index ):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for face in range( snapshot.polygon_count ):
+        start = snapshot.polygon_loop_start[face]
+        for edge in snapshot.loop_edge_index[start:start + snapshot.polygon_loop_total[face]]:
+            if sharp[edge]:
+                continue
+            other = edge_faces.setdefault( edge, face )
+            if other != face:
+                root_a = findRoot( face )
+                root_b = findRoot( other )
+                if root_a != root_b:
+                    parent[max( root_a, root_b )] = min( root_a, root_b )
+
+    # Number islands in order of their lowest face index
+    face_groups = []
+    group_index = {}
+    for face_index in range( len( parent ) ):
+        root = findRoot( face_index )
+        if root not in group_index:
+            group_index[root] = len( group_index )
+        face_groups.append( group_index[root] )
+
+    print( '\t' + str( len( group_index ) ) + ' smoothing groups found.' )
+    return compressSmoothing( snapshot, face_groups, len( group_index ) )
+
+# Pack smoothing groups into the 32 ASE ids so that islands sharing a
+# vertex never get the same id. Returns the id of every face.
+def compressSmoothing( snapshot, face_groups, group_count ):
+    # Islands touching at a vertex are neighbours
+    vertex_groups = {}
+    for face in range( snapshot.polygon_count ):
+        group = face_groups[face]
+        for vertex in snapshot.polygonVertices( face ):
+            vertex_groups.setdefault( vertex, set() ).add( group )
+
+    neighbours = [set() for x in range( group_count )]
+    for groups in vertex_groups.values():
+        if len( groups ) > 1:
+            for group in groups:
+                neighbours[group].update( groups )
+    for group in range( group_count ):
+        neighbours[group].discard( group )
+
+    # Greedy colouring, most connected islands first
+    colors = [-1] * group_count
+    order = sorted( range( group_count ), key = lambda x: len( neighbours[x] ), reverse = True )
+    overflow = 0
+    for group in order:
+        used = set( colors[x] for x in neighbours[group] )
+        color = 0
+        while color in used:
+            color += 1
+        if color >= 32:
+            color = group % 32
+            overflow += 1
+        colors[group] = color
+
+    if overflow:
+        print( '\tWarning: ' + str( overflow ) + ' smoothing groups could not be kept apart from their neighbours.' )
+    print( '\t' + str( len( set( colors ) ) ) + ' smoothing group ids used.' )
+    return [colors[group] for group in face_groups]
+
+#===========================================================================
+# // General Helpers
+#===========================================================================
+
+# Check if the mesh is a collider and what kind
+# 2 - skip materials, smoothing and uvs
+# 1 - skip smoothing and uvs
+# 0 - not a collision object
+def collisionObject( name ):
+    collisionPrefixes = ['UCX_', 'UBX_', 'USX_']
+    for prefix in collisionPrefixes:
+        if prefix in name:
+            return 2
+    collisionPrefixesAlt = ['collision_', 'shadow_']
+    for prefix in collisionPrefixesAlt:
+        if prefix in name:
+            return 1
+    return 0
+
+# Name of the render mesh a UCX_, UBX_ or USX_ collision object belongs to,
+# by the UDK naming rule UCX_RenderMesh_01, or None if there is none
+def collisionOwner( name, render_names ):
+    for prefix in ['UCX_', 'UBX_', 'USX_']:
+        if prefix in name:
+            rest = name[name.index( prefix ) + len( prefix ):]
+            owners = [render for render in render_names
+                      if rest == render or rest.startswith( render + '_' ) or rest.startswith( render + '.' )]
+            return max( owners, key = len ) if owners else None
+    return None
+
+# Format a flat array as a text block with a single % operation. Every row
+# is filled with its index followed by the next `width` values.
+def aseRows( template, values, width ):
+    count = len( values ) // width
+    args = [None] * ( count * ( width + 1 ) )
+    args[0::width + 1] = range( count )
+    for column in range( width ):
+        args[column + 1::width + 1] = values[column:count * width:width]
+    return ( template * count ) % tuple( args )
+
+# Format a flat array as a list of tab separated rows of `width` values
+def aseColumns( values, width ):
+    count = len( values ) // width
+    row = '\t'.join( ['%.4f'] * width ) + '\n'
+    return ( ( row * count ) % tuple( values ) ).split( '\n' )[:count]
+
+# Render a streamable node to a string, for debugging and small blocks
+def aseString( node ):
+    buffer = io.StringIO()
+    node.write( buffer )
+    return buffer.getvalue()
+
+# Write a whole ASE file: the header, scene and material blocks rendered by
+# the exporter followed by the geometry of every object. Returns the profile
+# of this file alone, for the exporter to merge, also from worker processes.
+def writeAse( filename, preamble, objects, options ):
+    options = copy.copy( options )
+    options.profile = ExportProfile()
+    file = CountingFile( open( filename, 'w', buffering = aseBufferSize ) )
+    try:
+        file.write( preamble )
+        for object in objects:
+            geometry = cGeomObject( object, options )
+            with options.profile.stage( 'writing' ):
+                geometry.write( file )
+    finally:
+        file.close()
+    options.profile.addBytes( 'file', file.size )
+    return options.profile
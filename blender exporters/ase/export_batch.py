@@ -0,0 +1,68 @@
+## ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+"""
+--  One file per object exports shared by the ASE and LWO exporters: the
+--  file name every object is written to and the worker processes that
+--  encode and write the files.
+
+--  Install this file next to io_export_ase.py and io_export_lwo.py.
+"""
+
+import os
+from collections import OrderedDict
+
+try:
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
+
+#== File Names =============================================================
+# Name of the file of an object without extension, dots would be taken for
+# one by the games
+def batchName( name ):
+    return name.replace( '.', '_' )
+
+# Groups of object names that would be written to the same file, such as
+# Crate.001 and Crate_001
+def batchConflicts( names ):
+    files = OrderedDict()
+    for name in names:
+        files.setdefault( os.path.normcase( batchName( name ) ), [] ).append( name )
+    return [group for group in files.values() if len( group ) > 1]
+
+#== Worker Pool ============================================================
+# Pool of worker processes running python, Blender's own Python binary, or
+# None to write every file in turn. Workers are started fresh with spawn,
+# so they do not inherit a copy of Blender; they only need the bpy-free
+# cores. Python before 3.7, which Blender 2.79 ships, cannot choose the
+# start method of a pool, and there workers are forked on Linux and macOS.
+# That is safe as well, because they never touch bpy.
+def openPool( python ):
+    if ProcessPoolExecutor is None or not python:
+        return None
+    try:
+        context = multiprocessing.get_context( 'spawn' )
+        context.set_executable( python )
+        try:
+            return ProcessPoolExecutor( mp_context = context )
+        except TypeError:
+            return ProcessPoolExecutor()
+    except ( OSError, NotImplementedError, ValueError ):
+        return None
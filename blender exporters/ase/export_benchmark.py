@@ -0,0 +1,226 @@
+## ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+"""
+--  Benchmarks for the ASE and LWO encoders on synthetic meshes. Runs with
+--  plain Python, no Blender needed:
+--      python export_benchmark.py --sizes 64 256 --repeat 3 --out bench.json
+
+--  Every ASE stage and LWO chunk generator is timed (best of --repeat runs)
+--  and its peak memory measured with tracemalloc in a separate run. The
+--  results are written as JSON, one record per case, size and stage.
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from array import array
+
+from mesh_snapshot import snapshotPolygons
+import ase_core
+import lwo_core
+
+#== Synthetic Meshes =======================================================
+# Triangulated grid of size x size quads with a gentle wave, the way the
+# exporters get it after triangulation. Every island_size quads along both
+# axes the grid lines are marked sharp, which makes many smoothing islands.
+def gridSnapshot( size, materials = 1, uv_layers = 1, vertex_colors = 0, island_size = 0 ):
+    side = size + 1
+    co = array( 'f' )
+    for j in range( side ):
+        for i in range( side ):
+            co.extend( ( i / size, j / size, 0.05 * math.sin( i * 0.7 ) * math.cos( j * 0.3 ) ) )
+
+    faces = []
+    for j in range( size ):
+        for i in range( size ):
+            a = j * side + i
+            faces.append( ( a, a + 1, a + side + 1 ) )
+            faces.append( ( a, a + side + 1, a + side ) )
+
+    def isSharp( a, b ):
+        if not island_size:
+            return False
+        ia, ja = a % side, a // side
+        ib, jb = b % side, b // side
+        return ( ia == ib and ia % island_size == 0 ) or ( ja == jb and ja % island_size == 0 )
+
+    return buildSnapshot( co, faces, materials, uv_layers, vertex_colors, isSharp )
+
+def buildSnapshot( co, faces, materials, uv_layers, vertex_colors, isSharp ):
+    snapshot = snapshotPolygons( co, faces )
+    for index in range( snapshot.polygon_count ):
+        snapshot.polygon_material_index[index] = index % materials
+    for edge in range( snapshot.edge_count ):
+        snapshot.edge_crease[edge] = 0.5 if ( edge + 1 ) % 7 == 0 else 0.0
+        snapshot.edge_sharp[edge] = 1 if isSharp( *snapshot.edge_vertices[edge * 2:edge * 2 + 2] ) else 0
+
+    for layer in range( uv_layers ):
+        uvs = array( 'f' )
+        for vertex in snapshot.loop_vertex_index:
+            uvs.extend( ( co[vertex * 3] + layer * 0.25, co[vertex * 3 + 1] ) )
+        snapshot.uv_layers.append( ( 'UVMap' + ( '.%03d' % layer if layer else '' ), uvs ) )
+    for layer in range( vertex_colors ):
+        colors = array( 'f' )
+        for vertex in snapshot.loop_vertex_index:
+            colors.extend( ( co[vertex * 3], co[vertex * 3 + 1], 0.5 ) )
+        snapshot.vertex_colors.append( ( 'Col' + ( '.%03d' % layer if layer else '' ), colors ) )
+    return snapshot
+
+# case -> keyword arguments of gridSnapshot
+cases = {
+    'grid': {},
+    'islands': { 'island_size': 4 },
+    'multi_uv': { 'uv_layers': 4 },
+    'multi_material': { 'materials': 8 },
+    'vertex_colors': { 'vertex_colors': 1 },
+}
+
+#== Stages =================================================================
+def aseStages( snapshot, materials ):
+    options = ase_core.cOptions( scale = 16.0, smoothing_groups = True, allow_multi_mats = materials > 1 )
+    plain = ase_core.cOptions( scale = 16.0, smoothing_groups = False, allow_multi_mats = materials > 1 )
+    record = ase_core.cExportObject( 'Bench', snapshot )
+    record.material_ids = list( range( materials ) )
+    material_list = [ase_core.cMaterialData( 'textures/bench/m%d' % index ) for index in range( materials )]
+
+    stages = [
+        ( 'materials', lambda: str( ase_core.cMultiMaterials( material_list ) ) ),
+        ( 'vertlist', lambda: ase_core.cVertlist( snapshot, options ) ),
+        ( 'facelist', lambda: ase_core.cFacelist( record, snapshot, plain ) ),
+        ( 'smoothing', lambda: ase_core.defineSmoothing( record.name, snapshot ) ),
+        ( 'uvs', lambda: ase_core.cUVdata( record, snapshot ) ),
+        ( 'normals', lambda: ase_core.cNormallist( snapshot ) ),
+    ]
+    if snapshot.vertex_colors:
+        stages.append( ( 'vertex_colors', lambda: ase_core.cCVertlist( snapshot ) ) )
+    stages.append( ( 'write', lambda: ase_core.cGeomObject( record, options ).write( io.StringIO() ) ) )
+    return stages
+
+def lwoStages( snapshot, materials, filename ):
+    options = lwo_core.LwoOptions( idtech = False, scale = 1.0 )
+    layer = lwo_core.LwoLayer( 'Bench', 0, ( 0.0, 0.0, 0.0 ), snapshot )
+    layer.surfaces = list( range( materials ) )
+    half = list( range( 0, snapshot.vertex_count, 2 ) )
+    layer.weight_maps = [( 'Group', half, [0.5] * len( half ) )]
+    moved = array( 'f', snapshot.co )
+    for vertex in half:
+        moved[vertex * 3 + 2] += 0.1
+    layer.morphs = [( 'Key 1', moved )]
+    names = ['textures/bench/m%d' % index for index in range( materials )]
+    surfaces = [lwo_core.LwoSurface( name ) for name in names]
+    tags = lwo_core.generate_tags( names )
+
+    stages = [
+        ( 'LAYR', lambda: lwo_core.generate_layr( layer.name, layer.index, layer.pivot ) ),
+        ( 'PNTS', lambda: lwo_core.generate_pnts( snapshot, options.scale ) ),
+        ( 'BBOX', lambda: lwo_core.generate_bbox( snapshot, options.scale ) ),
+        ( 'VMAP NORM', lambda: lwo_core.generate_vnorms( snapshot, None, options.scale ) ),
+        ( 'VMAD NORM', lambda: lwo_core.generate_lnorms( snapshot, options.scale ) ),
+        ( 'POLS', lambda: lwo_core.generate_pols( snapshot, options.subd ) ),
+        ( 'PTAG', lambda: lwo_core.generate_ptag( snapshot, layer.surfaces ) ),
+        ( 'VMAD TXUV', lambda: list( lwo_core.generate_vmad_uv( snapshot ) ) ),
+        ( 'VMAD EW', lambda: lwo_core.generate_vmad_ew( snapshot ) ),
+        ( 'VMAP WGHT', lambda: list( lwo_core.generate_vmap_weight( layer.weight_maps ) ) ),
+        ( 'VMAP MORF', lambda: list( lwo_core.generate_vmap_morph( snapshot, layer.morphs ) ) ),
+        ( 'SURF', lambda: [lwo_core.generate_surface( surface, [], options ) for surface in surfaces] ),
+    ]
+    if snapshot.vertex_colors:
+        stages.append( ( 'VMAD RGBA', lambda: list( lwo_core.generate_rgba_vc( snapshot ) ) ) )
+        stages.append( ( 'VMAD RGB', lambda: list( lwo_core.generate_rgb_vc( snapshot ) ) ) )
+    stages.append( ( 'write', lambda: lwo_core.write_lwo( filename, tags, [layer], surfaces, options ) ) )
+    return stages
+
+#== Measuring ==============================================================
+# Best time of repeat runs, then the peak memory of one more run. Tracing
+# slows Python down, so memory is never measured in a timed run.
+def measure( function, repeat ):
+    best = None
+    for run in range( repeat ):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def runBenchmarks( case_names, sizes, repeat, report ):
+    results = []
+    filename = os.path.join( tempfile.gettempdir(), 'export_benchmark_%d.lwo' % os.getpid() )
+    try:
+        for name in case_names:
+            for size in sizes:
+                arguments = cases[name]
+                snapshot = gridSnapshot( size, **arguments )
+                materials = arguments.get( 'materials', 1 )
+                for format, stages in ( ( 'ase', aseStages( snapshot, materials ) ),
+                                        ( 'lwo', lwoStages( snapshot, materials, filename ) ) ):
+                    for stage, function in stages:
+                        # The encoders report progress, keep it out of the results
+                        with contextlib.redirect_stdout( io.StringIO() ):
+                            seconds, peak = measure( function, repeat )
+                        results.append( { 'case': name, 'size': size, 'format': format, 'stage': stage,
+                                          'vertices': snapshot.vertex_count, 'faces': snapshot.polygon_count,
+                                          'seconds': seconds, 'peak_bytes': peak } )
+                        report( results[-1] )
+    finally:
+        if os.path.exists( filename ):
+            os.remove( filename )
+    return results
+
+def main( argv = None ):
+    parser = argparse.ArgumentParser( description = 'Benchmark the ASE and LWO encoders on synthetic meshes.' )
+    parser.add_argument( '--cases', nargs = '+', choices = sorted( cases ), default = sorted( cases ) )
+    parser.add_argument( '--sizes', nargs = '+', type = int, default = [64, 256],
+                         help = 'grid subdivisions, a size makes 2 * size * size triangles' )
+    parser.add_argument( '--repeat', type = int, default = 3, help = 'timed runs per stage, the best one counts' )
+    parser.add_argument( '--out', help = 'JSON file for the results (default: standard output)' )
+    arguments = parser.parse_args( argv )
+
+    def report( result ):
+        sys.stderr.write( '%-15s %6d %s %-10s %9.4f s %12d bytes\n' % ( result['case'], result['size'], result['format'],
+                          result['stage'], result['seconds'], result['peak_bytes'] ) )
+
+    results = runBenchmarks( arguments.cases, arguments.sizes, max( arguments.repeat, 1 ), report )
+    document = { 'python': platform.python_version(), 'platform': platform.platform(),
+                 'repeat': arguments.repeat, 'results': results }
+    if arguments.out:
+        with open( arguments.out, 'w' ) as file:
+            json.dump( document, file, indent = 1 )
+    else:
+        json.dump( document, sys.stdout, indent = 1 )
+        sys.stdout.write( '\n' )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,246 @@
+## ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+"""
+--  Export cache shared by the ASE and LWO exporters. Every object is
+--  reduced to a content hash of its mesh data, modifier stack, materials
+--  and the export options. A JSON sidecar next to the output keeps the
+--  hashes of the last export, so unchanged objects can be skipped or
+--  their encoded geometry reused. Encoded geometry is kept in one file per
+--  object in a folder next to the sidecar, so the sidecar stays small and
+--  the geometry is streamed, never held in memory as a whole.
+
+--  Install this file next to io_export_ase.py and io_export_lwo.py.
+"""
+
+import os
+import json
+import hashlib
+from array import array
+
+from mesh_snapshot import fetch
+
+cacheVersion = 2
+
+# Bookkeeping that changes without changing the exported result
+volatileProperties = set( ['rna_type', 'users', 'tag', 'is_updated', 'is_updated_data',
+                           'use_fake_user', 'is_library_indirect'] )
+
+#== Cache ==================================================================
+class ExportCache:
+    # With prune set only the entries used by this export are saved, for
+    # caches that describe a single output file
+    def __init__( self, path, prune = False ):
+        self.path = path
+        self.folder = os.path.splitext( path )[0] # text files of the entries
+        self.prune = prune
+        self.entries = {}
+        self.used = set()
+
+        try:
+            with open( path, 'r' ) as file:
+                data = json.load( file )
+            if data.get( 'version' ) == cacheVersion:
+                self.entries = data['entries']
+        except ( IOError, ValueError, KeyError, AttributeError ):
+            pass # no usable cache, everything gets exported
+
+    # The entry stored under key, if it was made from the same content
+    def get( self, key, digest ):
+        self.used.add( key )
+        entry = self.entries.get( key )
+        if entry is not None and entry.get( 'hash' ) == digest:
+            return entry
+        return None
+
+    # True when key was written to filename from the same content and the
+    # file is still there as it was left
+    def isCurrent( self, key, digest, filename ):
+        entry = self.get( key, digest )
+        if entry is None or not os.path.isfile( filename ):
+            return False
+        return os.path.getsize( filename ) == entry.get( 'size' )
+
+    # The entry stored under key with putText from the same content, if its
+    # text file is still there as it was written
+    def getText( self, key, digest ):
+        entry = self.get( key, digest )
+        filename = self.textFile( key )
+        if entry is None or not os.path.isfile( filename ):
+            return None
+        if os.path.getsize( filename ) != entry.get( 'text_size' ):
+            return None
+        return entry
+
+    # File holding the text of key
+    def textFile( self, key ):
+        return os.path.join( self.folder, hashlib.sha1( key.encode( 'utf-8' ) ).hexdigest() + '.txt' )
+
+    # Open the text file of key for writing, then putText it once written.
+    # Returns None if it cannot be written.
+    def openText( self, key ):
+        try:
+            if not os.path.isdir( self.folder ):
+                os.makedirs( self.folder )
+            return open( self.textFile( key ), 'w' )
+        except ( IOError, OSError ):
+            return None
+
+    def putText( self, key, digest, **values ):
+        self.put( key, digest, text_size = os.path.getsize( self.textFile( key ) ), **values )
+
+    def put( self, key, digest, **values ):
+        self.used.add( key )
+        values['hash'] = digest
+        self.entries[key] = values
+
+    def putFile( self, key, digest, filename, **values ):
+        self.put( key, digest, size = os.path.getsize( filename ), **values )
+
+    def save( self ):
+        entries = self.entries
+        if self.prune:
+            entries = dict( ( key, entries[key] ) for key in self.used if key in entries )
+            for key in self.entries:
+                if key not in entries and os.path.isfile( self.textFile( key ) ):
+                    try:
+                        os.remove( self.textFile( key ) )
+                    except OSError:
+                        pass
+        try:
+            with open( self.path, 'w' ) as file:
+                json.dump( { 'version': cacheVersion, 'entries': entries }, file )
+        except IOError:
+            print( 'Warning: the export cache could not be written to ' + self.path )
+
+#== Hashing ================================================================
+# Content hash of everything an export of the object depends on. Settings
+# is a dictionary of the export options and anything else the caller's
+# output depends on; it must be JSON serializable.
+def hashObject( object, settings ):
+    digest = hashlib.sha1()
+    hashText( digest, json.dumps( settings, sort_keys = True ) )
+    hashText( digest, object.name )
+    hashMatrix( digest, object.matrix_basis )
+    hashMesh( digest, object.data, weights = len( object.vertex_groups ) > 0 )
+
+    for group in object.vertex_groups:
+        hashText( digest, group.name )
+    for modifier in object.modifiers:
+        hashText( digest, modifier.type )
+        hashRna( digest, modifier )
+    for slot in object.material_slots:
+        hashMaterial( digest, slot.material )
+    return digest.hexdigest()
+
+def hashText( digest, text ):
+    digest.update( text.encode( 'utf-8' ) + b'\0' )
+
+def hashMatrix( digest, matrix ):
+    digest.update( array( 'f', [x for row in matrix for x in row] ).tobytes() )
+
+def hashMesh( digest, mesh, weights = False ):
+    vertex_count = len( mesh.vertices )
+    loop_count = len( mesh.loops )
+    polygon_count = len( mesh.polygons )
+    edge_count = len( mesh.edges )
+    hashText( digest, '%d %d %d %d' % ( vertex_count, loop_count, polygon_count, edge_count ) )
+
+    digest.update( fetch( mesh.vertices, 'co', 'f', vertex_count * 3 ).tobytes() )
+    digest.update( fetch( mesh.loops, 'vertex_index', 'i', loop_count ).tobytes() )
+    digest.update( fetch( mesh.edges, 'vertices', 'i', edge_count * 2 ).tobytes() )
+    digest.update( fetch( mesh.edges, 'crease', 'f', edge_count ).tobytes() )
+    digest.update( fetch( mesh.edges, 'use_edge_sharp', 'i', edge_count ).tobytes() )
+    digest.update( fetch( mesh.polygons, 'loop_total', 'i', polygon_count ).tobytes() )
+    digest.update( fetch( mesh.polygons, 'material_index', 'i', polygon_count ).tobytes() )
+    digest.update( fetch( mesh.polygons, 'use_smooth', 'i', polygon_count ).tobytes() )
+    hashText( digest, repr( ( mesh.use_auto_smooth, mesh.auto_smooth_angle ) ) )
+
+    for layer in mesh.uv_layers:
+        hashText( digest, layer.name )
+        digest.update( fetch( layer.data, 'uv', 'f', loop_count * 2 ).tobytes() )
+    for layer in mesh.vertex_colors:
+        hashText( digest, layer.name )
+        digest.update( fetch( layer.data, 'color', 'f', loop_count * 3 ).tobytes() )
+
+    if mesh.shape_keys:
+        for block in mesh.shape_keys.key_blocks:
+            hashText( digest, block.name )
+            digest.update( fetch( block.data, 'co', 'f', vertex_count * 3 ).tobytes() )
+
+    # Weights have no bulk accessor, only walk them when there are groups
+    if weights:
+        values = array( 'f' )
+        for vertex in mesh.vertices:
+            values.append( len( vertex.groups ) )
+            for group in vertex.groups:
+                values.append( group.group )
+                values.append( group.weight )
+        digest.update( values.tobytes() )
+
+def hashMaterial( digest, material ):
+    if material is None:
+        hashText( digest, 'None' )
+        return
+    hashRna( digest, material )
+    for slot in material.texture_slots:
+        if slot and slot.texture:
+            hashRna( digest, slot )
+            hashRna( digest, slot.texture )
+            image = getattr( slot.texture, 'image', None )
+            if image:
+                hashText( digest, image.filepath )
+
+# Pose of an armature object, as it deforms the meshes of Armature modifiers.
+# The pose matrices are evaluated, so constraints and drivers are included.
+def hashPose( digest, pose ):
+    for bone in pose.bones:
+        hashText( digest, bone.name )
+        hashMatrix( digest, bone.matrix )
+
+# Hash the plain properties of an RNA struct. Nested structs are followed a
+# couple of levels deep; datablocks are identified by name, except objects
+# used by modifiers, whose placement and the mesh, pose or lattice they
+# deform with are part of the result.
+def hashRna( digest, struct, depth = 0 ):
+    import bpy
+
+    for prop in struct.bl_rna.properties:
+        if prop.identifier in volatileProperties or prop.type == 'COLLECTION':
+            continue
+        value = getattr( struct, prop.identifier, None )
+        if prop.type != 'POINTER':
+            if getattr( prop, 'array_length', 0 ) > 0:
+                value = tuple( value )
+            hashText( digest, prop.identifier + '=' + repr( value ) )
+        elif value is None:
+            hashText( digest, prop.identifier + '=None' )
+        elif isinstance( value, bpy.types.ID ):
+            hashText( digest, prop.identifier + '=' + value.name )
+            if isinstance( value, bpy.types.Object ) and depth == 0:
+                hashMatrix( digest, value.matrix_world )
+                if value.type == 'MESH':
+                    hashMesh( digest, value.data )
+                elif value.type == 'ARMATURE' and value.pose:
+                    hashPose( digest, value.pose )
+                elif value.type == 'LATTICE':
+                    points = value.data.points
+                    digest.update( fetch( points, 'co_deform', 'f', len( points ) * 3 ).tobytes() )
+        elif depth < 2:
+            hashText( digest, prop.identifier )
+            hashRna( digest, value, depth + 1 )
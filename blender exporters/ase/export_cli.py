@@ -0,0 +1,185 @@
+## ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+"""
+--  Command line exports with the ASE and LWO exporters, no user interface.
+
+--  Inside Blender it exports the objects of the open file:
+--      blender -b level.blend --python export_cli.py -- --format ase --out models --objects "crate*"
+--  Every option_* property of the exporter is accepted as an argument,
+--  e.g. --option_scale 16 --option_separate yes.
+
+--  Run with plain Python it starts one background Blender per .blend file,
+--  several at a time, and passes all other arguments on:
+--      python export_cli.py --blender /path/to/blender --blend "maps/**/*.blend" -j 4 --format lwo --out models
+--  The folders below the start of the pattern are mirrored in --out, so
+--  maps/e1/level.blend is exported to models/e1/level.lwo.
+
+--  Keep this file next to io_export_ase.py and io_export_lwo.py.
+"""
+
+import os
+import sys
+import glob
+import fnmatch
+import argparse
+import subprocess
+
+# format -> exporter module, operator class, file extension
+formats = {
+    'ase': ( 'io_export_ase', 'ExportAse', '.ase' ),
+    'lwo': ( 'io_export_lwo', 'LwoExport', '.lwo' ),
+}
+
+#== Inside Blender =========================================================
+def parseBool( text ):
+    if text.lower() in ( '1', 'true', 'yes', 'on' ):
+        return True
+    if text.lower() in ( '0', 'false', 'no', 'off' ):
+        return False
+    raise argparse.ArgumentTypeError( 'expected yes or no, got ' + repr( text ) )
+
+# Argument type of an operator property
+def propertyType( prop ):
+    if prop.type == 'BOOLEAN':
+        return parseBool
+    if prop.type == 'FLOAT':
+        return float
+    if prop.type == 'INT':
+        return int
+    return str
+
+def exportOpenFile( argv ):
+    import bpy
+
+    parser = argparse.ArgumentParser( prog = 'export_cli.py', description = 'Export objects of the open .blend file.' )
+    parser.add_argument( '--format', choices = sorted( formats ), required = True )
+    parser.add_argument( '--out', required = True, help = 'output directory' )
+    parser.add_argument( '--objects', nargs = '+', default = ['*'], metavar = 'PATTERN',
+                         help = 'names of the objects to export, wildcards allowed (default: all)' )
+    known, rest = parser.parse_known_args( argv )
+
+    sys.path.insert( 0, os.path.dirname( os.path.abspath( __file__ ) ) )
+    module_name, class_name, extension = formats[known.format]
+    module = __import__( module_name )
+    operator = getattr( module, class_name )
+    if 'bl_rna' not in operator.__dict__: # not registered yet
+        module.register()
+
+    for prop in operator.bl_rna.properties:
+        if prop.identifier.startswith( 'option_' ):
+            parser.add_argument( '--' + prop.identifier, type = propertyType( prop ), help = prop.description )
+    arguments = parser.parse_args( argv )
+    options = dict( ( key, value ) for key, value in vars( arguments ).items()
+                    if key.startswith( 'option_' ) and value is not None )
+
+    objects = [object for object in bpy.context.scene.objects
+               if any( fnmatch.fnmatchcase( object.name, pattern ) for pattern in arguments.objects )]
+    if not objects:
+        print( 'Error: no objects match ' + ' '.join( arguments.objects ) )
+        return 1
+
+    if not os.path.isdir( arguments.out ):
+        os.makedirs( arguments.out )
+    name = os.path.splitext( bpy.path.basename( bpy.data.filepath ) )[0] or 'untitled'
+    filepath = os.path.join( arguments.out, name + extension )
+
+    result = module.export( filepath, objects, **options )
+    return 0 if 'FINISHED' in result else 1
+
+#== Outside Blender ========================================================
+# Directory a file pattern starts from, before its first wildcard
+def patternRoot( pattern ):
+    root = []
+    for part in os.path.normpath( pattern ).split( os.sep )[:-1]:
+        if glob.has_magic( part ):
+            break
+        root.append( part )
+    return os.sep.join( root ) or os.curdir
+
+# Output directory of every .blend file, mirroring its path below the root
+# of the pattern that found it. Files that would still share an output
+# file are returned as conflicts.
+def outputDirectories( patterns, out ):
+    directories = {}
+    for pattern in patterns:
+        root = patternRoot( pattern )
+        for blend in glob.glob( pattern, recursive = True ):
+            relative = os.path.relpath( os.path.dirname( blend ), root )
+            directories.setdefault( blend, os.path.normpath( os.path.join( out, relative ) ) )
+
+    targets = {}
+    for blend, directory in directories.items():
+        name = os.path.splitext( os.path.basename( blend ) )[0]
+        targets.setdefault( os.path.normcase( os.path.join( directory, name ) ), [] ).append( blend )
+    conflicts = [sorted( blends ) for blends in targets.values() if len( blends ) > 1]
+    return directories, conflicts
+
+def runBlenders( argv ):
+    parser = argparse.ArgumentParser( prog = 'export_cli.py',
+                                      description = 'Export .blend files with background Blender processes. '
+                                                    'Other arguments are passed on to every Blender, see --format.' )
+    parser.add_argument( '--blender', default = 'blender', help = 'Blender executable (default: blender)' )
+    parser.add_argument( '--blend', nargs = '+', required = True, metavar = 'PATTERN',
+                         help = '.blend files, ** matches any directories' )
+    parser.add_argument( '--out', required = True,
+                         help = 'output directory, the folders of the .blend files below the pattern are mirrored in it' )
+    parser.add_argument( '-j', '--jobs', type = int, default = os.cpu_count() or 1,
+                         help = 'Blender processes at a time (default: one per CPU)' )
+    arguments, forwarded = parser.parse_known_args( argv )
+
+    directories, conflicts = outputDirectories( arguments.blend, arguments.out )
+    files = sorted( directories )
+    if not files:
+        print( 'Error: no .blend files match ' + ' '.join( arguments.blend ) )
+        return 1
+    for blends in conflicts:
+        print( 'Error: ' + ' and '.join( blends ) + ' would be exported to the same file' )
+    if conflicts:
+        return 1
+
+    script = os.path.abspath( __file__ )
+    def run( blend ):
+        command = [arguments.blender, '-b', blend, '--python-exit-code', '1', '--python', script, '--',
+                   '--out', directories[blend]] + forwarded
+        print( ' '.join( command ) )
+        return subprocess.call( command )
+
+    # The exports run in the Blender processes, threads only wait for them
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor( max_workers = max( arguments.jobs, 1 ) ) as pool:
+        codes = list( pool.map( run, files ) )
+
+    failed = [blend for blend, code in zip( files, codes ) if code != 0]
+    for blend in failed:
+        print( 'Failed: ' + blend )
+    print( str( len( files ) - len( failed ) ) + ' of ' + str( len( files ) ) + ' files exported' )
+    return 1 if failed else 0
+
+def main():
+    try:
+        import bpy
+    except ImportError:
+        return runBlenders( sys.argv[1:] )
+
+    # Blender's own arguments end at --
+    argv = sys.argv[sys.argv.index( '--' ) + 1:] if '--' in sys.argv else []
+    return exportOpenFile( argv )
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,177 @@
+## ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+"""
+--  Export profile shared by the ASE and LWO exporters: time spent in every
+--  stage, bytes written per ASE block or LWO chunk and object, vertex and
+--  face counts. The exporters print it after every export and can save it
+--  as JSON or CSV next to the output.
+
+--  Profiles are plain data, so worker processes measure their own files
+--  and the exporter merges them. Stage times of workers add up over all
+--  processes and may exceed the time the export took.
+
+--  For exports that are slow for no obvious reason the exporters can also
+--  run under cProfile, with their cProfile option or with the environment
+--  variable EXPORT_CPROFILE=1. The .prof file and a summary of the hottest
+--  functions are written next to the output.
+
+--  Install this file next to io_export_ase.py and io_export_lwo.py.
+"""
+
+import os
+import csv
+import json
+import time
+import contextlib
+from collections import OrderedDict
+
+# Functions listed in the cProfile summary, per sort order
+cProfileTop = 30
+
+#== Profile ================================================================
+class ExportProfile:
+    def __init__( self ):
+        self.seconds = OrderedDict()    # stage -> total seconds
+        self.calls = {}                 # stage -> times measured
+        self.sizes = OrderedDict()      # block or chunk -> bytes written
+        self.counts = OrderedDict()     # objects, vertices, faces
+
+    @contextlib.contextmanager
+    def stage( self, name ):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addTime( name, time.perf_counter() - start )
+
+    # Iterate over a generator, timing the steps that produce each item
+    # but not what the caller does with it
+    def timed( self, name, items ):
+        items = iter( items )
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next( items )
+            except StopIteration:
+                self.addTime( name, time.perf_counter() - start )
+                return
+            self.addTime( name, time.perf_counter() - start )
+            yield item
+
+    # Bytes a block adds to a file opened through CountingFile, other
+    # files are not measured
+    @contextlib.contextmanager
+    def block( self, name, file ):
+        start = getattr( file, 'size', None )
+        yield
+        if start is not None:
+            self.addBytes( name, file.size - start )
+
+    def addTime( self, name, seconds, calls = 1 ):
+        self.seconds[name] = self.seconds.get( name, 0.0 ) + seconds
+        self.calls[name] = self.calls.get( name, 0 ) + calls
+
+    def addBytes( self, name, size ):
+        self.sizes[name] = self.sizes.get( name, 0 ) + size
+
+    def count( self, name, number = 1 ):
+        self.counts[name] = self.counts.get( name, 0 ) + number
+
+    def merge( self, other ):
+        for name, seconds in other.seconds.items():
+            self.addTime( name, seconds, other.calls[name] )
+        for name, size in other.sizes.items():
+            self.addBytes( name, size )
+        for name, number in other.counts.items():
+            self.count( name, number )
+
+    # ( kind, name, value, calls ) of every measurement
+    def rows( self ):
+        rows = [( 'stage', name, seconds, self.calls[name] ) for name, seconds in self.seconds.items()]
+        rows += [( 'bytes', name, size, '' ) for name, size in self.sizes.items()]
+        rows += [( 'count', name, number, '' ) for name, number in self.counts.items()]
+        return rows
+
+    def report( self, title = 'Export profile' ):
+        lines = [title + ':']
+        for name, seconds in sorted( self.seconds.items(), key = lambda item: -item[1] ):
+            lines.append( '\t{0:<20} {1:10.4f} s {2:8d}x'.format( name, seconds, self.calls[name] ) )
+        for name, size in sorted( self.sizes.items(), key = lambda item: -item[1] ):
+            lines.append( '\t{0:<20} {1:12d} bytes'.format( name, size ) )
+        for name, number in self.counts.items():
+            lines.append( '\t{0:<20} {1:12d}'.format( name, number ) )
+        return '\n'.join( lines )
+
+    # JSON or CSV, chosen by the file extension
+    def save( self, filename ):
+        with open( filename, 'w', newline = '' ) as file:
+            if filename.lower().endswith( '.csv' ):
+                writer = csv.writer( file )
+                writer.writerow( ( 'kind', 'name', 'value', 'calls' ) )
+                writer.writerows( self.rows() )
+            else:
+                stages = OrderedDict( ( name, { 'seconds': seconds, 'calls': self.calls[name] } )
+                                      for name, seconds in self.seconds.items() )
+                json.dump( OrderedDict( [( 'stages', stages ), ( 'bytes', self.sizes ), ( 'counts', self.counts )] ),
+                           file, indent = 1 )
+
+# Passes writes on to a text or binary file and keeps count of their size,
+# in characters for text files, which is bytes for plain ASCII
+class CountingFile:
+    def __init__( self, file ):
+        self.file = file
+        self.size = 0
+
+    def write( self, data ):
+        self.size += len( data )
+        return self.file.write( data )
+
+    def writelines( self, lines ):
+        lines = list( lines )
+        self.size += sum( map( len, lines ) )
+        return self.file.writelines( lines )
+
+    def close( self ):
+        self.file.close()
+
+#== cProfile ===============================================================
+# True when the export should run under cProfile, by option or environment
+def cProfileWanted( option ):
+    return option or os.environ.get( 'EXPORT_CPROFILE', '' ) not in ( '', '0' )
+
+# Call function under cProfile and save the statistics as basename.prof,
+# loadable with pstats or snakeviz, and the hottest functions by own and
+# cumulative time as basename.prof.txt. Worker processes are not seen, so
+# exporters write every file themselves while profiling.
+def runProfiled( basename, function, *args, **kwargs ):
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall( function, *args, **kwargs )
+    finally:
+        profiler.dump_stats( basename + '.prof' )
+        with open( basename + '.prof.txt', 'w' ) as file:
+            stats = pstats.Stats( profiler, stream = file )
+            stats.strip_dirs()
+            for order in ( 'tottime', 'cumulative' ):
+                file.write( 'Top ' + str( cProfileTop ) + ' functions by ' + order + '\n' )
+                stats.sort_stats( order ).print_stats( cProfileTop )
+        print( 'cProfile saved to ' + basename + '.prof and ' + basename + '.prof.txt' )
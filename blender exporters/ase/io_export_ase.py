@@ -56,21 +56,25 @@ bl_info = {
 
 import os
 import bpy
+import bmesh
 import math
 import time
+import shutil
+
+try:
+    from concurrent.futures.process import BrokenProcessPool
+except ImportError:
+    BrokenProcessPool = OSError
+
+from mesh_snapshot import snapshotMesh, prepareMesh
+from ase_core import aseBufferSize, cOptions, cHeader, cScene, cMaterialData, cMultiMaterials, cSubMaterials
+from ase_core import cExportObject, cGeomObject, collisionObject, collisionOwner, writeAse
+from export_batch import batchName, batchConflicts, openPool
+from export_cache import ExportCache, hashObject
+from export_profile import ExportProfile, CountingFile, cProfileWanted, runProfiled
 
 # settings
-aseFloat = lambda x: '''{0:0.4f}'''.format( x )
-optionScale = 16.0
 optionSubmaterials = False
-optionSmoothingGroups = True
-optionAllowMultiMats = True
-
-# ASE components
-aseHeader = ''
-aseScene = ''
-aseMaterials = ''
-aseGeometry = ''
 
 # Other
 matList = []
@@ -84,35 +88,6 @@ class Error( Exception ):
         self.message = message
         print( '\n\n' + message + '\n\n' )
 
-#== Header =================================================================
-class cHeader:
-    def __init__( self ):
-        self.comment = "Ascii Scene Exporter v2.52"
-
-    def __repr__( self ):
-        return '''*3DSMAX_ASCIIEXPORT\t200\n*COMMENT "{0}"\n'''.format( self.comment )
-
-#== Scene ==================================================================
-class cScene:
-    def __init__( self ):
-        self.filename = bpy.path.basename(bpy.data.filepath)
-        self.firstframe = 0
-        self.lastframe = 100
-        self.framespeed = 30
-        self.ticksperframe = 160
-        self.backgroundstatic = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 0.0]] )
-        self.ambientstatic = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 0.0]] )
-
-    def __repr__( self ):
-        return ("*SCENE {{\n\t*SCENE_FILENAME \"{0}\""+
-               "\n\t*SCENE_FIRSTFRAME {1}"+
-               "\n\t*SCENE_LASTFRAME {2}"+
-               "\n\t*SCENE_FRAMESPEED {3}"+
-               "\n\t*SCENE_TICKSPERFRAME {4}"+
-               "\n\t*SCENE_BACKGROUND_STATIC {5}"+
-               "\n\t*SCENE_AMBIENT_STATIC {6}"+
-               "\n}}\n").format( self.filename, self.firstframe, self.lastframe, self.framespeed, self.ticksperframe, self.backgroundstatic, self.ambientstatic )
-
 #== Materials ==============================================================
 class cMaterials:
     def __init__( self, objects ):
@@ -124,7 +99,7 @@ class cMaterials:
 
         # Get all of the materials used by non-collision object meshes  
         for object in objects:
-            if collisionObject( object ) == 2:
+            if collisionObject( object.name ) == 2:
                 continue
             elif object.type != 'MESH':
                 continue
@@ -143,639 +118,72 @@ class cMaterials:
         if self.material_count == 0:
             raise Error( 'Mesh must have at least one applied material' )
         else:
+            material_list = [materialData( material ) for material in self.material_list]
             if ( optionSubmaterials ):
-                self.dump = cSubMaterials( self.material_list )
+                self.dump = cSubMaterials( material_list )
             else:
-                self.dump = cMultiMaterials( self.material_list )
+                self.dump = cMultiMaterials( material_list )
 
     def __repr__( self ):
         return str( self.dump )
-class cMultiMaterials:
-    def __init__( self, material_list ):
-        self.numMtls = len( material_list )
-        # Initialize material information
-        self.dump = ("*MATERIAL_LIST {{"+
-                    "\n\t*MATERIAL_COUNT {0}").format( str( self.numMtls ) )
-
-        for index, slot in enumerate( material_list ):
-            self.dump += ("\n\t*MATERIAL {0} {{"+
-                         "{1}\n\t}}").format( index, cMaterial( slot ) )
-
-        self.dump += '\n}'
-
-    def __repr__( self ):
-        return self.dump
-class cSubMaterials:
-    def __init__( self, material_list ):
-        slot = material_list[0]
-        # Initialize material information
-        self.dump = ("*MATERIAL_LIST {"+
-                    "\n\t*MATERIAL_COUNT 1"+
-                    "\n\t*MATERIAL 0 {")
-        self.matDump = ''
-        self.name = material_list[0].name
-        self.numSubMtls = len( material_list )
-        self.diffusemap = cDiffusemap( slot )
-        if ( self.numSubMtls > 1 ):
-            self.matClass = 'Multi/Sub-Object'
-            self.diffuseDump = ''
-        else:
-            self.matClass = 'Standard'
-            self.numSubMtls = 0
-            self.diffuseDump = self.diffdump()
-        self.ambient = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 0.0]] )
-        self.diffuse = '\t'.join( [aseFloat( x ) for x in slot.diffuse_color] )
-        self.specular = '\t'.join( [aseFloat( x ) for x in slot.specular_color] )
-        self.shine = aseFloat( slot.specular_hardness / 511 )
-        self.shinestrength = aseFloat( slot.specular_intensity )
-        self.transparency = aseFloat( slot.translucency * slot.alpha )
-        self.wiresize = aseFloat( 1.0 )
-        self.shading = str( material_list[0].specular_shader ).capitalize()
-        self.xpfalloff = aseFloat( 0.0 )
-        self.xptype = 'Filter'
-        self.falloff = 'In'
-        self.soften = False
-        self.submtls = []
-        self.selfillum = aseFloat( material_list[0].emit )
-
-        if ( len( material_list ) > 1 ):
-            # Build SubMaterials
-            for index, slot in enumerate( material_list ):
-                self.matDump += ("\n\t\t*SUBMATERIAL {0} {{"+
-                                "{1}"+
-                                "\n\t\t}}").format( index, cMaterial( slot ) )
-
-        self.dump += ("\n\t\t*MATERIAL_NAME \"{0}\""+
-                     "\n\t\t*MATERIAL_CLASS \"{1}\""+
-                     "\n\t\t*MATERIAL_AMBIENT {2}"+
-                     "\n\t\t*MATERIAL_DIFFUSE {3}"+
-                     "\n\t\t*MATERIAL_SPECULAR {4}"+
-                     "\n\t\t*MATERIAL_SHINE {5}"+
-                     "\n\t\t*MATERIAL_SHINESTRENGTH {6}"+
-                     "\n\t\t*MATERIAL_TRANSPARENCY {7}"+
-                     "\n\t\t*MATERIAL_WIRESIZE {8}"+
-                     "\n\t\t*MATERIAL_SHADING {9}"+
-                     "\n\t\t*MATERIAL_XP_FALLOFF {10}"+
-                     "\n\t\t*MATERIAL_SELFILLUM {11}"+
-                     "\n\t\t*MATERIAL_FALLOFF {12}"+
-                     "\n\t\t*MATERIAL_XP_TYPE {13}"+
-                     "{14}"+
-                     "\n\t\t*NUMSUBMTLS {15}"+
-                     "{16}").format( self.name, self.matClass, self.ambient, self.diffuse, self.specular, self.shine, self.shinestrength, self.transparency, self.wiresize, self.shading, self.xpfalloff, self.selfillum, self.falloff, self.xptype, self.diffuseDump, self.numSubMtls, self.matDump )
-
-        self.dump += '\n\t}'
-        self.dump += '\n}'
-
-    def diffdump( self ):
-        for x in [self.diffusemap]:
-            return x
-
-    def __repr__( self ):
-        return self.dump
-class cMaterial:
-    def __init__( self, slot ):
-        self.dump = ''
-        self.name = slot.name
-        self.matClass = 'Standard'
-        self.ambient = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 0.0]] )
-        self.diffuse = '\t'.join( [aseFloat( x ) for x in slot.diffuse_color] )
-        self.specular = '\t'.join( [aseFloat( x ) for x in slot.specular_color] )
-        self.shine = aseFloat( slot.specular_hardness / 511 )
-        self.shinestrength = aseFloat( slot.specular_intensity )
-        self.transparency = aseFloat( slot.translucency * slot.alpha )
-        self.wiresize = aseFloat( 1.0 )
-
-        # Material Definition
-        self.shading = str( slot.specular_shader ).capitalize()
-        self.xpfalloff = aseFloat( 0.0 )
-        self.xptype = 'Filter'
-        self.falloff = 'In'
-        self.soften = False
-        self.diffusemap = cDiffusemap( slot )
-        self.submtls = []
-        self.selfillum = aseFloat( slot.emit )
-        self.dump = ("\n\t\t*MATERIAL_NAME \"{0}\""+
-                    "\n\t\t*MATERIAL_CLASS \"{1}\""+
-                    "\n\t\t*MATERIAL_AMBIENT {2}"+
-                    "\n\t\t*MATERIAL_DIFFUSE {3}"+
-                    "\n\t\t*MATERIAL_SPECULAR {4}"+
-                    "\n\t\t*MATERIAL_SHINE {5}"+
-                    "\n\t\t*MATERIAL_SHINESTRENGTH {6}"+
-                    "\n\t\t*MATERIAL_TRANSPARENCY {7}"+
-                    "\n\t\t*MATERIAL_WIRESIZE {8}"+
-                    "\n\t\t*MATERIAL_SHADING {9}"+
-                    "\n\t\t*MATERIAL_XP_FALLOFF {10}"+
-                    "\n\t\t*MATERIAL_SELFILLUM {11}"+
-                    "\n\t\t*MATERIAL_FALLOFF {12}"+
-                    "\n\t\t*MATERIAL_XP_TYPE {13}"+
-                    "{14}").format( self.name, self.matClass, self.ambient, self.diffuse, self.specular, self.shine, self.shinestrength, self.transparency, self.wiresize, self.shading, self.xpfalloff, self.selfillum, self.falloff, self.xptype, self.diffdump() )
-
-    def diffdump( self ):
-        for x in [self.diffusemap]:
-            return x
-
-    def __repr__( self ):
-        return self.dump
-class cDiffusemap:
-    def __init__( self, slot ):
-        import os
-        self.dump = ''
-        if slot is None:
-            self.name = 'default'
-            self.mapclass = 'Bitmap'
-            self.bitmap = 'None'
-        else:
-            self.name = slot.name
-            self.mapclass = 'Bitmap'
-            self.bitmap = '\\\\base\\' + self.name.replace( '/', '\\' )
-        self.subno = 1
-        self.amount = aseFloat( 1.0 )
-        self.type = 'Screen'
-        self.uoffset = aseFloat( 0.0 )
-        self.voffset = aseFloat( 0.0 )
-        self.utiling = aseFloat( 1.0 )
-        self.vtiling = aseFloat( 1.0 )
-        self.angle = aseFloat( 0.0 )
-        self.blur = aseFloat( 1.0 )
-        self.bluroffset = aseFloat( 0.0 )
-        self.noiseamt = aseFloat( 1.0 )
-        self.noisesize = aseFloat( 1.0 )
-        self.noiselevel = 1
-        self.noisephase = aseFloat( 0.0 )
-        self.bitmapfilter = 'Pyramidal'
-
-        self.dump = ("\n\t\t*MAP_DIFFUSE {{"+
-                    "\n\t\t\t*MAP_NAME \"{0}\""+
-                    "\n\t\t\t*MAP_CLASS \"{1}\""+
-                    "\n\t\t\t*MAP_SUBNO {2}"+
-                    "\n\t\t\t*MAP_AMOUNT {3}"+
-                    "\n\t\t\t*BITMAP \"{4}\""+
-                    "\n\t\t\t*MAP_TYPE {5}"+
-                    "\n\t\t\t*UVW_U_OFFSET {6}"+
-                    "\n\t\t\t*UVW_V_OFFSET {7}"+
-                    "\n\t\t\t*UVW_U_TILING {8}"+
-                    "\n\t\t\t*UVW_V_TILING {9}"+
-                    "\n\t\t\t*UVW_ANGLE {10}"+
-                    "\n\t\t\t*UVW_BLUR {11}"+
-                    "\n\t\t\t*UVW_BLUR_OFFSET {12}"+
-                    "\n\t\t\t*UVW_NOUSE_AMT {13}"+
-                    "\n\t\t\t*UVW_NOISE_SIZE {14}"+
-                    "\n\t\t\t*UVW_NOISE_LEVEL {15}"+
-                    "\n\t\t\t*UVW_NOISE_PHASE {16}"+
-                    "\n\t\t\t*BITMAP_FILTER {17}"+
-                    "\n\t\t}}").format( self.name, self.mapclass, self.subno, self.amount, self.bitmap, self.type, self.uoffset, self.voffset, self.utiling, self.vtiling, self.angle, self.blur, self.bluroffset, self.noiseamt, self.noisesize, self.noiselevel, self.noisephase, self.bitmapfilter )
-
-    def __repr__( self ):
-        return self.dump
-
-#== Geometry ===============================================================
-class cGeomObject:
-    def __init__( self, object ):
-        print( object.name + ": Constructing Geometry" )
-        global optionAllowMultiMats
-        global currentMatId
-
-        self.name = object.name
-        self.prop_motionblur = 0
-        self.prop_castshadow = 1
-        self.prop_recvshadow = 1
-
-        if optionAllowMultiMats:
-            self.material_ref = 0
-        else:
-            self.material_ref = currentMatId
-
-        self.nodetm = cNodeTM( object )
-        self.mesh = cMesh( object )
-
-        self.dump = '''\n*GEOMOBJECT {{\n\t*NODE_NAME "{0}"\n{1}\n{2}\n\t*PROP_MOTIONBLUR {3}\n\t*PROP_CASTSHADOW {4}\n\t*PROP_RECVSHADOW {5}\n\t*MATERIAL_REF {6}\n}}'''.format( self.name, self.nodetm, self.mesh, self.prop_motionblur, self.prop_castshadow, self.prop_recvshadow, self.material_ref )
-
-    def __repr__( self ):
-        return self.dump
-class cNodeTM:
-    def __init__( self, object ):
-        self.name = object.name
-        self.inherit_pos = '0 0 0'
-        self.inherit_rot = '0 0 0'
-        self.inherit_scl = '0 0 0'
-        self.tm_row0 = '\t'.join( [aseFloat( x ) for x in [1.0, 0.0, 0.0]] )
-        self.tm_row1 = '\t'.join( [aseFloat( x ) for x in [0.0, 1.0, 0.0]] )
-        self.tm_row2 = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 1.0]] )
-        self.tm_row3 = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 0.0]] )
-        self.tm_pos = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 0.0]] )
-        self.tm_rotaxis = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 0.0]] )
-        self.tm_rotangle = aseFloat( 0.0 )
-        self.tm_scale = '\t'.join( [aseFloat( x ) for x in [1.0, 1.0, 1.0]] )
-        self.tm_scaleaxis = '\t'.join( [aseFloat( x ) for x in [0.0, 0.0, 0.0]] )
-        self.tm_scaleaxisang = aseFloat( 0.0 )
-
-        self.dump = ("\t*NODE_TM {{"+
-                    "\n\t\t*NODE_NAME \"{0}\""+
-                    "\n\t\t*INHERIT_POS {1}"+
-                    "\n\t\t*INHERIT_ROT {2}"+
-                    "\n\t\t*INHERIT_SCL {3}"+
-                    "\n\t\t*TM_ROW0 {4}"+
-                    "\n\t\t*TM_ROW1 {5}"+
-                    "\n\t\t*TM_ROW2 {6}"+
-                    "\n\t\t*TM_ROW3 {7}"+
-                    "\n\t\t*TM_POS {8}"+
-                    "\n\t\t*TM_ROTAXIS {9}"+
-                    "\n\t\t*TM_ROTANGLE {10}"+
-                    "\n\t\t*TM_SCALE {11}"+
-                    "\n\t\t*TM_SCALEAXIS {12}"+
-                    "\n\t\t*TM_SCALEAXISANG {13}"+
-                    "\n\t}}").format( self.name, self.inherit_pos, self.inherit_rot, self.inherit_scl, self.tm_row0, self.tm_row1, self.tm_row2, self.tm_row3, self.tm_pos, self.tm_rotaxis, self.tm_rotangle, self.tm_scale, self.tm_scaleaxis, self.tm_scaleaxisang )
-
-    def __repr__( self ):
-        return self.dump
-class cMesh:
-    def __init__( self, object ):
-        bpy.ops.mesh.reveal
-        
-        self.uvdata = cUVdata( object )
-
-        self.timevalue = '0'
-        self.numvertex = len( object.data.vertices )
-        self.numfaces = len( object.data.polygons )
-        self.vertlist = cVertlist( object )
-        self.facelist = cFacelist( object )
-
-
-        # Vertex Paint
-        if len( object.data.vertex_colors ) > 0:
-            self.cvertlist = cCVertlist( object )
-            self.numcvertex = self.cvertlist.length
-            self.numcvfaces = len( object.data.vertex_colors.data.polygons )
-            self.cfacelist = cCFacelist( self.numcvfaces )
-            # change them into strings now
-            self.numcvertex = '\n\t\t*MESH_NUMCVERTEX {0}'.format( self.numcvertex )
-            self.cvertlist = '\n{0}'.format( self.cvertlist )
-            self.numcvfaces = '\n\t\t*MESH_NUMCVFACES {0}'.format( self.numcvfaces )
-            self.cfacelist = '\n{0}'.format( self.cfacelist )
-        else:
-            self.numcvertex = '\n\t\t*MESH_NUMCVERTEX 0'
-            self.cvertlist = ''
-            self.numcvfaces = ''
-            self.cfacelist = ''
-
-        self.normals = cNormallist( object )
-       
-    def __repr__( self ):
-        temp = '''\t*MESH {{\n\t\t*TIMEVALUE {0}\n\t\t*MESH_NUMVERTEX {1}\n\t\t*MESH_NUMFACES {2}\n\t\t*MESH_VERTEX_LIST {3}\n\t\t*MESH_FACE_LIST {4}{5}{6}{7}{8}{9}\n{10}\n\t}}'''.format( self.timevalue, self.numvertex, self.numfaces, self.vertlist, self.facelist, self.uvdata, self.numcvertex, self.cvertlist, self.numcvfaces, self.cfacelist, self.normals )
-        return temp
-class cVertlist:
-    def __init__( self, object ):
-        self.vertlist = []
-        for data in object.data.vertices:
-            temp = cVert( data.index, data.co.to_tuple( 4 ) )
-            self.vertlist.append( temp )
-
-    def dump( self ):
-        temp = ''
-        for x in self.vertlist:
-            temp += str( x )
-        return temp
-
-    def __repr__( self ):
-        return '''{{\n{0}\t\t}}'''.format( self.dump() )
-class cVert:
-    def __init__( self, index, coord ):
-        global optionScale
-
-        self.index = index
-        self.x = aseFloat( coord[0] * optionScale )
-        self.y = aseFloat( coord[1] * optionScale )
-        self.z = aseFloat( coord[2] * optionScale )
-
-    def __repr__( self ):
-        return '''\t\t\t*MESH_VERTEX {0:4d}\t{1}\t{2}\t{3}\n'''.format(self.index,self.x,self.y,self.z)
-class cFacelist:
-    def __init__( self, object ):
-        global optionAllowMultiMats
-        global matList
-        global numMats
-        global currentMatId
-
-        self.facelist = []
-        sgID = 0
-
-        # Define smoothing groups (if enabled)
-        if ( collisionObject( object ) == 0 ):
-            if ( optionSmoothingGroups ):
-                self.smoothing_groups = defineSmoothing( self, object )
-            else:
-                self.smoothing_groups = ''
-
-        for face in object.data.polygons:
-            if optionAllowMultiMats:
-                if ( collisionObject( object ) < 2 ):
-                    self.matid = matList.index( object.material_slots[face.material_index].material.name )
-                else:
-                    self.matid = 0
-            else:
-                self.matid = currentMatId
-            if ( collisionObject( object ) == 0 ):
-                if ( optionSmoothingGroups ):
-                    for group in self.smoothing_groups:
-                        if group.count( face.index ) == 0:
-                            continue
-                        else:
-                            #TODO: Compress sg's
-                            index = self.smoothing_groups.index( group )
-                            sgID = index % 32
-
-            temp = '''\t\t\t*MESH_FACE {0:4d}:    A: {1:4d} B: {2:4d} C: {3:4d} AB:    0 BC:    0 CA:    0\t *MESH_SMOOTHING {4}\t *MESH_MTLID {5}\n'''.format( face.index, face.vertices[0], face.vertices[1], face.vertices[2], sgID, self.matid )
-            self.facelist.append( temp )
-
-        if currentMatId < numMats - 1:
-            currentMatId += 1
-        else:
-            currentMatId = 0
-
-    def dump( self ):
-        temp = ''
-        for x in self.facelist:
-            temp = temp + str( x )
-        return temp
-
-    def __repr__( self ):
-        return '''{{\n{0}\t\t}}'''.format( self.dump() )
-class cUVdata:
-    def __init__( self, object ):
-        self.uvdata = ''
-        object.data.update( calc_tessface = True )
-        
-        if ( len( object.data.tessface_uv_textures ) == 0 ) or ( collisionObject( object ) > 0 ):
-            self.uvdata = "\n\t\t*MESH_NUMTVERTEX 0"
-        else:
-            for channel in range ( len ( object.data.tessface_uv_textures ) ): #iterate over mapping channels
-                tvlist = []
-                tvdata = ''
-                tfdata = ''
-                for index, face in enumerate( object.data.tessfaces ):
-                    tfdata += "\n\t\t\t*MESH_TFACE {0}".format(index)
-                    for uvvert in [object.data.tessface_uv_textures[channel].data[face.index].uv1,
-                                   object.data.tessface_uv_textures[channel].data[face.index].uv2,
-                                   object.data.tessface_uv_textures[channel].data[face.index].uv3]:
-                        if uvvert not in tvlist:
-                            tvlist.append( uvvert ) #only append vertices with unique uvs
-                            tvdata += ("\n\t\t\t*MESH_TVERT {0}\t{1}\t{2}\t{3}"
-                                      ).format(len(tvlist)-1,aseFloat(uvvert[0]),aseFloat(uvvert[1]),aseFloat(0.0))
-                        tfdata += "\t" + str (tvlist.index(uvvert))
-                tvdata = ("\n\t\t*MESH_NUMTVERTEX " + str(len(tvlist)) +
-                          "\n\t\t*MESH_TVERTLIST {" + tvdata + "\n\t\t}")
-                tfdata = ("\n\t\t*MESH_NUMTVFACES " + str(len(object.data.uv_texture_stencil.data)) +
-                          "\n\t\t*MESH_TFACELIST {" + tfdata + "\n\t\t}")
-                if channel > 0:
-                    tvdata = "\n\t\t*MESH_MAPPINGCHANNEL " + str(channel+1) + " {" + tvdata.replace("\n","\n\t")
-                    tfdata = tfdata.replace("\n","\n\t") + "\n\t\t}"
-                self.uvdata = self.uvdata + tvdata + tfdata
-
-    def __repr__( self ):
-        return self.uvdata
-class cCVertlist:
-    def __init__( self, object ):
-        self.vertlist = []
-        self.index = 0
-
-        # Blender 2.63+
-        bpy.ops.object.mode_set( mode = 'OBJECT' )
-        object.data.calc_tessface()
-
-        for face in object.data.tessfaces:
-            temp = object.data.tessface_vertex_colors[0].data[face.index].color1
-            self.vertlist.append( cCVert( self.index, temp ) )
-            temp = object.data.tessface_vertex_colors[0].data[face.index].color2
-            self.vertlist.append( cCVert( self.index + 1, temp ) )
-            temp = object.data.tessface_vertex_colors[0].data[face.index].color3
-            self.vertlist.append( cCVert( self.index + 2, temp ) )
-            self.index += 3
-
-        self.length = len( self.vertlist )
-
-    def dump( self ):
-        temp = ''
-        for x in self.vertlist:
-            temp = temp + str( x )
-        return temp
-
-    def __repr__( self ):
-        return '''\t\t*MESH_CVERTLIST {{\n{0}\t\t}}'''.format( self.dump() )
-class cCVert:
-    def __init__( self, index, temp ):
-        self.index = index
-        self.r = aseFloat( float( temp[0] ) )
-        self.g = aseFloat( float( temp[1] ) )
-        self.b = aseFloat( float( temp[2] ) )
-
-    def __repr__( self ):
-        return '''\t\t\t*MESH_VERTCOL {0} {1} {2} {3}\n'''.format( self.index, self.r, self.g, self.b )
-class cCFacelist:
-    def __init__( self, facecount ):
-        temp = [0 for x in range( facecount )]
-        self.facelist = []
-        for index, data in enumerate( temp ):
-            self.facelist.append( cCFace( index, data ) )
-
-    def dump( self ):
-        temp = ''
-        for x in self.facelist:
-            temp = temp + str( x )
-        return temp
-
-    def __repr__( self ):
-        return '''\t\t*MESH_CFACELIST {{\n{0}\t\t}}'''.format( self.dump() )
-class cCFace:
-    def __init__( self, index, data ):
-        self.index = index
-        self.vertices = []
-        self.vertices.append( index * 3 )
-        self.vertices.append( ( index * 3 ) + 1 )
-        self.vertices.append( ( index * 3 ) + 2 )
-
-    def __repr__( self ):
-        return '''\t\t\t*MESH_CFACE {0} {1} {2} {3}\n'''.format( self.index, self.vertices[0], self.vertices[1], self.vertices[2] )
-class cNormallist:
-    def __init__( self, object ):
-        self.normallist = []
-        for face in object.data.polygons:
-            self.normallist.append( cNormal( face, object ) )
-
-    def dump( self ):
-        temp = ''
-        for x in self.normallist:
-            temp = temp + str( x )
-        return temp
-
-    def __repr__( self ):
-        return '''\t\t*MESH_NORMALS {{\n{0}\t\t}}'''.format( self.dump() )
-class cNormal:
-    def __init__( self, face, object ):
-        self.faceindex = face.index
-        self.facenormal = [aseFloat( x ) for x in face.normal.to_tuple( 4 )]
-        self.vertnormals = []
-        object.data.calc_normals_split()
-        for x in [object.data.loops[i] for i in face.loop_indices]:
-            self.vertnormals.append( [str(x.vertex_index), [aseFloat(y) for y in x.normal]] )
-
-    def __repr__( self ):
-        return '''\t\t\t*MESH_FACENORMAL {0}\t{1}\t{2}\t{3}\n\t\t\t\t*MESH_VERTEXNORMAL {4}\t{5}\n\t\t\t\t*MESH_VERTEXNORMAL {6}\t{7}\n\t\t\t\t*MESH_VERTEXNORMAL {8}\t{9}\n'''.format( self.faceindex, self.facenormal[0], self.facenormal[1], self.facenormal[2], self.vertnormals[0][0], '\t'.join(self.vertnormals[0][1]), self.vertnormals[1][0], '\t'.join(self.vertnormals[1][1]), self.vertnormals[2][0], '\t'.join(self.vertnormals[2][1]))
-
-#== Smoothing Groups and Helper Methods =================================
-def defineSmoothing( self, object ):
-    print( object.name + ": Constructing Smoothing Groups" )
-
-    seam_edge_list = []
-    sharp_edge_list = []
-
-    _mode = bpy.context.scene.objects.active.mode
-    bpy.ops.object.mode_set( mode = 'EDIT' )
-    bpy.ops.mesh.select_all( action = 'DESELECT' )
-    setSelMode( 'EDGE' )
-
-    # Get seams and clear them
-    bpy.ops.object.mode_set( mode = 'OBJECT' )
-    for edge in object.data.edges:
-        if edge.use_seam:
-            seam_edge_list.append( edge.index )
-            edge.select = True
-
-    bpy.ops.object.mode_set( mode = 'EDIT' )
-    bpy.ops.mesh.select_all( action = 'SELECT' )
-    bpy.ops.mesh.mark_seam( clear = True )
-
-    # Get sharp edges, convert them to seams
-    bpy.ops.mesh.select_all( action = 'DESELECT' )
-    bpy.ops.object.mode_set( mode = 'OBJECT' )
-    for edge in object.data.edges:
-        if edge.use_edge_sharp:
-            sharp_edge_list.append( edge )
-            edge.select = True
-
-    bpy.ops.object.mode_set( mode = 'EDIT' )
-    bpy.ops.mesh.mark_seam()
-
-    bpy.ops.mesh.select_all( action = 'DESELECT' )
-
-    smoothing_groups = []
-    face_list = []
-
-    mode = getSelMode( self, False )
-    setSelMode( 'FACE' )
-
-    for face in object.data.polygons:
-        face_list.append( face.index )
-
-    while len( face_list ) > 0:
-        bpy.ops.object.mode_set( mode = 'OBJECT' )
-        object.data.polygons[face_list[0]].select = True
-        bpy.ops.object.mode_set( mode = 'EDIT' )
-        bpy.ops.mesh.select_linked( delimit = {'SEAM'} )
-
-        # TODO - update when API is updated
-        selected_faces = getSelectedFaces( self, True )
-        smoothing_groups.append( selected_faces )
-        for face_index in selected_faces:
-            if face_list.count( face_index ) > 0:
-                face_list.remove( face_index )
-        bpy.ops.mesh.select_all( action = 'DESELECT' )
-
-    setSelMode( mode, False )
-
-    # Clear seams created by sharp edges
-    bpy.ops.object.mode_set( mode = 'OBJECT' )
-    for edge in object.data.edges:
-        if edge.use_seam:
-            edge.select = True
-
-    bpy.ops.object.mode_set( mode = 'EDIT' )
-    bpy.ops.mesh.mark_seam( clear = True )
-
-    bpy.ops.mesh.select_all( action = 'DESELECT' )
-    # Restore original uv seams
-    bpy.ops.object.mode_set( mode = 'OBJECT' )
-    for edge_index in seam_edge_list:
-        object.data.edges[edge_index].select = True
-
-    bpy.ops.object.mode_set( mode = 'EDIT' )
-    bpy.ops.mesh.mark_seam()
-
-    print( '\t' + str( len( smoothing_groups ) ) + ' smoothing groups found.' )
-    return smoothing_groups
 
 #===========================================================================
 # // General Helpers
 #===========================================================================
 
-# Check if the mesh is a collider and what kind
-# 2 - skip materials, smoothing and uvs
-# 1 - skip smoothing and uvs
-# 0 - not a collision object
-def collisionObject( object ):
-    collisionPrefixes = ['UCX_', 'UBX_', 'USX_']
-    for prefix in collisionPrefixes:
-        if prefix in object.name:
-            return 2
-    collisionPrefixesAlt = ['collision_', 'shadow_']
-    for prefix in collisionPrefixesAlt:
-        if prefix in object.name:
-            return 1
-    return 0
-
-# Set the selection mode    
-def setSelMode( mode, default = True ):
-    if default:
-        if mode == 'VERT':
-            bpy.context.tool_settings.mesh_select_mode = [True, False, False]
-        elif mode == 'EDGE':
-            bpy.context.tool_settings.mesh_select_mode = [False, True, False]
-        elif mode == 'FACE':
-            bpy.context.tool_settings.mesh_select_mode = [False, False, True]
+# Split a prepared mesh into one mesh per used material, like separating
+# by material in edit mode but without adding objects to the scene.
+# Returns ( name, mesh ) pairs.
+def separateByMaterial( name, mesh ):
+    bm = bmesh.new()
+    bm.from_mesh( mesh )
+    used = sorted( set( face.material_index for face in bm.faces ) )
+    if len( used ) < 2:
+        bm.free()
+        return [( name, mesh )]
+
+    pieces = []
+    for number, material_index in enumerate( used ):
+        part = bm.copy()
+        other_faces = [face for face in part.faces if face.material_index != material_index]
+        bmesh.ops.delete( part, geom = other_faces, context = 5 )
+        piece = mesh.copy()
+        part.to_mesh( piece )
+        part.free()
+        if number > 0:
+            pieces.append( ( '{0}.{1:03d}'.format( name, number ), piece ) )
         else:
-            return False
-    else:
-        bpy.context.tool_settings.mesh_select_mode = mode
-        return True
-def getSelMode( self, default = True ):
-    if default:
-        if bpy.context.tool_settings.mesh_select_mode[0] == True:
-            return 'VERT'
-        elif bpy.context.tool_settings.mesh_select_mode[1] == True:
-            return 'EDGE'
-        elif bpy.context.tool_settings.mesh_select_mode[2] == True:
-            return 'FACE'
-        return False
+            pieces.append( ( name, piece ) )
+    bm.free()
+    bpy.data.meshes.remove( mesh )
+    return pieces
+
+# Copy what the material blocks use out of a Blender material
+def materialData( material ):
+    data = cMaterialData( material.name )
+    data.diffuse_color = tuple( material.diffuse_color )
+    data.specular_color = tuple( material.specular_color )
+    data.specular_hardness = material.specular_hardness
+    data.specular_intensity = material.specular_intensity
+    data.translucency = material.translucency
+    data.alpha = material.alpha
+    data.specular_shader = material.specular_shader
+    data.emit = material.emit
+    return data
+
+# Move on to the material of the next geometry object, which is used when
+# objects may not have multiple materials
+def advanceMaterialId():
+    global currentMatId
+    if currentMatId < numMats - 1:
+        currentMatId += 1
     else:
-        mode = []
-        for value in bpy.context.tool_settings.mesh_select_mode:
-            mode.append( value )
-
-        return mode
-def getSelectedFaces( self, index = False ):
-    selected_faces = []
-    # Update mesh data
-    bpy.ops.object.editmode_toggle()
-    bpy.ops.object.editmode_toggle()
-
-    _mode = bpy.context.scene.objects.active.mode
-    bpy.ops.object.mode_set( mode = 'EDIT' )
-
-    object = bpy.context.scene.objects.active
-    for face in object.data.polygons:
-        if face.select == True:
-            if index == False:
-                selected_faces.append( face )
-            else:
-                selected_faces.append( face.index )
-
-    bpy.ops.object.mode_set( mode = _mode )
-
-    return selected_faces
+        currentMatId = 0
 
 #== Core ===================================================================
 
 from bpy_extras.io_utils import ExportHelper
-from bpy.props import StringProperty, BoolProperty, FloatProperty
+from bpy.props import StringProperty, BoolProperty, FloatProperty, EnumProperty
 
 class ExportAse( bpy.types.Operator, ExportHelper ):
     '''Load an Ascii Scene Export File'''
@@ -841,6 +249,24 @@ class ExportAse( bpy.types.Operator, ExportHelper ):
             description = "A separate ASE file for every selected object",
             default = False )
 
+    option_cache = BoolProperty(
+            name = "Skip Unchanged",
+            description = "Keep a cache next to the output and reuse objects unchanged since the last export",
+            default = False )
+
+    option_report = EnumProperty(
+            name = "Profile Report",
+            description = "Save the time spent in every export stage next to the output, it is always printed to the console",
+            items = ( ( 'NONE', "Console Only", "Print the report only" ),
+                      ( 'JSON', "JSON", "Also save the report as .profile.json" ),
+                      ( 'CSV', "CSV", "Also save the report as .profile.csv" ) ),
+            default = 'NONE' )
+
+    option_cprofile = BoolProperty(
+            name = "cProfile",
+            description = "Run the export under cProfile and save a .prof file and a summary of the slowest functions next to the output",
+            default = False )
+
     option_submaterials = BoolProperty( 
             name = "Use Submaterials (UDK)",
             description = "Export a single material with multiple sub materials",
@@ -880,6 +306,10 @@ class ExportAse( bpy.types.Operator, ExportHelper ):
         box.label( "Advanced:" )
         box.prop( self, 'option_scale' )
         box.prop( self, 'option_smoothinggroups' )
+        box.prop( self, 'option_separate' )
+        box.prop( self, 'option_cache' )
+        box.prop( self, 'option_report' )
+        box.prop( self, 'option_cprofile' )
 
     @classmethod
     def poll( cls, context ):
@@ -889,151 +319,309 @@ class ExportAse( bpy.types.Operator, ExportHelper ):
         ok = selected or camera
         return ok
 
-    def writeASE( self, filename, data ):
+    def openASE( self, filename ):
         print( '\nWriting', filename )
         try:
-            file = open( filename, 'w' )
+            return open( filename, 'w', buffering = aseBufferSize )
         except IOError:
             print( 'Error: The file could not be written to. Aborting.' )
+            return None
+
+    def openPool( self ):
+        if cProfileWanted( self.option_cprofile ):
+            return None # cProfile only sees this process
+        # Workers must run Blender's Python, not another Blender
+        return openPool( bpy.app.binary_path_python )
+
+    # Evaluate an object into plain export records, one per material when
+    # separating by material. Material ids are resolved here so that the
+    # records hold everything the geometry encoder needs.
+    def exportObjects( self, object, context, options ):
+        global matList
+        global numMats
+        global currentMatId
+
+        # Evaluate into a temporary mesh, the scene is left untouched
+        mesh = prepareMesh( object, context.scene,
+                            apply_modifiers = self.option_apply_stack,
+                            triangulate = self.option_triangulate,
+                            remove_doubles = self.option_remove_doubles,
+                            recalc_normals = self.option_normals,
+                            apply_location = self.option_apply_location,
+                            apply_rotation = self.option_apply_rotation,
+                            apply_scale = self.option_apply_scale,
+                            profile = options.profile )
+
+        if self.option_separate_by_material:
+            with options.profile.stage( 'separate' ):
+                pieces = separateByMaterial( object.name, mesh )
         else:
-            file.write( data )
+            pieces = [( object.name, mesh )]
+
+        # Material slots of the object, not the mesh's material list, so
+        # that materials linked to the object resolve as well. Pieces keep
+        # the material indices of the whole mesh.
+        material_ids = []
+        for slot in object.material_slots:
+            if slot.material and slot.material.name in matList:
+                material_ids.append( matList.index( slot.material.name ) )
+            else:
+                material_ids.append( 0 )
+
+        records = []
+        for name, piece in pieces:
+            with options.profile.stage( 'snapshot' ):
+                record = cExportObject( name, snapshotMesh( piece ) )
+            record.material_ids = list( material_ids )
+            record.material_id = currentMatId
+            advanceMaterialId()
+            bpy.data.meshes.remove( piece )
+            records.append( record )
+        return records
+
+    # Everything besides the object itself that its exported text depends on
+    def exportSettings( self, context ):
+        settings = self.as_keywords( ignore = ( 'filepath', 'filter_glob', 'check_existing', 'option_cache', 'option_report', 'option_cprofile' ) )
+        settings['frame'] = context.scene.frame_current
+        return settings
+
+    # All objects in the one file chosen, streamed object by object
+    def writeCombined( self, context, objects, options ):
+        cache = None
+        if self.option_cache:
+            cache = ExportCache( self.filepath + '.cache.json', prune = True )
+            settings = self.exportSettings( context )
+
+        file = self.openASE( self.filepath )
+        if file is None:
+            return False
+        file = CountingFile( file )
+        profile = options.profile
+
+        def writeRecords( records, target ):
+            for record in records:
+                geometry = cGeomObject( record, options )
+                with profile.stage( 'writing' ):
+                    geometry.write( target )
+
+        try:
+            file.write( str( cHeader() ) )
+            with profile.block( 'SCENE', file ):
+                file.write( str( cScene( bpy.path.basename( bpy.data.filepath ) ) ) )
+            with profile.stage( 'materials' ):
+                materials = str( cMaterials( objects ) )
+            with profile.block( 'MATERIAL_LIST', file ):
+                file.write( materials )
+
+            #Construct and write ASE Geometry Nodes
+            for object in objects:
+                if cache is None:
+                    writeRecords( self.exportObjects( object, context, options ), file )
+                    continue
+
+                # Material ids depend on the objects written before this one
+                digest = hashObject( object, dict( settings, materials = matList, material_id = currentMatId ) )
+                entry = cache.getText( object.name, digest )
+                if entry is None:
+                    # Encode into the object's cache file, then copy that
+                    records = self.exportObjects( object, context, options )
+                    text = cache.openText( object.name )
+                    if text is None:
+                        writeRecords( records, file ) # nowhere to cache it
+                        continue
+                    with text:
+                        writeRecords( records, text )
+                    cache.putText( object.name, digest, pieces = len( records ) )
+                else:
+                    print( object.name + ': Unchanged, reusing cached geometry' )
+                    for piece in range( entry['pieces'] ):
+                        advanceMaterialId()
+                with profile.stage( 'writing' ):
+                    with open( cache.textFile( object.name ), 'r' ) as text:
+                        shutil.copyfileobj( text, file )
+        finally:
             file.close()
+        profile.addBytes( 'file', file.size )
+
+        if cache:
+            cache.save()
+        return True
+
+    # One file per object next to the chosen path, which also holds the
+    # object's UCX_ collision objects. Objects are evaluated here, encoding
+    # and writing the files is left to worker processes. An object that
+    # fails is reported and skipped, the others are still written.
+    def writeSeparate( self, context, objects, options ):
+        global matList
+        global numMats
+        global currentMatId
+
+        cache = None
+        if self.option_cache:
+            cache = ExportCache( os.path.dirname( self.filepath ) + os.sep + 'ase_export_cache.json' )
+            settings = self.exportSettings( context )
+            settings['scene'] = bpy.path.basename( bpy.data.filepath )
+        written = []
+        skipped = []
+
+        # Collision objects go into the file of their render mesh
+        renders = [object for object in objects if collisionObject( object.name ) != 2]
+        collisions = dict( ( object.name, [] ) for object in renders )
+        for object in objects:
+            if collisionObject( object.name ) == 2:
+                owner = collisionOwner( object.name, collisions.keys() )
+                if owner is None:
+                    print( 'Error: ' + object.name + ': no render mesh of that name is exported, skipped' )
+                    skipped.append( object.name )
+                else:
+                    collisions[owner].append( object )
+
+        # Names that only differ in dots and underscores share a file
+        for names in batchConflicts( [object.name for object in renders] ):
+            print( 'Error: ' + ' and '.join( names ) + ' would be written to the same file, skipped' )
+            skipped.extend( names )
+        renders = [object for object in renders if object.name not in skipped]
+
+        pool = None
+        if len( renders ) > 1:
+            pool = self.openPool()
+        jobs = []
+
+        # Wait for or write one file and record the outcome
+        def finish( future, job, name, digest ):
+            try:
+                if future is not None:
+                    try:
+                        options.profile.merge( future.result() )
+                        written.append( ( name, digest, job[0] ) )
+                        return
+                    except BrokenProcessPool:
+                        pass # the worker died, write it here
+                options.profile.merge( writeAse( *job ) )
+                written.append( ( name, digest, job[0] ) )
+            except IOError as error:
+                print( 'Error: ' + name + ': ' + job[0] + ' could not be written, skipped (' + str( error ) + ')' )
+                skipped.append( name )
+
+        try:
+            for object in renders:
+                group = [object] + collisions[object.name]
+                filename = os.path.dirname( self.filepath ) + os.sep + batchName( object.name ) + '.ase'
+                digest = None
+                if cache:
+                    collision_digests = [hashObject( collision, settings ) for collision in group[1:]]
+                    digest = hashObject( object, dict( settings, collisions = collision_digests ) )
+                    if cache.isCurrent( object.name, digest, filename ):
+                        print( object.name + ': Unchanged, skipped' )
+                        continue
+
+                # Every file has its own material list
+                matList = []
+                currentMatId = 0
+                numMats = 0
+
+                try:
+                    with options.profile.stage( 'materials' ):
+                        materials = str( cMaterials( group ) )
+                    preamble = str( cHeader() ) + str( cScene( bpy.path.basename( bpy.data.filepath ) ) ) + materials
+                    records = []
+                    for member in group:
+                        records.extend( self.exportObjects( member, context, options ) )
+                except Exception as error:
+                    print( 'Error: ' + object.name + ': ' + str( error ) + ', skipped' )
+                    skipped.append( object.name )
+                    continue
+                job = ( filename, preamble, records, options )
+
+                print( '\nWriting', filename )
+                if pool:
+                    try:
+                        jobs.append( ( pool.submit( writeAse, *job ), job, object.name, digest ) )
+                        continue
+                    except ( OSError, BrokenProcessPool ):
+                        pool = None
+                finish( None, job, object.name, digest )
+
+            for future, job, name, digest in jobs:
+                finish( future, job, name, digest )
+
+            if cache:
+                for name, digest, filename in written:
+                    cache.putFile( name, digest, filename )
+                cache.save()
+        finally:
+            if pool:
+                pool.shutdown()
+
+        if skipped:
+            print( 'Skipped ' + str( len( skipped ) ) + ' objects: ' + ', '.join( skipped ) )
+        return True
 
     def execute( self, context ):
-        start = time.clock()
+        if cProfileWanted( self.option_cprofile ):
+            return runProfiled( os.path.splitext( self.filepath )[0], self.exportScene, context )
+        return self.exportScene( context )
 
-        global optionScale
-        global optionSubmaterials
-        global optionSmoothingGroups
-        global optionAllowMultiMats
+    def exportScene( self, context ):
+        start = time.perf_counter()
 
-        global aseHeader
-        global aseScene
-        global aseMaterials
-        global aseGeometry
+        global optionSubmaterials
 
         global currentMatId
         global numMats
         global matList
 
-        # Set globals and reinitialize ase components
-        aseHeader = ''
-        aseScene = ''
-        aseMaterials = ''
-        aseGeometry = ''
-
-        optionScale = self.option_scale
+        # Set globals
         optionSubmaterials = self.option_submaterials
-        optionSmoothingGroups = self.option_smoothinggroups
-        optionAllowMultiMats = self.option_allowmultimats
 
         matList = []
         currentMatId = 0
         numMats = 0
 
-        # Build ASE Header, Scene
+        options = cOptions( scale = self.option_scale,
+                            smoothing_groups = self.option_smoothinggroups,
+                            allow_multi_mats = self.option_allowmultimats,
+                            profile = ExportProfile() )
+
         print( '\nAscii Scene Export by MCampagnini\n' )
         print( 'Objects selected: ' + str( len( bpy.context.selected_objects ) ) )
-        aseHeader = str( cHeader() )
-        aseScene = str( cScene() )
 
-        # Back up duplicates, work on originals
         objects = []
-        bup_objs = []
-        bup_obj_names = {}
-        bup_mesh_names = {}
-        for object in bpy.context.selected_objects:
+        for object in context.selected_objects:
             if object.type == 'MESH':
-                bpy.ops.object.select_all( action = 'DESELECT' )
-                bpy.context.scene.objects.active = object
-                objects.append(object)
-                object.select = True
-                bpy.ops.object.duplicate()
-                dup = bpy.context.active_object
-                dup.name = "temp"
-                dup.data.name = "temp"
-                bup_objs.append(dup)
-                bup_obj_names[dup] = object.name
-                bup_mesh_names[dup] = object.data.name
-            # Apply modifiers
-            if self.option_apply_stack:
-                bpy.context.scene.objects.active = object
-                while (len(object.modifiers)):
-                    bpy.ops.object.modifier_apply(apply_as='DATA', modifier = object.modifiers[0].name)
-
-        # Separate by material
-        bpy.ops.object.select_all( action = 'DESELECT' )
-        if self.option_separate_by_material:
-            for object in objects:
-                bpy.context.scene.objects.active = object
-                object.select = True
-                bpy.ops.object.mode_set( mode = 'EDIT' )
-                bpy.ops.mesh.separate( type = 'MATERIAL' )
-            for object in bpy.context.selected_objects:
-                if object.type == 'MESH':
-                    if object not in objects:
-                        objects.append(object)
-
+                objects.append( object )
         objects.sort( key = lambda a: a.name )
 
-        aseMaterials = str( cMaterials(objects) )
-
-        for object in objects:
-            bpy.context.scene.objects.active = object
-            object.select = True
-
-            # Apply options
-            bpy.ops.object.mode_set( mode = 'EDIT' )
-            if self.option_remove_doubles:
-                bpy.ops.object.mode_set( mode = 'EDIT' )
-                bpy.ops.mesh.select_all( action = 'SELECT' )
-                bpy.ops.mesh.remove_doubles()
-            if self.option_triangulate:
-                bpy.ops.object.mode_set( mode = 'EDIT' )
-                bpy.ops.mesh.select_all( action = 'SELECT' )
-                bpy.ops.mesh.quads_convert_to_tris()
-            if self.option_normals:
-                bpy.ops.object.mode_set( mode = 'EDIT' )
-                bpy.ops.mesh.select_all( action = 'SELECT' )
-                bpy.ops.mesh.normals_make_consistent()
-
-
-            # Transformations
-            bpy.ops.object.mode_set( mode = 'OBJECT' )
-            bpy.ops.object.transform_apply( location = self.option_apply_location, rotation = self.option_apply_rotation, scale = self.option_apply_scale )
-
-            #Construct ASE Geometry Nodes
-            aseGeometry += str( cGeomObject( object ) )
-            
-        # Clean up
-        bpy.ops.object.mode_set( mode = 'OBJECT' )
-        bpy.ops.object.select_all(action='DESELECT')
-        for object in objects:
-            bpy.context.scene.objects.active = object
-            object.select = True
-            bpy.ops.object.delete()
-
-        # Restore scene from duplicates
-        for object in bup_objs:
-            object.name = bup_obj_names[object]
-            object.data.name = bup_mesh_names[object]
-            bpy.context.scene.objects.active = object
-            object.select = True
-
-        aseModel = ''
-        aseModel += aseHeader
-        aseModel += aseScene
-        aseModel += aseMaterials
-        aseModel += aseGeometry
-
-        # Write the ASE file
-        self.writeASE( self.filepath, aseModel )
-
-        lapse = ( time.clock() - start )
+        if self.option_separate:
+            written = self.writeSeparate( context, objects, options )
+        else:
+            written = self.writeCombined( context, objects, options )
+        if not written:
+            return {'CANCELLED'}
+
+        lapse = ( time.perf_counter() - start )
+        options.profile.addTime( 'total', lapse )
+        print( '\n' + options.profile.report() )
+        if self.option_report != 'NONE':
+            report = os.path.splitext( self.filepath )[0] + '.profile.' + self.option_report.lower()
+            options.profile.save( report )
+            print( 'Profile saved to ' + report )
         print( 'Completed in ' + str( lapse ) + ' seconds' )
 
         return {'FINISHED'}
 
+# Export objects without the user interface, e.g. from a background Blender.
+# Options are the operator's option_* properties.
+def export( filepath, objects, **options ):
+    if 'bl_rna' not in ExportAse.__dict__: # not registered yet
+        register()
+
+    objects = list( objects )
+    override = bpy.context.copy()
+    override['selected_objects'] = objects
+    override['active_object'] = objects[0] if objects else None
+    return bpy.ops.export.ase( override, 'EXEC_DEFAULT', filepath = filepath, **options )
+
 def menu_func( self, context ):
     self.layout.operator( ExportAse.bl_idname, text = "Ascii Scene Exporter (.ase)" )
 
@@ -67,17 +67,28 @@ bl_info = {
 	"category": "Import-Export"}
 
 
-import bpy, bmesh
+import bpy
 from bpy_extras.io_utils import ExportHelper
 from bpy.props import StringProperty, BoolProperty, FloatProperty, EnumProperty
 from bpy.app.handlers import persistent
-import os, math, functools
+import os, math, time
 try: import struct
 except: struct = None
 try: import io
 except: io = None
+try: import hashlib
+except: hashlib = None
 try: import operator
 except: operator = None
+try:
+	from concurrent.futures.process import BrokenProcessPool
+except:
+	BrokenProcessPool = OSError
+from mesh_snapshot import fetch, snapshotMesh, prepareMesh
+from export_batch import batchName, batchConflicts, openPool
+from export_cache import ExportCache, hashObject
+from export_profile import ExportProfile, cProfileWanted, runProfiled
+import lwo_core
 
 
 
@@ -191,6 +202,24 @@ class LwoExport(bpy.types.Operator, ExportHelper):
 			description = "A separate .lwo file for every selected object",
 			default = False )
 
+	option_cache = BoolProperty(
+			name = "Skip Unchanged",
+			description = "Keep a cache next to the output and skip objects unchanged since the last export",
+			default = False )
+
+	option_report = EnumProperty(
+			name = "Profile Report",
+			description = "Save the time spent in every export stage next to the output, it is always printed to the console",
+			items = ( ('NONE', "Console Only", "Print the report only"),
+					  ('JSON', "JSON", "Also save the report as .profile.json"),
+					  ('CSV', "CSV", "Also save the report as .profile.csv") ),
+			default = 'NONE' )
+
+	option_cprofile = BoolProperty(
+			name = "cProfile",
+			description = "Run the export under cProfile and save a .prof file and a summary of the slowest functions next to the output",
+			default = False )
+
 	option_normaddon = BoolProperty( 
 			name = "Use \"Recalc Vert Normals\" addon data",
 			description = "Export the vertex normals created with the \"Recalc Vert Normals\" addon",
@@ -224,6 +253,9 @@ class LwoExport(bpy.types.Operator, ExportHelper):
 		box.label( "Advanced:" )
 		box.prop( self, 'option_scale' )
 		box.prop( self, 'option_batch')
+		box.prop( self, 'option_cache')
+		box.prop( self, 'option_report')
+		box.prop( self, 'option_cprofile')
 		if 'vertex_normal_list' in context.active_object:
 			box.prop( self, 'option_normaddon')
 		
@@ -232,6 +264,19 @@ class LwoExport(bpy.types.Operator, ExportHelper):
 		obj = context.active_object
 		return (obj and obj.type == 'MESH')
 
+	# texture slot flag, LightWave channel and opacity of every image map
+	TEXTURE_CHANNELS = (
+		('use_map_color_diffuse', "COLR", 'diffuse_color_factor'),
+		('use_map_diffuse', "DIFF", 'diffuse_factor'),
+		('use_map_emit', "LUMI", 'emit_factor'),
+		('use_map_specular', "SPEC", 'specular_factor'),
+		('use_map_hardness', "GLOS", 'hardness_factor'),
+		('use_map_raymir', "REFL", 'raymir_factor'),
+		('use_map_alpha', "TRAN", 'alpha_factor'),
+		('use_map_translucency', "TRNL", 'translucency_factor'),
+#		('use_map_normal', "BUMP", 'normal_factor'),
+	)
+
 	def execute(self, context):
 	
 		global main
@@ -239,11 +284,14 @@ class LwoExport(bpy.types.Operator, ExportHelper):
 		main = self
 	
 		self.context = context
-		self.VCOL_NAME = "Per-Face Vertex Colors"
-		self.DEFAULT_NAME = "Blender Default"
+		self.VCOL_NAME = lwo_core.VCOL_NAME
+		self.DEFAULT_NAME = lwo_core.DEFAULT_NAME
 		
 		if struct and io and operator:
-			self.write(self.filepath)
+			if cProfileWanted(self.option_cprofile):
+				runProfiled(os.path.splitext(self.combined_filename(self.filepath))[0], self.write, self.filepath)
+			else:
+				self.write(self.filepath)
 		else:
 			bpy.ops.lwoexport.message('INVOKE_DEFAULT')
 		
@@ -254,340 +302,273 @@ class LwoExport(bpy.types.Operator, ExportHelper):
 	# === Write LightWave Format ===
 	# ==============================
 	def write(self, filename):
+		start = time.perf_counter()
+		profile = ExportProfile()
+		report = os.path.splitext(self.combined_filename(filename))[0] + '.profile.' + self.option_report.lower()
 		objects = list(self.context.selected_objects)
-		actobj = self.context.active_object
 		
 		try:	objects.sort( key = lambda a: a.name )
 		except: objects.sort(lambda a,b: cmp(a.name, b.name))
+		
+		if self.option_batch:
+			# objects whose names only differ in dots and underscores would
+			# overwrite each other's file, in whichever order they finish
+			conflicts = batchConflicts([obj.name for obj in objects if obj.type == 'MESH'])
+			for names in conflicts:
+				print('Error: ' + ' and '.join(names) + ' would be written to the same file, skipped')
+			skipped = set(name for names in conflicts for name in names)
+			objects = [obj for obj in objects if obj.name not in skipped]
 	
 		self.meshes = []
-		object_name_lookup_orig = {}
+		mesh_objects = {} # source object of every prepared mesh
 		mesh_object_name_lookup = {} # for name lookups only
-		objdups = []
+		objmeshes = []
+
+		cache = None
+		digests = {} # content hash of every exported object
+		if self.option_cache:
+			cache = self.open_cache(filename)
+			settings = self.export_settings()
+			for obj in objects:
+				if obj.type == 'MESH':
+					digests[obj.name] = hashObject(obj, settings)
+			# a combined file is only reused as a whole
+			if digests and not(self.option_batch) and self.combined_is_current(cache, filename, digests):
+				print('Unchanged, skipped ' + self.combined_filename(filename))
+				return
 		
 		for obj in objects:
 			if obj.type != 'MESH':
 				continue
+			if cache and self.option_batch and cache.isCurrent(obj.name, digests[obj.name], self.batch_filename(filename, obj.name)):
+				print(obj.name + ': Unchanged, skipped')
+				continue
 				
-			bpy.ops.object.select_all(action='DESELECT')
-			bpy.context.scene.objects.active = obj
-			obj.select = True
-			bpy.ops.object.duplicate()
-			objdup = bpy.context.active_object
-			objdups.append(objdup)
-			object_name_lookup_orig[objdup] = obj.name
-			
-			if self.option_applymod:
-				if not(objdup.data.shape_keys):
-					while (len(objdup.modifiers)):
-						bpy.ops.object.modifier_apply(apply_as='DATA', modifier = objdup.modifiers[0].name)
-
-			# Options
-			bpy.ops.object.mode_set( mode = 'EDIT' )
-			if self.option_remove_doubles:
-				bpy.ops.object.mode_set( mode = 'EDIT' )
-				bpy.ops.mesh.select_all( action = 'SELECT' )
-				bpy.ops.mesh.remove_doubles()
-			if self.option_triangulate:
-				bpy.ops.mesh.select_all( action = 'SELECT' )
-				bpy.ops.mesh.quads_convert_to_tris()
-			if self.option_normals:
-				bpy.ops.object.mode_set( mode = 'EDIT' )
-				bpy.ops.mesh.select_all( action = 'SELECT' )
-				bpy.ops.mesh.normals_make_consistent()
-
-			# Transformations
-			bpy.ops.object.mode_set( mode = 'OBJECT' )
-			bpy.ops.object.transform_apply( location = self.option_apply_location, rotation = self.option_apply_rotation, scale = self.option_apply_scale )
-
-			mesh = objdup.data
-			if mesh:
-				mesh_object_name_lookup[mesh] = obj.name
-				if not(self.option_batch):
-					self.meshes.append(mesh)
+			# Evaluate into a temporary mesh, the scene is left untouched
+			mesh = prepareMesh(obj, self.context.scene,
+				apply_modifiers = self.option_applymod,
+				triangulate = self.option_triangulate,
+				remove_doubles = self.option_remove_doubles,
+				recalc_normals = self.option_normals,
+				apply_location = self.option_apply_location,
+				apply_rotation = self.option_apply_rotation,
+				apply_scale = self.option_apply_scale,
+				shape_keys = True,
+				profile = profile)
+			objmeshes.append(mesh)
+			mesh_objects[mesh] = obj
+			mesh_object_name_lookup[mesh] = obj.name
+			if not(self.option_batch):
+				self.meshes.append(mesh)
 					
 					
-		for obj in objdups:
-			if (self.option_batch):
-				self.meshes = [obj.data]
-
-			if (self.option_batch):
-				filename = os.path.dirname(filename)
-				filename += (os.sep + object_name_lookup_orig[obj].replace('.', '_'))
-			if not filename.lower().endswith('.lwo'):
-				filename += '.lwo'
-			file = open(filename, "wb")
+		options = lwo_core.LwoOptions(
+			idtech = self.option_idtech,
+			subd = self.option_subd,
+			scale = self.option_scale,
+			smooth = self.option_smooth,
+			profile = profile)
 		
-			matmeshes, material_names = self.get_used_material_names()
-			self.clips = []
-			self.clippaths = []
-			self.currclipid = 1
-			tags = self.generate_tags(material_names)
-			surfs = []
-			chunks = [tags]
+		# Batch files are encoded and written by worker processes, only
+		# the extraction into plain data has to stay on the main thread
+		pool = None
+		if self.option_batch and len(objmeshes) > 1:
+			pool = self.open_pool()
+		jobs = []
 		
-			meshdata = io.BytesIO()
-			
-			layer_index = 0
+		try:
+			for objmesh in objmeshes:
+				if (self.option_batch):
+					self.meshes = [objmesh]
+
+				if (self.option_batch):
+					filename = self.batch_filename(filename, mesh_object_name_lookup[objmesh])
+				if not filename.lower().endswith('.lwo'):
+					filename += '.lwo'
 			
-			for i, mesh in enumerate(self.meshes):
-				if not(self.option_batch):
-					mobj = objdups[i]
-					
-				if mesh.vertex_colors:
-					#if meshtools.average_vcols:
-					#	vmap_vc = generate_rgba_vc(mesh)  # per vert
-					#else:
-					if self.option_idtech:
-						rgba_vcs = self.generate_rgba_vc(mesh)  # per vert
-					else:
-						rgb_vcs = self.generate_rgb_vc(mesh)  # per face
+				with profile.stage("materials"):
+					matmeshes, material_names = self.get_used_material_names()
+					tags = lwo_core.generate_tags(material_names)
+				surfs = []
+				layers = []
 				
-				for j, m in enumerate(matmeshes):
-					if m == mesh:
-						surfs.append(self.generate_surface(m, material_names[j]))
-				layr = self.generate_layr(mesh_object_name_lookup[mesh], layer_index)
-				pnts = self.generate_pnts(mesh)
-				bbox = self.generate_bbox(mesh)
-				if not(self.option_idtech):
-					if not(self.option_normaddon and 'vertex_normal_list' in mobj):
-						vnorms = self.generate_vnorms(mesh, None)
-					else:
-						vnorms = self.generate_vnorms(mesh, mobj.vertex_normal_list)
-				pols = self.generate_pols(mesh, self.option_subd)
-				if not(self.option_idtech):
-					if not(self.option_normaddon and 'vertex_normal_list' in mobj):
-						lnorms = self.generate_lnorms(mesh)
-				ptag = self.generate_ptag(mesh, material_names)
-		
-				if mesh.uv_layers:
-					vmad_uvs = self.generate_vmad_uv(mesh)  # per face
-		
-				if not(self.option_idtech):
-					creases = False
-					for edge in mesh.edges:
-						if edge.crease > 0:
-							creases = True
-							vmad_ew = self.generate_vmad_ew(mesh)
-							break
-			
-					if mesh.shape_keys:
-						vmap_morphs = self.generate_vmap_morph(mesh)
-			
-					if len(mobj.vertex_groups):
-						vmap_weights = self.generate_vmap_weight(mobj)
-		
-				self.write_chunk(meshdata, "LAYR", layr); chunks.append(layr)
-				self.write_chunk(meshdata, "PNTS", pnts); chunks.append(pnts)
-				self.write_chunk(meshdata, "BBOX", bbox); chunks.append(bbox)
-				if not(self.option_idtech):
-					self.write_chunk(meshdata, "VMAP", vnorms); chunks.append(vnorms)
-				if mesh.vertex_colors:
-					if self.option_idtech:
-						for vmad in rgba_vcs:
-							self.write_chunk(meshdata, "VMAD", vmad)
-							chunks.append(vmad)
-					else:
-						for vmad in rgb_vcs:
-							self.write_chunk(meshdata, "VMAD", vmad)
-							chunks.append(vmad)
-				self.write_chunk(meshdata, "POLS", pols); chunks.append(pols)
-				if not(self.option_idtech):
-					if not(self.option_normaddon and 'vertex_normal_list' in mobj):
-						self.write_chunk(meshdata, "VMAD", lnorms); chunks.append(lnorms)
-				self.write_chunk(meshdata, "PTAG", ptag); chunks.append(ptag)
-		
-				if mesh.uv_layers:
-					for vmad in vmad_uvs:
-						self.write_chunk(meshdata, "VMAD", vmad)
-						chunks.append(vmad)
+				for i, mesh in enumerate(self.meshes):
+					mobj = mesh_objects[mesh]
+					with profile.stage("materials"):
+						for j, m in enumerate(matmeshes):
+							if m == mesh:
+								surfs.append(self.generate_surface(m, material_names[j]))
+					with profile.stage("snapshot"):
+						layers.append(self.generate_layer(mobj, mesh, i, material_names))
 				
-				if not(self.option_idtech):
-					if creases:
-						self.write_chunk(meshdata, "VMAD", vmad_ew)
-						chunks.append(vmad_ew)
-		
-					if len(mobj.vertex_groups):
-						for vmap in vmap_weights:
-							self.write_chunk(meshdata, "VMAP", vmap)
-							chunks.append(vmap)
-			
-					if mesh.shape_keys:
-						for vmap in vmap_morphs:
-							self.write_chunk(meshdata, "VMAP", vmap)
-							chunks.append(vmap)
-		
-				layer_index += 1
+				job = (filename, tags, layers, surfs, options)
+				if pool:
+					try:
+						jobs.append((pool.submit(lwo_core.write_lwo, *job), job))
+					except (OSError, BrokenProcessPool):
+						pool = None
+				if not pool:
+					profile.merge(lwo_core.write_lwo(*job))
 				
-			surfs = list(surfs)
-			for clip in self.clips:
-				chunks.append(clip)
-			for surf in surfs:
-				chunks.append(surf)
-		
-			self.write_header(file, chunks)
-			self.write_chunk(file, "TAGS", tags)
-			file.write(meshdata.getvalue()); meshdata.close()
-			for clip in self.clips:
-				self.write_chunk(file, "CLIP", clip)
-			for surf in surfs:
-				self.write_chunk(file, "SURF", surf)
-		
-			file.close()
-			
-			bpy.ops.object.select_all(action='DESELECT')
-			bpy.context.scene.objects.active = obj
-			obj.select = True
-			bpy.ops.object.delete()
+				if not(self.option_batch):
+					# if not batch exporting, all meshes of objects are already saved
+					break
 			
-			if not(self.option_batch):
-				# if not batch exporting, all meshes of objects are already saved
-				break
-		
-		for obj in objects:
-			obj.select = True
-		bpy.context.scene.objects.active = actobj
+			for future, job in jobs:
+				try:
+					profile.merge(future.result())
+				except BrokenProcessPool:
+					profile.merge(lwo_core.write_lwo(*job))	# the worker died, write it here
+
+			if cache:
+				if self.option_batch:
+					for objmesh in objmeshes:
+						name = mesh_object_name_lookup[objmesh]
+						cache.putFile(name, digests[name], self.batch_filename(filename, name))
+				elif objmeshes:
+					cache.putFile(os.path.basename(filename), self.combined_digest(digests), filename)
+				cache.save()
+		finally:
+			if pool:
+				pool.shutdown()
+			for mesh in objmeshes:
+				bpy.data.meshes.remove(mesh)
+
+		lapse = time.perf_counter() - start
+		profile.addTime("total", lapse)
+		print("\n" + profile.report())
+		if self.option_report != 'NONE':
+			profile.save(report)
+			print("Profile saved to " + report)
+		print("Completed in " + str(lapse) + " seconds")
+	
+	# ===================================
+	# === Export Cache For Re-Exports ===
+	# ===================================
+	def open_cache(self, filename):
+		if self.option_batch:
+			return ExportCache(os.path.dirname(filename) + os.sep + 'lwo_export_cache.json')
+		return ExportCache(self.combined_filename(filename) + '.cache.json', prune = True)
+
+	# everything besides the objects themselves that the written file depends on
+	def export_settings(self):
+		settings = self.as_keywords(ignore = ('filepath', 'filter_glob', 'check_existing', 'option_cache', 'option_report', 'option_cprofile'))
+		settings['frame'] = self.context.scene.frame_current
+		return settings
+
+	def batch_filename(self, filename, name):
+		return os.path.dirname(filename) + os.sep + batchName(name) + '.lwo'
+
+	def combined_filename(self, filename):
+		if not filename.lower().endswith('.lwo'):
+			filename += '.lwo'
+		return filename
+
+	# one hash over all objects of a combined file
+	def combined_digest(self, digests):
+		return hashlib.sha1(' '.join(name + ':' + digests[name] for name in sorted(digests)).encode('utf-8')).hexdigest()
+
+	def combined_is_current(self, cache, filename, digests):
+		filename = self.combined_filename(filename)
+		return cache.isCurrent(os.path.basename(filename), self.combined_digest(digests), filename)
+
+	# =========================================
+	# === Open Worker Pool For Batch Export ===
+	# =========================================
+	def open_pool(self):
+		if cProfileWanted(self.option_cprofile):
+			return None		# cProfile only sees this process
+		# Workers must run Blender's Python, not another Blender
+		return openPool(bpy.app.binary_path_python)
+	
+	# =====================================
+	# === Extract Layer Into Plain Data ===
+	# =====================================
+	def generate_layer(self, obj, mesh, index, material_names):
+		layer = lwo_core.LwoLayer(obj.name, index, tuple(obj.location), snapshotMesh(mesh))
+		# material slot -> surface index, looked up once per slot
+		layer.surfaces = lwo_core.slot_surfaces(self.slot_names(mesh), bool(mesh.vertex_colors), material_names)
+		if self.option_normaddon and 'vertex_normal_list' in obj:
+			normals = obj.vertex_normal_list
+			layer.vertex_normals = [x for i in range(layer.snap.vertex_count) for x in normals[i]['normal']]
 		
+		# Sparse members of every group, gathered in one pass over the
+		# prepared mesh, which carries the weights
+		members = {vg.index: ([], []) for vg in obj.vertex_groups}
+		for v in mesh.vertices if members else ():
+			for g in v.groups:
+				if g.group in members:
+					verts, weights = members[g.group]
+					verts.append(v.index)
+					weights.append(g.weight)
+		layer.weight_maps = [(vg.name,) + members[vg.index] for vg in obj.vertex_groups]
 		
-	# =======================================
-	# === Generate Null-Terminated String ===
-	# =======================================
-	def generate_nstring(self, string):
-		if len(string)%2 == 0:	# even
-			string += "\0\0"
-		else:					# odd
-			string += "\0"
-		return string
+		if mesh.shape_keys:
+			# the basis is the mesh itself
+			layer.morphs = [(kb.name, fetch(kb.data, 'co', 'f', len(layer.snap.co)))
+				for kb in mesh.shape_keys.key_blocks if kb != mesh.shape_keys.reference_key]
+		return layer
 	
-	# ===============================
+	# =======================================
 	# === Get Used Material Names ===
 	# ===============================
 	def get_used_material_names(self):
-		matnames = []
-		matmeshes = []
-		for mesh in self.meshes:
-			if mesh.materials:
-				for material in mesh.materials:
-					if material:
-						matmeshes.append(mesh)
-						matnames.append(material.name)
-			elif mesh.vertex_colors:
-				matmeshes.append(mesh)
-				matnames.append(self.LWO_VCOLOR_MATERIAL)
-			else:
-				matmeshes.append(mesh)
-				matnames.append(self.LWO_DEFAULT_MATERIAL)
-		return matmeshes, matnames
+		# one surface per material, owned by its first mesh
+		owners, matnames = lwo_core.used_surface_names(
+			[(self.slot_names(mesh), bool(mesh.vertex_colors)) for mesh in self.meshes])
+		return [self.meshes[index] for index in owners], matnames
 	
-	# =========================================
-	# === Generate Tag Strings (TAGS Chunk) ===
-	# =========================================
-	def generate_tags(self, material_names):
-		data = io.BytesIO()
-		if material_names:
-			for mat in material_names:
-				data.write(bytes(self.generate_nstring(mat), 'UTF-8'))
-			return data.getvalue()
-		else:
-			return self.generate_nstring('')
+	# material name of every slot, None for an empty slot
+	def slot_names(self, mesh):
+		return [material.name if material else None for material in mesh.materials]
 	
-	# ========================
-	# === Generate Surface ===
-	# ========================
+	# =======================================
+	# === Extract Surface Into Plain Data ===
+	# =======================================
 	def generate_surface(self, mesh, name):
+		surface = lwo_core.LwoSurface(name)
 		#if name.find("\251 Per-") == 0:
 		#	return generate_vcol_surf(mesh)
 		if name == self.DEFAULT_NAME:
-			return self.generate_default_surf()
-		else:
-			return self.generate_surf(mesh, name)
-	
-	# ===================================
-	# === Generate Layer (LAYR Chunk) ===
-	# ===================================
-	def generate_layr(self, name, idx):
-		px, py, pz = bpy.data.objects.get(name).location
-		data = io.BytesIO()
-		data.write(struct.pack(">h", idx))			# layer number
-		data.write(struct.pack(">h", 0))			# flags
-		data.write(struct.pack(">fff", px, pz, py))	# pivot
-		data.write(bytes(self.generate_nstring(name.replace(" ","_").replace(".", "_")), 'UTF-8'))
-		return data.getvalue()
+			surface.default = True
+			return surface
+
+		try:
+			material = bpy.data.materials.get(name)
+			surface.color = (material.diffuse_color[0], material.diffuse_color[1], material.diffuse_color[2])
+			surface.diff = material.diffuse_intensity
+			surface.lumi = material.emit
+			surface.spec = material.specular_intensity
+			surface.gloss = math.sqrt((material.specular_hardness - 4) / 400)
+			if material.raytrace_mirror.use:
+				surface.refl = material.raytrace_mirror.reflect_factor
+			surface.rblr = 1.0 - material.raytrace_mirror.gloss_factor
+			surface.rind = material.raytrace_transparency.ior
+			surface.tran = 1.0 - material.alpha
+			surface.tblr = 1.0 - material.raytrace_transparency.gloss_factor
+			surface.trnl = material.translucency
+			if mesh.use_auto_smooth:
+				surface.sman = mesh.auto_smooth_angle
+		except:
+			return lwo_core.LwoSurface(name)	# no material, plain white
+
+		if material.vcmenu != "<none>":
+			surface.vcol = material.vcmenu
+
+		if not(self.option_idtech):
+			# Image maps, with the channels they are mapped to
+			surface.texture_slots = len(material.texture_slots)
+			for mtex in material.texture_slots:
+				if mtex and mtex.texture.type == 'IMAGE':
+					texture = lwo_core.LwoTexture(mtex.texture.image.filepath, mtex.uv_layer,
+						mtex.invert, mtex.blend_type)
+					for use, channel, factor in self.TEXTURE_CHANNELS:
+						if getattr(mtex, use):
+							texture.channels.append((channel, getattr(mtex, factor)))
+					surface.textures.append(texture)
+		return surface
 	
 	# ===================================
-	# === Generate Verts (PNTS Chunk) ===
-	# ===================================
-	def generate_pnts(self, mesh):
-		data = io.BytesIO()
-		for i, v in enumerate(mesh.vertices):
-			x, y, z = v.co
-			x *= self.option_scale
-			y *= self.option_scale
-			z *= self.option_scale
-			data.write(struct.pack(">fff", x, z, y))
-		return data.getvalue()
-	
-	# ============================================
-	# === Generate Vertex Normals (VMAP Chunk) ===
-	# ============================================
-	def generate_vnorms(self, mesh, nolist):
-		data = io.BytesIO()
-		name = self.generate_nstring("vert_normals")
-		data.write(b"NORM")										# type
-		data.write(struct.pack(">H", 3))						# dimension
-		data.write(bytes(name, 'UTF-8')) 						# name
-		for i, v in enumerate(mesh.vertices):
-			if nolist:
-				x, y, z = nolist[i]['normal']
-			else:
-				x, y, z = v.normal
-			x *= self.option_scale
-			y *= self.option_scale
-			z *= self.option_scale
-			data.write(self.generate_vx(i)) # vertex index
-			data.write(struct.pack(">fff", x, z, y))
-		return data.getvalue()
-	
-	# ============================================
-	# === Generate Loop Normals (VMAD Chunk) ===
-	# ============================================
-	def generate_lnorms(self, mesh):
-		mesh.calc_normals_split()
-		data = io.BytesIO()
-		name = self.generate_nstring("vert_normals")
-		data.write(b"NORM")										# type
-		data.write(struct.pack(">H", 3))						# dimension
-		data.write(bytes(name, 'UTF-8')) 						# name
-		for i, p in enumerate(mesh.polygons):
-			for li in p.loop_indices:
-				l = mesh.loops[li]
-				x, y, z = l.normal
-				x *= self.option_scale
-				y *= self.option_scale
-				z *= self.option_scale
-				data.write(self.generate_vx(l.vertex_index)) # vertex index
-				data.write(self.generate_vx(i)) # face index
-				data.write(struct.pack(">fff", x, z, y))
-		return data.getvalue()
-	
-	# ==========================================
-	# === Generate Bounding Box (BBOX Chunk) ===
-	# ==========================================
-	def generate_bbox(self, mesh):
-		data = io.BytesIO()
-		# need to transform verts here
-		if mesh.vertices:
-			nv = [v.co for v in mesh.vertices]
-			xx = [ co[0] * self.option_scale for co in nv ]
-			yy = [ co[1] * self.option_scale for co in nv ]
-			zz = [ co[2] * self.option_scale for co in nv ]
-		else:
-			xx = yy = zz = [0.0,]
-		
-		data.write(struct.pack(">6f", min(xx), min(zz), min(yy), max(xx), max(zz), max(yy)))
-		return data.getvalue()
-	
-	# ========================================
 	# === Average All Vertex Colors (Fast) ===
 	# ========================================
 	'''
@@ -618,225 +599,13 @@ class LwoExport(bpy.types.Operator, ExportHelper):
 	'''
 	
 	# ====================================================
-	# === Generate RGBA Vertex Colors (VMAD Chunk) ===
-	# ====================================================
-	def generate_rgba_vc(self, mesh):
-		alldata = []
-		layers = mesh.vertex_colors
-		for l in layers:
-			vcname = self.generate_nstring(l.name)
-			data = io.BytesIO()
-			data.write(b"RGBA")										# type
-			data.write(struct.pack(">H", 4))						# dimension
-			data.write(bytes(vcname, 'UTF-8')) # name
-			
-			found = False
-			for i, p in enumerate(mesh.polygons):
-				p_vi = p.vertices
-				for v, loop in zip(p.vertices, p.loop_indices):
-					r,g,b = tuple(l.data[loop].color)
-					data.write(self.generate_vx(v)) # vertex index
-					data.write(self.generate_vx(i)) # face index
-					data.write(struct.pack(">ffff", r, g, b, 0.5))
-					found = True
-			if found:
-				alldata.append(data.getvalue())
-					
-		return alldata
-	
-	# ====================================================
-	# === Generate RGB Vertex Colors (VMAD Chunk) ===
-	# ====================================================
-	def generate_rgb_vc(self, mesh):
-		alldata = []
-		layers = mesh.vertex_colors
-		for l in layers:
-			vcname = self.generate_nstring(l.name)
-			data = io.BytesIO()
-			data.write(b"RGB ")										# type
-			data.write(struct.pack(">H", 3))						# dimension
-			data.write(bytes(vcname, 'UTF-8')) # name
-			
-			found = False
-			for i, p in enumerate(mesh.polygons):
-				p_vi = p.vertices
-				for v, loop in zip(p.vertices, p.loop_indices):
-					r,g,b = tuple(l.data[loop].color)
-					data.write(self.generate_vx(v)) # vertex index
-					data.write(self.generate_vx(i)) # face index
-					data.write(struct.pack(">fff", r, g, b))
-					found = True
-			if found:
-				alldata.append(data.getvalue())
-					
-		return alldata
-	
-	# ================================================
-	# === Generate Per-Face UV Coords (VMAD Chunk) ===
-	# ================================================
-	def generate_vmad_uv(self, mesh):
-		alldata = []
-		layers = mesh.uv_layers
-		for l in layers:
-			uvname = self.generate_nstring(l.name)
-			data = io.BytesIO()
-			data.write(b"TXUV")										 # type
-			data.write(struct.pack(">H", 2))						 # dimension
-			data.write(bytes(uvname, 'UTF-8')) # name
-			
-			found = False
-			for i, p in enumerate(mesh.polygons):
-				for v, loop in zip(p.vertices, p.loop_indices):
-					searchl = list(p.loop_indices)
-					searchl.extend(list(p.loop_indices))
-					pos = searchl.index(loop)
-					prevl = searchl[pos - 1]
-					nextl = searchl[pos + 1]
-					youv = l.data[loop].uv
-					if l.data[prevl].uv == youv == l.data[nextl].uv:
-						continue
-					data.write(self.generate_vx(v)) # vertex index
-					data.write(self.generate_vx(i)) # face index
-					data.write(struct.pack(">ff", youv[0], youv[1]))
-					found = True
-			if found:
-				alldata.append(data.getvalue())
-				
-		return alldata
-	
-	# ================================================
-	# === Generate Edge Weights (VMAD Chunk) ===
-	# ================================================
-	def generate_vmad_ew(self, mesh):
-		data = io.BytesIO()
-		data.write(b"WGHT")										 # type
-		data.write(struct.pack(">H", 1))						 # dimension
-		data.write(bytes(self.generate_nstring("Edge Weight"), 'UTF-8')) # name
-		face_edge_map = {ek: mesh.edges[i] for i, ek in enumerate(mesh.edge_keys)}
-		for i, p in enumerate(mesh.polygons):
-			vs = list(p.vertices)
-			for ek in p.edge_keys:
-				edge = face_edge_map[ek]
-				if edge.crease == 0:
-					continue
-				v1, v2 = edge.vertices
-				if vs[vs.index(v1) - 1] == v2:
-					vi = v1
-				else:
-					vi = v2
-				data.write(self.generate_vx(vi)) # vertex index
-				data.write(self.generate_vx(i)) # face index
-				data.write(struct.pack(">f", edge.crease))
-					
-		return data.getvalue()
-	
-	# ================================================
-	# === Generate Endomorphs (VMAP Chunk) ===
-	# ================================================
-	def generate_vmap_morph(self, mesh):
-		alldata = []
-		keyblocks = mesh.shape_keys.key_blocks
-		for kb in keyblocks:
-			emname = self.generate_nstring(kb.name)
-			data = io.BytesIO()
-			data.write(b"MORF")										 # type
-			data.write(struct.pack(">H", 3))						 # dimension
-			data.write(bytes(emname, 'UTF-8')) # name
-			for i, v in enumerate(mesh.vertices):
-				x, y, z = kb.data[v.index].co - v.co
-				data.write(self.generate_vx(v.index)) # vertex index
-				data.write(struct.pack(">fff", x, z, y))
-			alldata.append(data.getvalue())
-					
-		return alldata
-	
-	# ================================================
-	# === Generate Weightmap (VMAP Chunk) ===
-	# ================================================
-	def generate_vmap_weight(self, obj):
-		alldata = []
-		vgroups = obj.vertex_groups
-		for vg in vgroups:
-			vgname = self.generate_nstring(vg.name)
-			data = io.BytesIO()
-			data.write(b"WGHT")										 # type
-			data.write(struct.pack(">H", 1))						 # dimension
-			data.write(bytes(vgname, 'UTF-8')) # name
-			for i, v in enumerate(obj.data.vertices):
-				w = 0.0
-				try:
-					w = vg.weight(v.index)
-				except:
-					pass
-				data.write(self.generate_vx(v.index)) # vertex index
-				data.write(struct.pack(">f", w))
-			alldata.append(data.getvalue())
-					
-		return alldata
-	
-	# ======================================
-	# === Generate Variable-Length Index ===
-	# ======================================
-	def generate_vx(self, index):
-		if index < 0xFF00:
-			value = struct.pack(">H", index)				 # 2-byte index
-		else:
-			value = struct.pack(">L", index | 0xFF000000)	 # 4-byte index
-		return value
-	
-	# ===================================
-	# === Generate Faces (POLS Chunk) ===
-	# ===================================
-	def generate_pols(self, mesh, subd):
-		data = io.BytesIO()
-		if subd:
-			data.write(b"SUBD") # subpatch polygon type
-		else:
-			data.write(b"FACE") # normal polygon type
-		for i,p in enumerate(mesh.polygons):
-			data.write(struct.pack(">H", len(p.vertices))) # numfaceverts
-			numfaceverts = len(p.vertices)
-			p_vi = p.vertices
-			for j in range(numfaceverts-1, -1, -1):			# Reverse order
-				data.write(self.generate_vx(p_vi[j]))
-		bm = bmesh.new()
-		bm.from_mesh(mesh)
-		for e in bm.edges:
-			if len(e.link_faces) == 0:
-				data.write(struct.pack(">H", 2))
-				data.write(self.generate_vx(e.verts[0].index))
-				data.write(self.generate_vx(e.verts[1].index))		
-		bm.to_mesh(mesh)
-		
-		return data.getvalue()
-	
-	# =================================================
-	# === Generate Polygon Tag Mapping (PTAG Chunk) ===
-	# =================================================
-	def generate_ptag(self, mesh, material_names):
-		data = io.BytesIO()
-		data.write(b"SURF")
-		for poly in mesh.polygons:
-			if mesh.materials:
-				matindex = poly.material_index
-				matname = mesh.materials[matindex].name
-				surfindex = material_names.index(matname)
-				
-				data.write(self.generate_vx(poly.index))
-				data.write(struct.pack(">H", surfindex)) 
-			else:
-				data.write(self.generate_vx(poly.index))
-				data.write(struct.pack(">H", 0)) 
-		return data.getvalue()
-	
-	# ===================================================
 	# === Generate VC Surface Definition (SURF Chunk) ===
 	# ===================================================
 	"""
 	def generate_vcol_surf(mesh):
 		data = io.BytesIO()
 		if len(mesh.vertex_colors):
-			surface_name = self.generate_nstring(self.VCOL_NAME)
+			surface_name = lwo_core.generate_nstring(self.VCOL_NAME)
 		data.write(surface_name)
 		data.write(b"\0\0")
 	
@@ -855,285 +624,16 @@ class LwoExport(bpy.types.Operator, ExportHelper):
 		data.write(b"VCOL")
 		data.write(struct.pack(">H", 34))
 		data.write(struct.pack(">fH4s", 1.0, 0, "RGB "))  # intensity, envelope, type
-		data.write(bytes(map(ord, self.generate_nstring(mesh.vert_colors.active.name)))) # name
+		data.write(bytes(map(ord, lwo_core.generate_nstring(mesh.vert_colors.active.name)))) # name
 	
 		data.write(b"CMNT") # material comment
 		comment = "Vertex Colors: Exported from Blender\256 2.70"
-		comment = self.generate_nstring(comment)
+		comment = lwo_core.generate_nstring(comment)
 		data.write(struct.pack(">H", len(comment)))
 		data.write(bytes(map(ord, comment)))
 		return data.getvalue()
 	"""
 	
-	# ================================================
-	# === Generate Surface Definition (SURF Chunk) ===
-	# ================================================
-	def generate_surf(self, mesh, material_name):
-		data = io.BytesIO()
-		data.write(bytes(self.generate_nstring(material_name), 'UTF-8'))
-		
-		try:
-			material = bpy.data.materials.get(material_name)
-			R,G,B = material.diffuse_color[0], material.diffuse_color[1], material.diffuse_color[2]
-			diff = material.diffuse_intensity
-			lumi = material.emit
-			spec = material.specular_intensity
-			gloss = math.sqrt((material.specular_hardness - 4) / 400)
-			if material.raytrace_mirror.use:
-				refl = material.raytrace_mirror.reflect_factor
-			else:
-				refl = 0.0
-			rblr = 1.0 - material.raytrace_mirror.gloss_factor
-			rind = material.raytrace_transparency.ior
-			tran = 1.0 - material.alpha
-			tblr = 1.0 - material.raytrace_transparency.gloss_factor
-			trnl = material.translucency
-			if mesh.use_auto_smooth:
-				sman = mesh.auto_smooth_angle
-			else:
-				sman = 0.0
-			
-			
-		except:
-			material = None
-			
-			R=G=B = 1.0
-			diff = 1.0
-			lumi = 0.0
-			spec = 0.2
-			hard = 0.0
-			gloss = 0.0
-			refl = 0.0
-			rblr = 0.0
-			rind = 1.0
-			tran = 0.0
-			tblr = 0.0
-			trnl = 0.0
-			sman = 0.0
-		
-			
-		data.write(b"COLR")
-		data.write(struct.pack(">H", 0))
-		
-		data.write(b"COLR")
-		data.write(struct.pack(">H", 14))
-		data.write(struct.pack(">fffH", R, G, B, 0))
-	
-		data.write(b"DIFF")
-		data.write(struct.pack(">H", 6))
-		data.write(struct.pack(">fH", diff, 0))
-	
-		data.write(b"LUMI")
-		data.write(struct.pack(">H", 6))
-		data.write(struct.pack(">fH", lumi, 0))
-	
-		data.write(b"SPEC")
-		data.write(struct.pack(">H", 6))
-		data.write(struct.pack(">fH", spec, 0))
-	
-		if not(self.option_idtech):
-			data.write(b"REFL")
-			data.write(struct.pack(">H", 6))
-			data.write(struct.pack(">fH", refl, 0))
-		
-			data.write(b"RBLR")
-			data.write(struct.pack(">H", 6))
-			data.write(struct.pack(">fH", rblr, 0))
-		
-			data.write(b"TRAN")
-			data.write(struct.pack(">H", 6))
-			data.write(struct.pack(">fH", tran, 0))
-		
-			data.write(b"RIND")
-			data.write(struct.pack(">H", 6))
-			data.write(struct.pack(">fH", rind, 0))
-			
-			data.write(b"TBLR")
-			data.write(struct.pack(">H", 6))
-			data.write(struct.pack(">fH", tblr, 0))
-			
-			data.write(b"TRNL")
-			data.write(struct.pack(">H", 6))
-			data.write(struct.pack(">fH", trnl, 0))
-		
-		data.write(b"GLOS")
-		data.write(struct.pack(">H", 6))
-		data.write(struct.pack(">fH", gloss, 0))
-	
-		if material:
-			vcname = material.vcmenu
-			if vcname != "<none>":
-				data.write(b"VCOL")
-				data_tmp = io.BytesIO()
-				data_tmp.write(struct.pack(">fH4s", 1.0, 0, b"RGBA"))  # intensity, envelope, type
-				data_tmp.write(bytes(self.generate_nstring(vcname), 'UTF-8')) # name
-				data.write(struct.pack(">H", len(data_tmp.getvalue())))
-				data.write(data_tmp.getvalue())
-	
-		data.write(b"SMAN")
-		data.write(struct.pack(">H", 4))
-		if self.option_idtech:
-			data.write(struct.pack(">f", sman))
-		elif self.option_smooth:
-			data.write(struct.pack(">f", sman))
-		else:
-			data.write(struct.pack(">f", 0))
-	
-#		data.write(b"SIDE")
-#		data.write(struct.pack(">H", 2))
-#		data.write(struct.pack(">H", 3))
-	
-		if not(self.option_idtech):
-			# Check if the material contains any image maps
-			def make_ord(nbloks, index):
-				i = 8
-				d = 16
-				while i < 128:
-					if i >= nbloks:
-						break;
-					d /= 2
-					i *= 2
-				ordinal  = int(128 + index * d)
-				return ordinal
-	
-			if material:
-				mtextures = list(material.texture_slots)	# Get a list of textures linked to the material
-				for mtex in mtextures:
-					if mtex:
-						tex = mtex.texture
-						if (tex.type == 'IMAGE'):	# Check if the texture is of type "IMAGE"
-							path = tex.image.filepath
-							if path in self.clippaths:
-								clipid = self.clippaths.index(path)
-							else:
-								self.clippaths.append(path)
-								clipid = self.currclipid
-								self.clips.append(self.generate_clip(path))
-								
-							def write_tex_blok(data, channel, opac):
-								data.write(b"BLOK")		# Surface BLOK header
-				
-								# IMAP subchunk (image map sub header)
-								data_blok = io.BytesIO()
-								data_blok.write(b"IMAP")					
-								data_tmp = io.BytesIO()
-								data_tmp.write(struct.pack(">B", make_ord(len(mtextures), clipid)))  # ordinal string
-								data_tmp.write(struct.pack(">B", 0))
-								data_tmp.write(b"CHAN")
-								data_tmp.write(struct.pack(">H", 4))
-								data_tmp.write(bytes(channel, 'UTF-8'))
-								opactype = 0
-								if mtex.blend_type == 'SUBTRACT':
-									opactype = 1
-								elif mtex.blend_type == 'DIFFERENCE':
-									opactype = 2
-								elif mtex.blend_type == 'MULTIPLY':
-									opactype = 3
-								elif mtex.blend_type == 'DIVIDE':
-									opactype = 4
-								elif mtex.blend_type == 'ADD':
-									opactype = 7
-								data_tmp.write(b"OPAC")				  # Hardcoded texture layer opacity
-								data_tmp.write(struct.pack(">H", 8))
-								data_tmp.write(struct.pack(">H", opactype))
-								data_tmp.write(struct.pack(">f", opac))
-								data_tmp.write(struct.pack(">H", 0))
-								data_tmp.write(b"ENAB")
-								data_tmp.write(struct.pack(">HH", 2, 1))  # 1 = texture layer enabled
-								nega = mtex.invert
-								data_tmp.write(b"NEGA")
-								data_tmp.write(struct.pack(">HH", 2, nega))  # Disable negative image (1 = invert RGB values)
-								data_tmp.write(b"AXIS")
-								data_tmp.write(struct.pack(">HH", 2, 1))
-								data_blok.write(struct.pack(">H", len(data_tmp.getvalue())))
-								data_blok.write(data_tmp.getvalue())
-				
-								# IMAG subchunk
-								data_blok.write(b"IMAG")
-								data_blok.write(struct.pack(">HH", 2, clipid))
-								data_blok.write(b"PROJ")
-								data_blok.write(struct.pack(">HH", 2, 5)) # UV projection
-				
-								data_blok.write(b"VMAP")
-								uvname = self.generate_nstring(mtex.uv_layer)
-								data_blok.write(struct.pack(">H", len(uvname)))
-								data_blok.write(bytes(uvname, 'UTF-8'))
-			
-								data.write(struct.pack(">H", len(data_blok.getvalue())))
-								data.write(data_blok.getvalue())
-								
-								return data
-			
-							if mtex.use_map_color_diffuse:
-								opac = mtex.diffuse_color_factor
-								write_tex_blok(data, "COLR", opac)
-								
-							if mtex.use_map_diffuse:
-								opac = mtex.diffuse_factor
-								write_tex_blok(data, "DIFF", opac)
-								
-							if mtex.use_map_emit:
-								opac = mtex.emit_factor
-								write_tex_blok(data, "LUMI", opac)
-								
-							if mtex.use_map_specular:
-								opac = mtex.specular_factor
-								write_tex_blok(data, "SPEC", opac)
-								
-							if mtex.use_map_hardness:
-								opac = mtex.hardness_factor
-								write_tex_blok(data, "GLOS", opac)
-								
-							if mtex.use_map_raymir:
-								opac = mtex.raymir_factor
-								write_tex_blok(data, "REFL", opac)
-								
-							if mtex.use_map_alpha:
-								opac = mtex.alpha_factor
-								write_tex_blok(data, "TRAN", opac)
-								
-							if mtex.use_map_translucency:
-								opac = mtex.translucency_factor
-								write_tex_blok(data, "TRNL", opac)
-								
-	#						if mtex.use_map_normal:
-	#							opac = mtex.normal_factor
-	#							write_tex_blok(data, "BUMP", opac)
-				
-		return data.getvalue()
-	
-	# =============================================
-	# === Generate Default Surface (SURF Chunk) ===
-	# =============================================
-	def generate_default_surf(self):
-		data = io.BytesIO()
-		material_name = self.DEFAULT_NAME
-		data.write(bytes(self.generate_nstring(material_name), 'UTF-8'))
-	
-		data.write(b"COLR")
-		data.write(struct.pack(">H", 14))
-		data.write(struct.pack(">fffH", 0.9, 0.9, 0.9, 0))
-	
-		data.write(b"DIFF")
-		data.write(struct.pack(">H", 6))
-		data.write(struct.pack(">fH", 0.8, 0))
-	
-		data.write(b"LUMI")
-		data.write(struct.pack(">H", 6))
-		data.write(struct.pack(">fH", 0, 0))
-	
-		data.write(b"SPEC")
-		data.write(struct.pack(">H", 6))
-		data.write(struct.pack(">fH", 0.4, 0))
-	
-		data.write(b"GLOS")
-		data.write(struct.pack(">H", 6))
-		gloss = 50 / (255/2.0)
-		gloss = round(gloss, 1)
-		data.write(struct.pack(">fH", gloss, 0))
-	
-		return data.getvalue()
-	
 	# ==================================================
 	# === Generate Thumbnail Icon Image (ICON Chunk) ===
 	# ==================================================
@@ -1150,39 +650,18 @@ class LwoExport(bpy.types.Operator, ExportHelper):
 		return data.getvalue()
 	"""
 	
-	# ===============================================
-	# === Generate CLIP chunk with STIL subchunks ===
-	# ===============================================
-	def generate_clip(self, pathname):
-		data = io.BytesIO()
-		pathname = pathname[0:2] + pathname.replace("\\", "/")[2:]	# Convert to Modo standard path
-		imagename = self.generate_nstring(pathname)
-		data.write(struct.pack(">L", self.currclipid))						# CLIP sequence/id
-		data.write(b"STIL")											# STIL image
-		data.write(struct.pack(">H", len(imagename)))				# Size of image name
-		data.write(bytes(imagename, 'UTF-8'))
-		self.currclipid += 1
-		return data.getvalue()
-	
-	# ===================
-	# === Write Chunk ===
-	# ===================
-	def write_chunk(self, file, name, data):
-		file.write(bytes(name, 'UTF-8'))
-		file.write(struct.pack(">L", len(data)))
-		file.write(data)
-	
-	# =============================
-	# === Write LWO File Header ===
-	# =============================
-	def write_header(self, file, chunks):
-		chunk_sizes = map(len, chunks)
-		chunk_sizes = functools.reduce(operator.add, chunk_sizes)
-		form_size = chunk_sizes + len(chunks)*8 + len("FORM")
-		file.write(b"FORM")
-		file.write(struct.pack(">L", form_size))
-		file.write(b"LWO2")
-	
+# export objects without the user interface, e.g. from a background Blender;
+# options are the operator's option_* properties
+def export(filepath, objects, **options):
+	if 'bl_rna' not in LwoExport.__dict__:	# not registered yet
+		register()
+
+	objects = list(objects)
+	meshes = [obj for obj in objects if obj.type == 'MESH']
+	override = bpy.context.copy()
+	override['selected_objects'] = objects
+	override['active_object'] = meshes[0] if meshes else None	# poll wants an active mesh
+	return bpy.ops.export.lwo(override, 'EXEC_DEFAULT', filepath = filepath, **options)
 
 def menu_func(self, context):
 	self.layout.operator(LwoExport.bl_idname, text="Lightwave (.lwo)")
@@ -0,0 +1,613 @@
+## ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+"""
+--  Converts LightWave objects (.lwo) to ASCII Scene Export files (.ase) and
+--  back without Blender, so an asset exported once is available in both
+--  formats. Files are read chunk by chunk or line by line into the plain
+--  data of the exporters and written by their encoders in ase_core.py and
+--  lwo_core.py.
+--  The direction follows the extension of every input file:
+--      python lwo_ase_convert.py "models/**/*.lwo" --out ase
+--      python lwo_ase_convert.py models/*.ase --out lwo --idtech
+--  The folders below the start of a pattern are mirrored in --out. Files
+--  that would overwrite an input or each other stop the run before any
+--  file is converted.
+
+--  Points, polygons, surfaces, UV maps, vertex colors and normals carry
+--  over; polygons are triangulated for ASE. LightWave has no smoothing
+--  groups: edges sharper than a surface's smoothing angle separate them
+--  in ASE, and ASE normals become loop normals in LWO. Weight maps, morphs,
+--  edge weights, image clips and two point polygons are not converted.
+
+--  Keep this file next to ase_core.py, lwo_core.py, mesh_snapshot.py and
+--  export_cli.py.
+"""
+
+import os
+import sys
+import glob
+import math
+import struct
+import argparse
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from mesh_snapshot import snapshotPolygons
+from export_cli import patternRoot
+import ase_core
+import lwo_core
+
+#== Error ==================================================================
+class ConvertError( Exception ):
+    pass
+
+#== LightWave Input ========================================================
+# Top level chunks of an LWO2 file as ( id, data ), read one at a time
+def lwoChunks( file ):
+    header = file.read( 12 )
+    if len( header ) < 12 or header[0:4] != b'FORM' or header[8:12] != b'LWO2':
+        raise ConvertError( 'not an LWO2 file' )
+    while True:
+        head = file.read( 8 )
+        if len( head ) < 8:
+            return
+        name, size = struct.unpack( '>4sL', head )
+        data = file.read( size )
+        if len( data ) < size:
+            raise ConvertError( 'truncated {0} chunk'.format( name.decode( 'ascii', 'replace' ) ) )
+        if size % 2:
+            file.read( 1 ) # chunks are padded to an even size
+        yield name, data
+
+# Null terminated string padded to an even length, and the offset after it
+def readString( data, offset ):
+    end = data.index( b'\0', offset )
+    return data[offset:end].decode( 'utf-8', 'replace' ), end + 2 - ( end - offset ) % 2
+
+# Variable length index, and the offset after it
+def readVX( data, offset ):
+    if data[offset] == 0xFF:
+        return struct.unpack_from( '>L', data, offset )[0] & 0xFFFFFF, offset + 4
+    return struct.unpack_from( '>H', data, offset )[0], offset + 2
+
+# Big-endian floats of a whole chunk
+def readFloats( data ):
+    values = array( 'f' )
+    values.frombytes( data[:len( data ) // 4 * 4] )
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+# LightWave x, z, y becomes Blender x, y, z, the same swap back and forth
+def blenderVectors( values ):
+    vectors = array( 'f', values )
+    vectors[1::3] = values[2::3]
+    vectors[2::3] = values[1::3]
+    return vectors
+
+# Everything read for one LWO layer, as the chunks store it
+class LayerData:
+    def __init__( self, name, index ):
+        self.name = name
+        self.index = index
+        self.co = array( 'f' )
+        self.polygons = []              # vertex indices in Blender's order
+        self.tags = []                  # TAGS index of every polygon
+        self.base = None                # first polygon of the last face POLS
+        self.uvs = OrderedDict()        # name -> ( per vertex, per polygon corner )
+        self.colors = OrderedDict()
+        self.normals = None
+
+def readPolygons( layer, data ):
+    if data[0:4] not in ( b'FACE', b'PTCH', b'SUBD' ):
+        layer.base = None # bones, curves and the like, tags refer to them
+        return
+    layer.base = len( layer.polygons )
+    offset = 4
+    while offset < len( data ):
+        count = struct.unpack_from( '>H', data, offset )[0] & 0x03FF # the upper bits are flags
+        offset += 2
+        polygon = []
+        for corner in range( count ):
+            vertex, offset = readVX( data, offset )
+            polygon.append( vertex )
+        polygon.reverse() # LightWave polygons run clockwise
+        layer.polygons.append( polygon )
+    layer.tags.extend( [0] * ( len( layer.polygons ) - layer.base ) )
+
+def readPolygonTags( layer, data ):
+    if data[0:4] != b'SURF' or layer.base is None:
+        return
+    offset = 4
+    while offset < len( data ):
+        polygon, offset = readVX( data, offset )
+        layer.tags[layer.base + polygon] = struct.unpack_from( '>H', data, offset )[0]
+        offset += 2
+
+# VMAP or VMAD records, keyed by vertex or by ( vertex, polygon )
+def readVertexMap( layer, data, per_polygon ):
+    kind = data[0:4]
+    dimension = struct.unpack_from( '>H', data, 4 )[0]
+    name, offset = readString( data, 6 )
+    if kind == b'TXUV':
+        maps = layer.uvs.setdefault( name, ( {}, {} ) )
+    elif kind in ( b'RGB ', b'RGBA' ):
+        maps = layer.colors.setdefault( name, ( {}, {} ) )
+    elif kind == b'NORM':
+        if layer.normals is None:
+            layer.normals = ( {}, {} )
+        maps = layer.normals
+    else:
+        return # weights, morphs and such are not converted
+    if per_polygon and layer.base is None:
+        return
+
+    values = maps[1] if per_polygon else maps[0]
+    record = struct.Struct( '>%df' % dimension )
+    while offset < len( data ):
+        vertex, offset = readVX( data, offset )
+        if per_polygon:
+            polygon, offset = readVX( data, offset )
+            key = ( vertex, layer.base + polygon )
+        else:
+            key = vertex
+        values[key] = record.unpack_from( data, offset )
+        offset += record.size
+
+# Surface values in the same fields the LWO exporter writes them from
+surfaceScalars = { b'DIFF': 'diff', b'LUMI': 'lumi', b'SPEC': 'spec', b'GLOS': 'gloss', b'REFL': 'refl',
+                   b'RBLR': 'rblr', b'RIND': 'rind', b'TRAN': 'tran', b'TBLR': 'tblr', b'TRNL': 'trnl',
+                   b'SMAN': 'sman' }
+
+def readSurface( data ):
+    name, offset = readString( data, 0 )
+    surface = lwo_core.LwoSurface( name )
+    # The source name is left out by some writers, then an attribute follows
+    if not data[offset:offset + 4].isupper():
+        source, offset = readString( data, offset )
+    while offset + 6 <= len( data ):
+        kind, size = struct.unpack_from( '>4sH', data, offset )
+        offset += 6
+        body = data[offset:offset + size]
+        offset += size + size % 2
+        if kind == b'COLR' and size >= 12:
+            surface.color = struct.unpack_from( '>3f', body )
+        elif kind in surfaceScalars and size >= 4:
+            setattr( surface, surfaceScalars[kind], struct.unpack_from( '>f', body )[0] )
+        elif kind == b'VCOL' and size >= 10:
+            envelope, start = readVX( body, 4 )
+            surface.vcol = readString( body, start + 4 )[0]
+    return surface
+
+# Read a whole LWO2 file into its tags, surfaces by name and layers
+def readLwo( filename ):
+    tags = []
+    surfaces = {}
+    layers = []
+    with open( filename, 'rb' ) as file:
+        for name, data in lwoChunks( file ):
+            if name == b'TAGS':
+                offset = 0
+                while offset < len( data ):
+                    tag, offset = readString( data, offset )
+                    tags.append( tag )
+            elif name == b'LAYR':
+                index = struct.unpack_from( '>H', data, 0 )[0]
+                layers.append( LayerData( readString( data, 16 )[0] or 'Layer' + str( index ), index ) )
+            elif name == b'SURF':
+                surface = readSurface( data )
+                surfaces[surface.name] = surface
+            elif name in ( b'PNTS', b'POLS', b'PTAG', b'VMAP', b'VMAD' ):
+                if not layers:
+                    layers.append( LayerData( os.path.splitext( os.path.basename( filename ) )[0], 0 ) )
+                layer = layers[-1]
+                if name == b'PNTS':
+                    layer.co.extend( blenderVectors( readFloats( data ) ) )
+                elif name == b'POLS':
+                    readPolygons( layer, data )
+                elif name == b'PTAG':
+                    readPolygonTags( layer, data )
+                else:
+                    readVertexMap( layer, data, name == b'VMAD' )
+    return tags, surfaces, layers
+
+#== ASE Output =============================================================
+# Material values of a surface, the inverse of what the LWO exporter writes
+def surfaceMaterial( surface ):
+    data = ase_core.cMaterialData( surface.name )
+    data.diffuse_color = tuple( surface.color )
+    data.specular_intensity = surface.spec
+    data.specular_hardness = int( round( surface.gloss ** 2 * 400 + 4 ) )
+    data.translucency = surface.trnl
+    data.alpha = 1.0 - surface.tran
+    data.emit = surface.lumi
+    return data
+
+# Per loop values of a vertex map, corner values over vertex values
+def loopValues( maps, triangles, width ):
+    per_vertex, per_polygon = maps
+    default = ( 0.0, ) * width
+    values = array( 'f' )
+    for polygon, vertices in triangles:
+        for vertex in vertices:
+            value = per_polygon.get( ( vertex, polygon ) )
+            if value is None:
+                value = per_vertex.get( vertex, default )
+            values.extend( value[:width] )
+    return values
+
+# Split a layer into triangulated snapshots, one per surface unless all
+# go into one object. Returns ( name, tag, snapshot ) of every piece.
+def layerPieces( layer, smoothing_angles, separate ):
+    groups = OrderedDict()
+    for polygon, vertices in enumerate( layer.polygons ):
+        tag = layer.tags[polygon]
+        for corner in range( 1, len( vertices ) - 1 ): # fans, shorter polygons give none
+            triangle = ( polygon, ( vertices[0], vertices[corner], vertices[corner + 1] ) )
+            groups.setdefault( tag if separate else None, [] ).append( triangle )
+
+    pieces = []
+    for number, ( tag, triangles ) in enumerate( sorted( groups.items(), key = lambda item: item[0] or 0 ) ):
+        # Only the vertices this piece uses, in order of first use
+        remap = {}
+        co = array( 'f' )
+        faces = []
+        for polygon, vertices in triangles:
+            for vertex in vertices:
+                if vertex not in remap:
+                    remap[vertex] = len( remap )
+                    co.extend( layer.co[vertex * 3:vertex * 3 + 3] )
+            faces.append( [remap[vertex] for vertex in vertices] )
+
+        snapshot = snapshotPolygons( co, faces )
+        snapshot.polygon_material_index = array( 'i', [layer.tags[polygon] for polygon, vertices in triangles] )
+        for name, maps in layer.uvs.items():
+            snapshot.uv_layers.append( ( name, loopValues( maps, triangles, 2 ) ) )
+        for name, maps in layer.colors.items():
+            snapshot.vertex_colors.append( ( name, loopValues( maps, triangles, 3 ) ) )
+        if layer.normals is not None:
+            normals = blenderVectors( loopValues( layer.normals, triangles, 3 ) )
+            for loop in range( snapshot.loop_count ):
+                x, y, z = normals[loop * 3:loop * 3 + 3]
+                length = math.sqrt( x * x + y * y + z * z ) or 1.0 # written scaled with the mesh
+                snapshot.loop_normal[loop * 3:loop * 3 + 3] = array( 'f', ( x / length, y / length, z / length ) )
+        markSharpEdges( snapshot, smoothing_angles )
+
+        name = layer.name if number == 0 else '{0}.{1:03d}'.format( layer.name, number )
+        pieces.append( ( name, tag or 0, snapshot ) )
+    return pieces
+
+# Edges between faces at a greater angle than their surfaces' smoothing
+# angle are sharp, which separates smoothing groups. A smoothing angle of
+# zero is what the LWO exporter writes without auto smooth, it marks none.
+def markSharpEdges( snapshot, smoothing_angles ):
+    normals = snapshot.polygon_normal
+    edge_faces = {}
+    for face in range( snapshot.polygon_count ):
+        for edge in snapshot.loop_edge_index[face * 3:face * 3 + 3]:
+            other = edge_faces.setdefault( edge, face )
+            if other == face:
+                continue
+            limit = min( smoothing_angles.get( snapshot.polygon_material_index[face], 0.0 ),
+                         smoothing_angles.get( snapshot.polygon_material_index[other], 0.0 ) )
+            if limit > 0.0:
+                cosine = sum( normals[face * 3 + axis] * normals[other * 3 + axis] for axis in range( 3 ) )
+                if cosine < math.cos( limit ):
+                    snapshot.edge_sharp[edge] = 1
+
+def lwoToAse( source, target, arguments ):
+    tags, surfaces, layers = readLwo( source )
+    if not tags:
+        tags = ['']
+    surface_list = [surfaces.get( name ) or lwo_core.LwoSurface( name ) for name in tags]
+    material_list = [surfaceMaterial( surface ) for surface in surface_list]
+    smoothing_angles = dict( enumerate( surface.sman for surface in surface_list ) )
+
+    if arguments.submaterials:
+        materials = ase_core.cSubMaterials( material_list )
+    else:
+        materials = ase_core.cMultiMaterials( material_list )
+    preamble = str( ase_core.cHeader() ) + str( ase_core.cScene( os.path.basename( source ) ) ) + str( materials )
+
+    records = []
+    for layer in layers:
+        for name, tag, snapshot in layerPieces( layer, smoothing_angles, not arguments.multi_materials ):
+            record = ase_core.cExportObject( name, snapshot )
+            record.material_ids = list( range( len( tags ) ) )
+            record.material_id = tag
+            records.append( record )
+
+    options = ase_core.cOptions( scale = arguments.scale,
+                                 smoothing_groups = not arguments.no_smoothing,
+                                 allow_multi_mats = arguments.multi_materials )
+    ase_core.writeAse( target, preamble, records, options )
+
+#== ASE Input ==============================================================
+# Everything read for one *GEOMOBJECT
+class GeomData:
+    def __init__( self ):
+        self.name = 'Object'
+        self.co = array( 'f' )
+        self.faces = []                 # vertex indices of every face
+        self.face_materials = []        # *MESH_MTLID of every face
+        self.channels = OrderedDict()   # mapping channel -> ( tverts, tfaces )
+        self.cverts = []
+        self.cfaces = []
+        self.face_normals = array( 'f' )
+        self.loop_normals = array( 'f' )
+        self.material_ref = 0
+
+# Numbers after the keyword of a line, * and : separated fields included
+def aseNumbers( fields, start = 1, count = 3 ):
+    return [float( field ) for field in fields[start:start + count]]
+
+# Stream an ASE file into its material list and objects. Materials are
+# ( name, diffuse, shine, shine strength, self illumination, submaterials )
+# dicts; objects are handed to found( geom, materials ) as soon as they
+# are read, the material list comes first in ASE files.
+def readAse( filename, found ):
+    materials = []
+    stack = []
+    geom = None
+    channel = 1
+    with open( filename, 'r', errors = 'replace' ) as file:
+        for line in file:
+            fields = line.split()
+            if not fields:
+                continue
+            keyword = fields[0]
+            if keyword == '}':
+                block = stack.pop() if stack else None
+                if block == '*GEOMOBJECT':
+                    found( geom, materials )
+                    geom = None
+                elif block == '*MESH_MAPPINGCHANNEL':
+                    channel = 1
+                continue
+            if fields[-1] == '{':
+                stack.append( keyword )
+                if keyword == '*GEOMOBJECT':
+                    geom = GeomData()
+                elif keyword == '*MATERIAL' and stack[:-1] == ['*MATERIAL_LIST']:
+                    materials.append( { 'name': '', 'submaterials': [] } )
+                elif keyword == '*SUBMATERIAL' and materials:
+                    materials[-1]['submaterials'].append( { 'name': '', 'submaterials': [] } )
+                elif keyword == '*MESH_MAPPINGCHANNEL':
+                    channel = int( fields[1] )
+                continue
+
+            if stack and stack[-1] in ( '*MATERIAL', '*SUBMATERIAL' ) and materials:
+                material = materials[-1]['submaterials'][-1] if stack[-1] == '*SUBMATERIAL' else materials[-1]
+                if keyword == '*MATERIAL_NAME':
+                    material['name'] = line.split( '"' )[1] if '"' in line else fields[1]
+                elif keyword == '*MATERIAL_DIFFUSE':
+                    material['diffuse'] = aseNumbers( fields )
+                elif keyword in ( '*MATERIAL_SHINE', '*MATERIAL_SHINESTRENGTH', '*MATERIAL_SELFILLUM' ):
+                    material[keyword] = float( fields[1] )
+            elif geom is None:
+                continue
+            elif keyword == '*NODE_NAME':
+                geom.name = line.split( '"' )[1] if '"' in line else fields[1]
+            elif keyword == '*MESH_VERTEX':
+                geom.co.extend( aseNumbers( fields, 2 ) )
+            elif keyword == '*MESH_FACE':
+                corners = dict( zip( fields[2:8:2], fields[3:8:2] ) )
+                geom.faces.append( ( int( corners['A:'] ), int( corners['B:'] ), int( corners['C:'] ) ) )
+                material = 0
+                if '*MESH_MTLID' in fields[:-1]:
+                    material = int( fields[fields.index( '*MESH_MTLID' ) + 1] )
+                geom.face_materials.append( material )
+            elif keyword == '*MESH_TVERT':
+                geom.channels.setdefault( channel, ( [], [] ) )[0].append( aseNumbers( fields, 2, 2 ) )
+            elif keyword == '*MESH_TFACE':
+                geom.channels.setdefault( channel, ( [], [] ) )[1].append( [int( field ) for field in fields[2:5]] )
+            elif keyword == '*MESH_VERTCOL':
+                geom.cverts.append( aseNumbers( fields, 2 ) )
+            elif keyword == '*MESH_CFACE':
+                geom.cfaces.append( [int( field ) for field in fields[2:5]] )
+            elif keyword == '*MESH_FACENORMAL':
+                geom.face_normals.extend( aseNumbers( fields, 2 ) )
+            elif keyword == '*MESH_VERTEXNORMAL':
+                geom.loop_normals.extend( aseNumbers( fields, 2 ) )
+            elif keyword == '*MATERIAL_REF':
+                geom.material_ref = int( fields[1] )
+    return materials
+
+#== LightWave Output =======================================================
+# The material list as TAGS, submaterials in place of their parent, and
+# the first tag of every material
+def materialTags( materials ):
+    tags = []
+    first = []
+    for material in materials:
+        first.append( len( tags ) )
+        tags.extend( material['submaterials'] or [material] )
+    return tags, first
+
+def materialSurface( material ):
+    surface = lwo_core.LwoSurface( material['name'] )
+    if 'diffuse' in material:
+        surface.color = tuple( material['diffuse'] )
+    surface.spec = material.get( '*MATERIAL_SHINESTRENGTH', surface.spec )
+    hardness = material.get( '*MATERIAL_SHINE', 0.0 ) * 511
+    surface.gloss = math.sqrt( max( hardness - 4, 0 ) / 400 )
+    surface.lumi = material.get( '*MATERIAL_SELFILLUM', surface.lumi )
+    return surface
+
+# The ASE exporter writes the index into the whole material list as
+# *MESH_MTLID, or into the submaterials of *MATERIAL_REF. Other writers
+# may leave it at zero, then the object's material counts.
+def faceTag( geom, material, materials, first, count ):
+    if geom.material_ref < len( materials ):
+        submaterials = materials[geom.material_ref]['submaterials']
+        if submaterials:
+            return first[geom.material_ref] + material % len( submaterials )
+        if 0 < material < count:
+            return material
+        return first[geom.material_ref]
+    return material if material < count else 0
+
+def geomLayer( geom, index, materials ):
+    tags, first = materialTags( materials )
+    snapshot = snapshotPolygons( geom.co, geom.faces )
+    snapshot.polygon_material_index = array( 'i', [faceTag( geom, material, materials, first, len( tags ) )
+                                                   for material in geom.face_materials] )
+    for channel, ( tverts, tfaces ) in geom.channels.items():
+        if len( tfaces ) != snapshot.polygon_count:
+            continue
+        uvs = array( 'f' )
+        for tface in tfaces:
+            for tvert in tface:
+                uvs.extend( tverts[tvert] )
+        snapshot.uv_layers.append( ( 'UVMap' if channel == 1 else 'UVMap.{0:03d}'.format( channel - 1 ), uvs ) )
+    if geom.cverts and len( geom.cfaces ) == snapshot.polygon_count:
+        colors = array( 'f' )
+        for cface in geom.cfaces:
+            for cvert in cface:
+                colors.extend( geom.cverts[cvert] )
+        snapshot.vertex_colors.append( ( 'Col', colors ) )
+    # Vertex normals are listed per face corner, they are the loop normals
+    if len( geom.loop_normals ) == snapshot.loop_count * 3:
+        snapshot.loop_normal = geom.loop_normals
+    if len( geom.face_normals ) == snapshot.polygon_count * 3:
+        snapshot.polygon_normal = geom.face_normals
+
+    layer = lwo_core.LwoLayer( geom.name, index, ( 0.0, 0.0, 0.0 ), snapshot )
+    layer.surfaces = list( range( len( tags ) ) )
+    return layer
+
+def aseToLwo( source, target, arguments ):
+    # Objects are turned into layers as they are read, their text is not kept
+    layers = []
+    def found( geom, materials ):
+        layers.append( geomLayer( geom, len( layers ), materials ) )
+    materials = readAse( source, found )
+
+    tags = materialTags( materials )[0]
+    surfaces = [materialSurface( material ) for material in tags]
+    options = lwo_core.LwoOptions( idtech = arguments.idtech, scale = arguments.scale )
+    lwo_core.write_lwo( target, lwo_core.generate_tags( [surface.name for surface in surfaces] ), layers, surfaces, options )
+
+#== Command Line ===========================================================
+# input extension -> output extension, converter
+conversions = {
+    '.lwo': ( '.ase', lwoToAse ),
+    '.ase': ( '.lwo', aseToLwo ),
+}
+
+# Next to the source, or in out mirroring the source's folder below root,
+# the start of the pattern that found it
+def targetFilename( source, out, root = os.curdir ):
+    base, extension = os.path.splitext( source )
+    if out:
+        relative = os.path.relpath( os.path.dirname( base ), root )
+        base = os.path.normpath( os.path.join( out, relative, os.path.basename( base ) ) )
+    return base + conversions[extension.lower()][0]
+
+# Jobs that would overwrite an input file or another job's output, as
+# error messages. They are checked before anything is converted.
+def targetConflicts( jobs ):
+    def key( filename ):
+        return os.path.normcase( os.path.abspath( filename ) )
+    sources = set( key( source ) for source, target, arguments in jobs )
+    targets = {}
+    for source, target, arguments in jobs:
+        targets.setdefault( key( target ), [] ).append( source )
+
+    conflicts = []
+    for source, target, arguments in jobs:
+        if key( target ) in sources:
+            conflicts.append( '{0}: {1} is also an input file'.format( source, target ) )
+    for shared in targets.values():
+        if len( shared ) > 1:
+            conflicts.append( ' and '.join( sorted( shared ) ) + ' would be converted to the same file' )
+    return conflicts
+
+# Convert one file, returns an error message or None. The output is written
+# to a temporary file that replaces the target only once it is complete, and
+# any error fails this file alone instead of the whole batch.
+def convertFile( source, target, arguments ):
+    temporary = '{0}.{1}.tmp'.format( target, os.getpid() )
+    try:
+        conversions[os.path.splitext( source )[1].lower()][1]( source, temporary, arguments )
+        os.replace( temporary, target )
+    except Exception as error:
+        if os.path.exists( temporary ):
+            os.remove( temporary )
+        if isinstance( error, ( ConvertError, IOError, ValueError, IndexError, KeyError, struct.error ) ):
+            return '{0}: {1}'.format( source, error )
+        return '{0}: {1}: {2}'.format( source, type( error ).__name__, error )
+    return None
+
+def main( argv = None ):
+    parser = argparse.ArgumentParser( description = 'Convert .lwo files to .ase and .ase files to .lwo without Blender.' )
+    parser.add_argument( 'files', nargs = '+', metavar = 'PATTERN', help = '.lwo and .ase files, ** matches any directories' )
+    parser.add_argument( '--out', help = 'output directory, the folders below the pattern are mirrored in it '
+                                            '(default: next to every input file)' )
+    parser.add_argument( '--scale', type = float, default = 1.0, help = 'scaling factor (default: 1.0)' )
+    parser.add_argument( '--idtech', action = 'store_true', help = 'write idTech compatible .lwo files' )
+    parser.add_argument( '--multi-materials', action = 'store_true',
+                         help = 'keep every LWO layer in one ASE object with multiple materials (UDK)' )
+    parser.add_argument( '--submaterials', action = 'store_true', help = 'one ASE material with submaterials (UDK)' )
+    parser.add_argument( '--no-smoothing', action = 'store_true', help = 'no ASE smoothing groups' )
+    parser.add_argument( '-j', '--jobs', type = int, default = os.cpu_count() or 1,
+                         help = 'files converted at a time (default: one per CPU)' )
+    arguments = parser.parse_args( argv )
+
+    # source -> root of the first pattern that found it
+    roots = {}
+    for pattern in arguments.files:
+        for name in glob.glob( pattern, recursive = True ):
+            if os.path.splitext( name )[1].lower() in conversions:
+                roots.setdefault( name, patternRoot( pattern ) )
+    files = sorted( roots )
+    if not files:
+        print( 'Error: no .lwo or .ase files match ' + ' '.join( arguments.files ) )
+        return 1
+    jobs = [( source, targetFilename( source, arguments.out, roots[source] ), arguments ) for source in files]
+
+    conflicts = targetConflicts( jobs )
+    for conflict in conflicts:
+        print( 'Error: ' + conflict )
+    if conflicts:
+        return 1
+    for directory in set( os.path.dirname( target ) for source, target, options in jobs ):
+        if directory and not os.path.isdir( directory ):
+            os.makedirs( directory )
+
+    errors = None
+    if arguments.jobs > 1 and len( jobs ) > 1:
+        try:
+            with ProcessPoolExecutor( max_workers = arguments.jobs ) as pool:
+                errors = list( pool.map( convertFile, *zip( *jobs ) ) )
+        except ( ImportError, OSError, NotImplementedError, BrokenProcessPool ):
+            errors = None # fall back to converting every file in turn
+    if errors is None:
+        errors = [convertFile( *job ) for job in jobs]
+
+    for ( source, target, options ), error in zip( jobs, errors ):
+        print( 'Error: ' + error if error else source + ' -> ' + target )
+    failed = len( [error for error in errors if error] )
+    print( str( len( files ) - failed ) + ' of ' + str( len( files ) ) + ' files converted' )
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -0,0 +1,892 @@
+# ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.	See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA	 02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+
+"""\
+LightWave (.lwo) chunk encoders that do not depend on bpy.
+
+The exporter extracts every layer into plain arrays (see mesh_snapshot.py)
+and every material into an LwoSurface on Blender's main thread; everything
+in this module only reads those, so it can also run in worker processes.
+
+Install this file next to io_export_lwo.py.
+"""
+
+
+import io, sys, copy, struct
+from array import array
+
+from export_profile import ExportProfile
+
+
+# ===============
+# === Options ===
+# ===============
+class LwoOptions:
+	def __init__(self, idtech = True, subd = False, scale = 1.0, smooth = False, profile = None):
+		self.idtech = idtech
+		self.subd = subd
+		self.scale = scale
+		self.smooth = smooth
+		self.profile = profile if profile is not None else ExportProfile()
+
+# ===========================
+# === Layer Of Plain Data ===
+# ===========================
+class LwoLayer:
+	def __init__(self, name, index, pivot, snap):
+		self.name = name
+		self.index = index
+		self.pivot = pivot				# object location
+		self.snap = snap				# MeshSnapshot of the prepared mesh
+		self.surfaces = None			# TAGS index of every material slot
+		self.vertex_normals = None		# flat "Recalc Vert Normals" addon data
+		self.weight_maps = []			# (name, vertex indices, weights)
+		self.morphs = None				# (name, coordinates) if shape keys
+
+# =============================
+# === Surface Of Plain Data ===
+# =============================
+class LwoSurface:
+	# the defaults are used for tags without a material
+	def __init__(self, name):
+		self.name = name
+		self.default = False			# the built-in default surface
+		self.color = (1.0, 1.0, 1.0)
+		self.diff = 1.0
+		self.lumi = 0.0
+		self.spec = 0.2
+		self.gloss = 0.0
+		self.refl = 0.0
+		self.rblr = 0.0
+		self.rind = 1.0
+		self.tran = 0.0
+		self.tblr = 0.0
+		self.trnl = 0.0
+		self.sman = 0.0					# smoothing angle
+		self.vcol = None				# vertex color map name
+		self.texture_slots = 0			# number of texture slots of the material
+		self.textures = []				# LwoTexture of every image texture
+
+class LwoTexture:
+	def __init__(self, path, uv_layer, invert = False, blend_type = 'MIX'):
+		self.path = path
+		self.uv_layer = uv_layer
+		self.invert = invert
+		self.blend_type = blend_type
+		self.channels = []				# (channel, opacity) in BLOK order
+
+# ============================
+# === Write Whole LWO File ===
+# ============================
+# returns the profile of this file alone, for the exporter to merge, also
+# from worker processes
+def write_lwo(filename, tags, layers, surfaces, options):
+	options = copy.copy(options)
+	options.profile = profile = ExportProfile()
+
+	# the surfaces number the image clips they use
+	clip_paths = []
+	with profile.stage("surfaces"):
+		surfs = [generate_surface(surface, clip_paths, options) for surface in surfaces]
+
+	file = open(filename, "wb")
+	try:
+		form = begin_chunk(file, "FORM")
+		file.write(b"LWO2")
+		write_profiled(file, "TAGS", tags, profile)
+		for layer in layers:
+			write_layer(file, layer, options)
+		for clipid, path in enumerate(clip_paths, 1):
+			write_profiled(file, "CLIP", generate_clip(path, clipid), profile)
+		for surf in surfs:
+			write_profiled(file, "SURF", surf, profile)
+		end_chunk(file, form)
+		profile.addBytes("file", file.tell())
+	finally:
+		file.close()
+	return profile
+
+# ===================================
+# === Write The Chunks Of A Layer ===
+# ===================================
+def write_layer(file, layer, options):
+	# Every chunk goes to the file as soon as it is generated
+	snap = layer.snap
+	profile = options.profile
+	profile.count("objects")
+	profile.count("vertices", snap.vertex_count)
+	profile.count("faces", snap.polygon_count)
+
+	write_profiled(file, "LAYR", generate_layr(layer.name, layer.index, layer.pivot), profile)
+	with profile.stage("vertices"):
+		pnts = generate_pnts(snap, options.scale)
+		bbox = generate_bbox(snap, options.scale)
+	write_profiled(file, "PNTS", pnts, profile)
+	write_profiled(file, "BBOX", bbox, profile)
+	if not(options.idtech):
+		with profile.stage("normals"):
+			vnorms = generate_vnorms(snap, layer.vertex_normals, options.scale)
+		write_profiled(file, "VMAP", vnorms, profile)
+	if snap.vertex_colors:
+		if options.idtech:
+			for vmad in profile.timed("vertex colors", generate_rgba_vc(snap)):  # per vert
+				write_profiled(file, "VMAD", vmad, profile)
+		else:
+			for vmad in profile.timed("vertex colors", generate_rgb_vc(snap)):  # per face
+				write_profiled(file, "VMAD", vmad, profile)
+	with profile.stage("faces"):
+		pols = generate_pols(snap, options.subd)
+	write_profiled(file, "POLS", pols, profile)
+	if not(options.idtech):
+		if layer.vertex_normals is None:
+			with profile.stage("normals"):
+				lnorms = generate_lnorms(snap, options.scale)
+			write_profiled(file, "VMAD", lnorms, profile)
+	with profile.stage("faces"):
+		ptag = generate_ptag(snap, layer.surfaces)
+	write_profiled(file, "PTAG", ptag, profile)
+
+	if snap.uv_layers:
+		for vmad in profile.timed("uvs", generate_vmad_uv(snap)):  # per face
+			write_profiled(file, "VMAD", vmad, profile)
+	
+	if not(options.idtech):
+		if any(crease > 0 for crease in snap.edge_crease):
+			with profile.stage("edge weights"):
+				vmad = generate_vmad_ew(snap)
+			write_profiled(file, "VMAD", vmad, profile)
+
+		for vmap in profile.timed("weight maps", generate_vmap_weight(layer.weight_maps)):
+			write_profiled(file, "VMAP", vmap, profile)
+	
+		if layer.morphs is not None:
+			for vmap in profile.timed("morphs", generate_vmap_morph(snap, layer.morphs)):
+				write_profiled(file, "VMAP", vmap, profile)
+
+# === Generate Null-Terminated String ===
+# =======================================
+def generate_nstring(string):
+	if len(string)%2 == 0:	# even
+		string += "\0\0"
+	else:					# odd
+		string += "\0"
+	return string
+
+# =========================================
+# === Generate Tag Strings (TAGS Chunk) ===
+# =========================================
+def generate_tags(material_names):
+	data = io.BytesIO()
+	if material_names:
+		for mat in material_names:
+			data.write(bytes(generate_nstring(mat), 'UTF-8'))
+		return data.getvalue()
+	else:
+		return bytes(generate_nstring(''), 'UTF-8')
+
+# ===============================
+# === Get Used Material Names ===
+# ===============================
+# built-in surfaces of meshes without materials
+VCOL_NAME = "Per-Face Vertex Colors"
+DEFAULT_NAME = "Blender Default"
+
+# surface names of one mesh from the material name of every slot, None for
+# an empty slot
+def surface_names(slot_names, vertex_colors):
+	if slot_names:
+		return [name for name in slot_names if name]
+	elif vertex_colors:
+		return [VCOL_NAME]
+	else:
+		return [DEFAULT_NAME]
+
+# meshes are (slot names, has vertex colors); returns the index of the mesh
+# owning every surface and the surface names, one surface per material
+def used_surface_names(meshes):
+	owners = []
+	names = []
+	for index, (slot_names, vertex_colors) in enumerate(meshes):
+		for name in surface_names(slot_names, vertex_colors):
+			if name not in names:
+				owners.append(index)
+				names.append(name)
+	return owners, names
+
+# TAGS index of every material slot of a mesh; without slots every polygon
+# has material index 0, which gets the built-in surface
+def slot_surfaces(slot_names, vertex_colors, material_names):
+	if slot_names:
+		return [material_names.index(name) if name else 0 for name in slot_names]
+	return [material_names.index(surface_names(slot_names, vertex_colors)[0])]
+
+# ===================================
+# === Generate Layer (LAYR Chunk) ===
+# ===================================
+def generate_layr(name, idx, pivot):
+	px, py, pz = pivot
+	data = io.BytesIO()
+	data.write(struct.pack(">h", idx))			# layer number
+	data.write(struct.pack(">h", 0))			# flags
+	data.write(struct.pack(">fff", px, pz, py))	# pivot
+	data.write(bytes(generate_nstring(name.replace(" ","_").replace(".", "_")), 'UTF-8'))
+	return data.getvalue()
+
+# ===================================
+# === Generate Verts (PNTS Chunk) ===
+# ===================================
+def generate_pnts(snap, scale):
+	return pack_floats(lwo_vectors(snap.co, scale))
+
+# ============================================
+# === Generate Vertex Normals (VMAP Chunk) ===
+# ============================================
+def generate_vnorms(snap, nolist, scale):
+	data = io.BytesIO()
+	name = generate_nstring("vert_normals")
+	data.write(b"NORM")										# type
+	data.write(struct.pack(">H", 3))						# dimension
+	data.write(bytes(name, 'UTF-8')) 						# name
+	if nolist:
+		normals = nolist	# flat normals from the "Recalc Vert Normals" addon
+	else:
+		normals = snap.vertex_normal
+	normals = lwo_vectors(normals, scale)
+	data.write(pack_records([range(snap.vertex_count)], normals, 3))
+	return data.getvalue()
+
+# ==========================================
+# === Generate Loop Normals (VMAD Chunk) ===
+# ==========================================
+def generate_lnorms(snap, scale):
+	data = io.BytesIO()
+	name = generate_nstring("vert_normals")
+	data.write(b"NORM")										# type
+	data.write(struct.pack(">H", 3))						# dimension
+	data.write(bytes(name, 'UTF-8')) 						# name
+	loops, faces = snap.polygonLoops()
+	verts = gather_loops(snap.loop_vertex_index, loops, 1)
+	normals = gather_loops(snap.loop_normal, loops, 3)
+	normals = lwo_vectors(normals, scale)
+	data.write(pack_records([verts, faces], normals, 3))
+	return data.getvalue()
+
+# ==========================================
+# === Generate Bounding Box (BBOX Chunk) ===
+# ==========================================
+def generate_bbox(snap, scale):
+	data = io.BytesIO()
+	# need to transform verts here
+	if snap.vertex_count:
+		xx = [ x * scale for x in snap.co[0::3] ]
+		yy = [ y * scale for y in snap.co[1::3] ]
+		zz = [ z * scale for z in snap.co[2::3] ]
+	else:
+		xx = yy = zz = [0.0,]
+	
+	data.write(struct.pack(">6f", min(xx), min(zz), min(yy), max(xx), max(zz), max(yy)))
+	return data.getvalue()
+
+# ================================================
+# === Generate RGBA Vertex Colors (VMAD Chunk) ===
+# ================================================
+def generate_rgba_vc(snap):
+	alldata = []
+	loops, faces = snap.polygonLoops()
+	verts = gather_loops(snap.loop_vertex_index, loops, 1)
+	for name, colors in snap.vertex_colors:
+		vcname = generate_nstring(name)
+		data = io.BytesIO()
+		data.write(b"RGBA")										# type
+		data.write(struct.pack(">H", 4))						# dimension
+		data.write(bytes(vcname, 'UTF-8')) # name
+		
+		if len(loops):
+			colors = gather_loops(colors, loops, 3)
+			rgba = [0.5] * (len(loops) * 4)
+			rgba[0::4] = colors[0::3]
+			rgba[1::4] = colors[1::3]
+			rgba[2::4] = colors[2::3]
+			data.write(pack_records([verts, faces], rgba, 4))
+			alldata.append(data.getvalue())
+				
+	return alldata
+
+# ===============================================
+# === Generate RGB Vertex Colors (VMAD Chunk) ===
+# ===============================================
+def generate_rgb_vc(snap):
+	alldata = []
+	loops, faces = snap.polygonLoops()
+	verts = gather_loops(snap.loop_vertex_index, loops, 1)
+	for name, colors in snap.vertex_colors:
+		vcname = generate_nstring(name)
+		data = io.BytesIO()
+		data.write(b"RGB ")										# type
+		data.write(struct.pack(">H", 3))						# dimension
+		data.write(bytes(vcname, 'UTF-8')) # name
+		
+		if len(loops):
+			colors = gather_loops(colors, loops, 3)
+			data.write(pack_records([verts, faces], colors, 3))
+			alldata.append(data.getvalue())
+				
+	return alldata
+
+# ================================================
+# === Generate Per-Face UV Coords (VMAD Chunk) ===
+# ================================================
+def generate_vmad_uv(snap):
+	alldata = []
+	if not snap.uv_layers:
+		return alldata
+	
+	# Previous and next loop of every loop, wrapping around its polygon
+	loops, faces = snap.polygonLoops()
+	prevl = array('i')
+	nextl = array('i')
+	for i in range(snap.polygon_count):
+		start = snap.polygon_loop_start[i]
+		end = start + snap.polygon_loop_total[i]
+		prevl.append(end - 1)
+		prevl.extend(range(start, end - 1))
+		nextl.extend(range(start + 1, end))
+		nextl.append(start)
+	
+	for name, uvs in snap.uv_layers:
+		uvname = generate_nstring(name)
+		data = io.BytesIO()
+		data.write(b"TXUV")										 # type
+		data.write(struct.pack(">H", 2))						 # dimension
+		data.write(bytes(uvname, 'UTF-8')) # name
+
+		# Skip loops whose UV equals both of its neighbours, within one ulp
+		# like mathutils.Vector ==. Masks built from chained map and compress
+		# calls measured slower than this comprehension in CPython, and the
+		# cores cannot count on numpy outside Blender.
+		us = float_ulps(uvs[0::2])
+		vs = float_ulps(uvs[1::2])
+		keep = [k for k, (l, p, n) in enumerate(zip(loops, prevl, nextl))
+				if not (-1 <= us[p] - us[l] <= 1 and -1 <= us[l] - us[n] <= 1 and
+						-1 <= vs[p] - vs[l] <= 1 and -1 <= vs[l] - vs[n] <= 1)]
+		if keep:
+			kept = [loops[k] for k in keep]
+			verts = gather_loops(snap.loop_vertex_index, kept, 1)
+			data.write(pack_records([verts, [faces[k] for k in keep]], gather_loops(uvs, kept, 2), 2))
+			alldata.append(data.getvalue())
+			
+	return alldata
+
+# ==========================================
+# === Generate Edge Weights (VMAD Chunk) ===
+# ==========================================
+def generate_vmad_ew(snap):
+	data = io.BytesIO()
+	data.write(b"WGHT")										 # type
+	data.write(struct.pack(">H", 1))						 # dimension
+	data.write(bytes(generate_nstring("Edge Weight"), 'UTF-8')) # name
+	# Every creased edge is tagged on the vertex that ends it in each of
+	# its polygons, which is the vertex of the next loop
+	loops, faces = snap.polygonLoops()
+	verts = []
+	kept = []
+	weights = []
+	for k, l in enumerate(loops):
+		crease = snap.edge_crease[snap.loop_edge_index[l]]
+		if crease == 0:
+			continue
+		face = faces[k]
+		start = snap.polygon_loop_start[face]
+		nextl = start + (l - start + 1) % snap.polygon_loop_total[face]
+		verts.append(snap.loop_vertex_index[nextl])
+		kept.append(face)
+		weights.append(crease)
+	data.write(pack_records([verts, kept], weights, 1))
+				
+	return data.getvalue()
+
+# ========================================
+# === Generate Endomorphs (VMAP Chunk) ===
+# ========================================
+def generate_vmap_morph(snap, morphs):
+	alldata = []
+	epsilon = 0.000001	# smaller offsets are not written
+	for name, keyco in morphs:
+		emname = generate_nstring(name)
+		data = io.BytesIO()
+		data.write(b"MORF")										 # type
+		data.write(struct.pack(">H", 3))						 # dimension
+		data.write(bytes(emname, 'UTF-8')) # name
+		deltas = [k - c for k, c in zip(keyco, snap.co)]
+		dx = deltas[0::3]
+		dy = deltas[1::3]
+		dz = deltas[2::3]
+		moved = [i for i in range(snap.vertex_count)
+				 if abs(dx[i]) > epsilon or abs(dy[i]) > epsilon or abs(dz[i]) > epsilon]
+		if not moved:
+			continue	# nothing to morph, like the basis
+		offsets = [0.0] * (len(moved) * 3)
+		offsets[0::3] = [dx[i] for i in moved]
+		offsets[1::3] = [dz[i] for i in moved]
+		offsets[2::3] = [dy[i] for i in moved]
+		data.write(pack_records([moved], offsets, 3))
+		alldata.append(data.getvalue())
+				
+	return alldata
+
+# =======================================
+# === Generate Weightmap (VMAP Chunk) ===
+# =======================================
+def generate_vmap_weight(weight_maps):
+	alldata = []
+	for name, verts, weights in weight_maps:
+		vgname = generate_nstring(name)
+		data = io.BytesIO()
+		data.write(b"WGHT")										 # type
+		data.write(struct.pack(">H", 1))						 # dimension
+		data.write(bytes(vgname, 'UTF-8')) # name
+		data.write(pack_records([verts], weights, 1))	# members only
+		alldata.append(data.getvalue())
+				
+	return alldata
+
+# ======================================
+# === Generate Variable-Length Index ===
+# ======================================
+def generate_vx(index):
+	if index < 0xFF00:
+		value = struct.pack(">H", index)				 # 2-byte index
+	else:
+		value = struct.pack(">L", index | 0xFF000000)	 # 4-byte index
+	return value
+
+# ========================================
+# === Generate Variable-Length Indices ===
+# ========================================
+def generate_vx_array(indices):
+	if not len(indices) or max(indices) < 0xFF00:
+		shorts = array('H', indices)				 # all 2-byte indices
+		if sys.byteorder == 'little':
+			shorts.byteswap()
+		return shorts.tobytes()
+	return struct.pack(">" + vx_format(indices), *vx_values(indices))
+
+def vx_format(indices):
+	return "".join(["H" if index < 0xFF00 else "L" for index in indices])
+
+def vx_values(indices):
+	return [index if index < 0xFF00 else index | 0xFF000000 for index in indices]
+
+# ====================================
+# === Reorder Vectors to LightWave ===
+# ====================================
+def lwo_vectors(values, scale = None):
+	# Blender x, y, z becomes LightWave x, z, y
+	vectors = list(values)
+	vectors[1::3] = values[2::3]
+	vectors[2::3] = values[1::3]
+	if scale is not None:
+		vectors = [x * scale for x in vectors]
+	return vectors
+
+# =======================================
+# === Gather Per-Loop Values In Order ===
+# =======================================
+def gather_loops(values, loops, dim):
+	if len(loops) * dim == len(values) and loops == array('i', range(len(loops))):
+		return values	# loops are already stored in polygon order
+	gathered = [0.0] * (len(loops) * dim)
+	for c in range(dim):
+		gathered[c::dim] = [values[l*dim + c] for l in loops]
+	return gathered
+
+# ==========================================
+# === Float32 Values As Ordered Integers ===
+# ==========================================
+# consecutive floats are consecutive integers, so two values are one ulp
+# apart when their integers are 1 apart; -0.0 and 0.0 are neighbours
+def float_ulps(values):
+	bits = array('i', array('f', values).tobytes())
+	return [b if b >= 0 else -(b & 0x7fffffff) - 1 for b in bits]
+
+# ======================================
+# === Pack Big-Endian Float32 Values ===
+# ======================================
+def pack_floats(values):
+	floats = array('f', values)
+	if sys.byteorder == 'little':
+		floats.byteswap()
+	return floats.tobytes()
+
+# ==========================================
+# === Pack Interleaved VMAP/VMAD Records ===
+# ==========================================
+def pack_records(indices, values, dim):
+	# Every record is one VX per index column followed by dim floats
+	count = len(values) // dim
+	if all(not len(column) or max(column) < 0xFF00 for column in indices):
+		# Fixed size records, interleave the columns byte by byte
+		columns = [(generate_vx_array(column), 2) for column in indices]
+		columns.append((pack_floats(values), dim * 4))
+		size = sum(step for column, step in columns)
+		data = bytearray(size * count)
+		offset = 0
+		for column, step in columns:
+			for b in range(step):
+				data[offset + b::size] = column[b::step]
+			offset += step
+		return bytes(data)
+	
+	# Mixed 2- and 4-byte indices, one struct call for the whole chunk
+	stride = len(indices) + dim
+	formats = [vx_format(column) for column in indices]
+	fmt = ">" + "".join(["".join(codes) + "f" * dim for codes in zip(*formats)])
+	args = [None] * (count * stride)
+	for n, column in enumerate(indices):
+		args[n::stride] = vx_values(column)
+	for c in range(dim):
+		args[len(indices) + c::stride] = values[c::dim]
+	return struct.pack(fmt, *args)
+
+# ====================================
+# === Generate Surface Of Any Kind ===
+# ====================================
+def generate_surface(surface, clip_paths, options):
+	if surface.default:
+		return generate_default_surf(surface.name)
+	else:
+		return generate_surf(surface, clip_paths, options)
+
+# ================================================
+# === Generate Surface Definition (SURF Chunk) ===
+# ================================================
+def generate_surf(surface, clip_paths, options):
+	data = io.BytesIO()
+	data.write(bytes(generate_nstring(surface.name), 'UTF-8'))
+
+	R,G,B = surface.color
+	diff = surface.diff
+	lumi = surface.lumi
+	spec = surface.spec
+	gloss = surface.gloss
+	refl = surface.refl
+	rblr = surface.rblr
+	rind = surface.rind
+	tran = surface.tran
+	tblr = surface.tblr
+	trnl = surface.trnl
+	sman = surface.sman
+
+	data.write(b"COLR")
+	data.write(struct.pack(">H", 0))
+
+	data.write(b"COLR")
+	data.write(struct.pack(">H", 14))
+	data.write(struct.pack(">fffH", R, G, B, 0))
+
+	data.write(b"DIFF")
+	data.write(struct.pack(">H", 6))
+	data.write(struct.pack(">fH", diff, 0))
+
+	data.write(b"LUMI")
+	data.write(struct.pack(">H", 6))
+	data.write(struct.pack(">fH", lumi, 0))
+
+	data.write(b"SPEC")
+	data.write(struct.pack(">H", 6))
+	data.write(struct.pack(">fH", spec, 0))
+
+	if not(options.idtech):
+		data.write(b"REFL")
+		data.write(struct.pack(">H", 6))
+		data.write(struct.pack(">fH", refl, 0))
+
+		data.write(b"RBLR")
+		data.write(struct.pack(">H", 6))
+		data.write(struct.pack(">fH", rblr, 0))
+
+		data.write(b"TRAN")
+		data.write(struct.pack(">H", 6))
+		data.write(struct.pack(">fH", tran, 0))
+
+		data.write(b"RIND")
+		data.write(struct.pack(">H", 6))
+		data.write(struct.pack(">fH", rind, 0))
+
+		data.write(b"TBLR")
+		data.write(struct.pack(">H", 6))
+		data.write(struct.pack(">fH", tblr, 0))
+
+		data.write(b"TRNL")
+		data.write(struct.pack(">H", 6))
+		data.write(struct.pack(">fH", trnl, 0))
+
+	data.write(b"GLOS")
+	data.write(struct.pack(">H", 6))
+	data.write(struct.pack(">fH", gloss, 0))
+
+	if surface.vcol is not None:
+		data.write(b"VCOL")
+		data_tmp = io.BytesIO()
+		data_tmp.write(struct.pack(">fH4s", 1.0, 0, b"RGBA"))  # intensity, envelope, type
+		data_tmp.write(bytes(generate_nstring(surface.vcol), 'UTF-8')) # name
+		data.write(struct.pack(">H", len(data_tmp.getvalue())))
+		data.write(data_tmp.getvalue())
+
+	data.write(b"SMAN")
+	data.write(struct.pack(">H", 4))
+	if options.idtech:
+		data.write(struct.pack(">f", sman))
+	elif options.smooth:
+		data.write(struct.pack(">f", sman))
+	else:
+		data.write(struct.pack(">f", 0))
+
+#		data.write(b"SIDE")
+#		data.write(struct.pack(">H", 2))
+#		data.write(struct.pack(">H", 3))
+
+	if not(options.idtech):
+		# Check if the material contains any image maps
+		def make_ord(nbloks, index):
+			i = 8
+			d = 16
+			while i < 128:
+				if i >= nbloks:
+					break;
+				d /= 2
+				i *= 2
+			ordinal  = int(128 + index * d)
+			return ordinal
+
+		for mtex in surface.textures:
+			path = mtex.path
+			if path in clip_paths:
+				clipid = clip_paths.index(path) + 1	# CLIP ids start at 1
+			else:
+				clip_paths.append(path)
+				clipid = len(clip_paths)
+
+			def write_tex_blok(data, channel, opac):
+				data.write(b"BLOK")		# Surface BLOK header
+
+				# IMAP subchunk (image map sub header)
+				data_blok = io.BytesIO()
+				data_blok.write(b"IMAP")
+				data_tmp = io.BytesIO()
+				data_tmp.write(struct.pack(">B", make_ord(surface.texture_slots, clipid)))  # ordinal string
+				data_tmp.write(struct.pack(">B", 0))
+				data_tmp.write(b"CHAN")
+				data_tmp.write(struct.pack(">H", 4))
+				data_tmp.write(bytes(channel, 'UTF-8'))
+				opactype = 0
+				if mtex.blend_type == 'SUBTRACT':
+					opactype = 1
+				elif mtex.blend_type == 'DIFFERENCE':
+					opactype = 2
+				elif mtex.blend_type == 'MULTIPLY':
+					opactype = 3
+				elif mtex.blend_type == 'DIVIDE':
+					opactype = 4
+				elif mtex.blend_type == 'ADD':
+					opactype = 7
+				data_tmp.write(b"OPAC")				  # Hardcoded texture layer opacity
+				data_tmp.write(struct.pack(">H", 8))
+				data_tmp.write(struct.pack(">H", opactype))
+				data_tmp.write(struct.pack(">f", opac))
+				data_tmp.write(struct.pack(">H", 0))
+				data_tmp.write(b"ENAB")
+				data_tmp.write(struct.pack(">HH", 2, 1))  # 1 = texture layer enabled
+				nega = mtex.invert
+				data_tmp.write(b"NEGA")
+				data_tmp.write(struct.pack(">HH", 2, nega))  # Disable negative image (1 = invert RGB values)
+				data_tmp.write(b"AXIS")
+				data_tmp.write(struct.pack(">HH", 2, 1))
+				data_blok.write(struct.pack(">H", len(data_tmp.getvalue())))
+				data_blok.write(data_tmp.getvalue())
+
+				# IMAG subchunk
+				data_blok.write(b"IMAG")
+				data_blok.write(struct.pack(">HH", 2, clipid))
+				data_blok.write(b"PROJ")
+				data_blok.write(struct.pack(">HH", 2, 5)) # UV projection
+
+				data_blok.write(b"VMAP")
+				uvname = generate_nstring(mtex.uv_layer)
+				data_blok.write(struct.pack(">H", len(uvname)))
+				data_blok.write(bytes(uvname, 'UTF-8'))
+
+				data.write(struct.pack(">H", len(data_blok.getvalue())))
+				data.write(data_blok.getvalue())
+
+				return data
+
+			for channel, opac in mtex.channels:
+				write_tex_blok(data, channel, opac)
+
+	return data.getvalue()
+
+# =============================================
+# === Generate Default Surface (SURF Chunk) ===
+# =============================================
+def generate_default_surf(material_name):
+	data = io.BytesIO()
+	data.write(bytes(generate_nstring(material_name), 'UTF-8'))
+
+	data.write(b"COLR")
+	data.write(struct.pack(">H", 14))
+	data.write(struct.pack(">fffH", 0.9, 0.9, 0.9, 0))
+
+	data.write(b"DIFF")
+	data.write(struct.pack(">H", 6))
+	data.write(struct.pack(">fH", 0.8, 0))
+
+	data.write(b"LUMI")
+	data.write(struct.pack(">H", 6))
+	data.write(struct.pack(">fH", 0, 0))
+
+	data.write(b"SPEC")
+	data.write(struct.pack(">H", 6))
+	data.write(struct.pack(">fH", 0.4, 0))
+
+	data.write(b"GLOS")
+	data.write(struct.pack(">H", 6))
+	gloss = 50 / (255/2.0)
+	gloss = round(gloss, 1)
+	data.write(struct.pack(">fH", gloss, 0))
+
+	return data.getvalue()
+
+# ===============================================
+# === Generate CLIP chunk with STIL subchunks ===
+# ===============================================
+def generate_clip(pathname, clipid):
+	data = io.BytesIO()
+	pathname = pathname[0:2] + pathname.replace("\\", "/")[2:]	# Convert to Modo standard path
+	imagename = generate_nstring(pathname)
+	data.write(struct.pack(">L", clipid))						# CLIP sequence/id
+	data.write(b"STIL")											# STIL image
+	data.write(struct.pack(">H", len(imagename)))				# Size of image name
+	data.write(bytes(imagename, 'UTF-8'))
+	return data.getvalue()
+
+# ===================================
+# === Generate Faces (POLS Chunk) ===
+# ===================================
+def generate_pols(snap, subd):
+	data = io.BytesIO()
+	if subd:
+		data.write(b"SUBD") # subpatch polygon type
+	else:
+		data.write(b"FACE") # normal polygon type
+	records = [] # numfaceverts followed by the vertex indices
+	for i in range(snap.polygon_count):
+		start = snap.polygon_loop_start[i]
+		end = start + snap.polygon_loop_total[i]
+		records.append(end - start)
+		records.extend(snap.loop_vertex_index[start:end][::-1])	# Reverse order
+	# Edges not used by any polygon are written as 2 point polygons
+	used = set(snap.loop_edge_index)
+	for e in range(snap.edge_count):
+		if e not in used:
+			records.append(2)
+			records.extend(snap.edge_vertices[e*2:e*2+2])
+	
+	if snap.vertex_count <= 0xFF00 and max(snap.polygon_loop_total, default = 0) < 0xFF00:
+		# counts and indices are all 2 bytes wide
+		data.write(generate_vx_array(records))
+	else:
+		codes = []
+		values = []
+		i = 0
+		while i < len(records):
+			count = records[i]
+			indices = records[i+1:i+1+count]
+			codes.append("H" + vx_format(indices))
+			values.append(count)
+			values.extend(vx_values(indices))
+			i += count + 1
+		data.write(struct.pack(">" + "".join(codes), *values))
+	
+	return data.getvalue()
+
+# =================================================
+# === Generate Polygon Tag Mapping (PTAG Chunk) ===
+# =================================================
+def generate_ptag(snap, surfaces):
+	# surfaces maps every material slot to its index in TAGS
+	data = io.BytesIO()
+	data.write(b"SURF")
+	count = snap.polygon_count
+	if surfaces:
+		tags = [surfaces[index] for index in snap.polygon_material_index]
+	else:
+		tags = [0] * count
+	if count < 0xFF00:
+		# face VX and surface index are both 2 bytes wide
+		records = array('H', [0]) * (count * 2)
+		records[0::2] = array('H', range(count))
+		records[1::2] = array('H', tags)
+		if sys.byteorder == 'little':
+			records.byteswap()
+		data.write(records.tobytes())
+	else:
+		faces = range(count)
+		args = [None] * (count * 2)
+		args[0::2] = vx_values(faces)
+		args[1::2] = tags
+		data.write(struct.pack(">" + "H".join(vx_format(faces)) + "H", *args))
+	return data.getvalue()
+
+# ===================================================
+# ===================
+# === Write Chunk ===
+# ===================
+def write_chunk(file, name, data):
+	file.write(bytes(name, 'UTF-8'))
+	file.write(struct.pack(">L", len(data)))
+	file.write(data)
+
+# ============================================
+# === Write Chunk, Timed And Its Size Kept ===
+# ============================================
+def write_profiled(file, name, data, profile):
+	with profile.stage("writing"):
+		write_chunk(file, name, data)
+	if name in ("VMAP", "VMAD"):
+		name += " " + data[:4].decode('ascii')	# the map type, e.g. TXUV
+	profile.addBytes(name, len(data) + 8)
+
+# ================================================
+# === Begin Chunk With A Size Patched Later On ===
+# ================================================
+def begin_chunk(file, name):
+	start = file.tell()
+	file.write(bytes(name, 'UTF-8'))
+	file.write(struct.pack(">L", 0))	# placeholder size
+	return start
+
+# ====================================
+# === End Chunk And Patch Its Size ===
+# ====================================
+def end_chunk(file, start):
+	end = file.tell()
+	file.seek(start + 4)
+	file.write(struct.pack(">L", end - start - 8))
+	file.seek(end)
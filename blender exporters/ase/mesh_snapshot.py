@@ -0,0 +1,234 @@
+## ***** BEGIN GPL LICENSE BLOCK *****
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+#
+# ***** END GPL LICENCE BLOCK *****
+
+"""
+--  Flat array snapshots of Blender meshes, shared by the ASE and LWO exporters.
+--  Every attribute is read with a single foreach_get call instead of one
+--  Python to RNA round trip per element. Meshes are prepared for export in
+--  memory from the evaluated object, so the scene is never modified.
+
+--  Install this file next to io_export_ase.py and io_export_lwo.py.
+"""
+
+from array import array
+
+from export_profile import ExportProfile
+
+#== Snapshot ===============================================================
+class MeshSnapshot:
+    def __init__( self ):
+        self.vertex_count = 0
+        self.loop_count = 0
+        self.polygon_count = 0
+        self.edge_count = 0
+
+        # per vertex, 3 floats each
+        self.co = array( 'f' )
+        self.vertex_normal = array( 'f' )
+
+        # per loop
+        self.loop_vertex_index = array( 'i' )
+        self.loop_normal = array( 'f' )         # 3 floats each, split normals
+        self.loop_edge_index = array( 'i' )
+
+        # per edge, 2 vertex indices each
+        self.edge_vertices = array( 'i' )
+        self.edge_crease = array( 'f' )
+        self.edge_sharp = array( 'i' )
+
+        # per polygon
+        self.polygon_loop_start = array( 'i' )
+        self.polygon_loop_total = array( 'i' )
+        self.polygon_material_index = array( 'i' )
+        self.polygon_normal = array( 'f' )      # 3 floats each
+
+        # per loop layers as ( name, values ), 2 floats per UV, 3 per color
+        self.uv_layers = []
+        self.vertex_colors = []
+
+    # Vertex indices of a polygon, in loop order
+    def polygonVertices( self, index ):
+        start = self.polygon_loop_start[index]
+        return self.loop_vertex_index[start:start + self.polygon_loop_total[index]]
+
+    # Loop indices in polygon order, with the polygon of every loop
+    def polygonLoops( self ):
+        loops = array( 'i' )
+        faces = array( 'i' )
+        for index in range( self.polygon_count ):
+            start = self.polygon_loop_start[index]
+            total = self.polygon_loop_total[index]
+            loops.extend( range( start, start + total ) )
+            faces.extend( [index] * total )
+        return loops, faces
+
+#== Extraction =============================================================
+def fetch( collection, attribute, typecode, count ):
+    values = array( typecode, [0] ) * count
+    if count:
+        collection.foreach_get( attribute, values )
+    return values
+
+def snapshotMesh( mesh, loop_normals = True ):
+    snapshot = MeshSnapshot()
+    snapshot.vertex_count = len( mesh.vertices )
+    snapshot.loop_count = len( mesh.loops )
+    snapshot.polygon_count = len( mesh.polygons )
+    snapshot.edge_count = len( mesh.edges )
+
+    snapshot.co = fetch( mesh.vertices, 'co', 'f', snapshot.vertex_count * 3 )
+    snapshot.vertex_normal = fetch( mesh.vertices, 'normal', 'f', snapshot.vertex_count * 3 )
+
+    snapshot.loop_vertex_index = fetch( mesh.loops, 'vertex_index', 'i', snapshot.loop_count )
+    snapshot.loop_edge_index = fetch( mesh.loops, 'edge_index', 'i', snapshot.loop_count )
+    if loop_normals:
+        mesh.calc_normals_split()
+        snapshot.loop_normal = fetch( mesh.loops, 'normal', 'f', snapshot.loop_count * 3 )
+
+    snapshot.polygon_loop_start = fetch( mesh.polygons, 'loop_start', 'i', snapshot.polygon_count )
+    snapshot.polygon_loop_total = fetch( mesh.polygons, 'loop_total', 'i', snapshot.polygon_count )
+    snapshot.polygon_material_index = fetch( mesh.polygons, 'material_index', 'i', snapshot.polygon_count )
+    snapshot.polygon_normal = fetch( mesh.polygons, 'normal', 'f', snapshot.polygon_count * 3 )
+
+    snapshot.edge_vertices = fetch( mesh.edges, 'vertices', 'i', snapshot.edge_count * 2 )
+    snapshot.edge_crease = fetch( mesh.edges, 'crease', 'f', snapshot.edge_count )
+    snapshot.edge_sharp = fetch( mesh.edges, 'use_edge_sharp', 'i', snapshot.edge_count )
+
+    for layer in mesh.uv_layers:
+        snapshot.uv_layers.append( ( layer.name, fetch( layer.data, 'uv', 'f', snapshot.loop_count * 2 ) ) )
+    for layer in mesh.vertex_colors:
+        snapshot.vertex_colors.append( ( layer.name, fetch( layer.data, 'color', 'f', snapshot.loop_count * 3 ) ) )
+
+    return snapshot
+
+# Snapshot of plain polygons, for meshes read from files instead of
+# Blender: co holds 3 floats per vertex and every polygon lists its vertex
+# indices. Edges are numbered in order of first use; vertex and loop normals
+# are the average of the adjacent face normals, as for smooth shading.
+def snapshotPolygons( co, polygons ):
+    snapshot = MeshSnapshot()
+    snapshot.co = array( 'f', co )
+    snapshot.vertex_count = len( snapshot.co ) // 3
+    snapshot.polygon_count = len( polygons )
+
+    edges = {}
+    sums = [0.0] * ( snapshot.vertex_count * 3 )
+    for polygon in polygons:
+        snapshot.polygon_loop_start.append( len( snapshot.loop_vertex_index ) )
+        snapshot.polygon_loop_total.append( len( polygon ) )
+        snapshot.loop_vertex_index.extend( polygon )
+
+        # Newell's method, which also holds for polygons that are not flat
+        nx = ny = nz = 0.0
+        for corner, vertex in enumerate( polygon ):
+            following = polygon[( corner + 1 ) % len( polygon )]
+            x0, y0, z0 = snapshot.co[vertex * 3:vertex * 3 + 3]
+            x1, y1, z1 = snapshot.co[following * 3:following * 3 + 3]
+            nx += ( y0 - y1 ) * ( z0 + z1 )
+            ny += ( z0 - z1 ) * ( x0 + x1 )
+            nz += ( x0 - x1 ) * ( y0 + y1 )
+
+            key = ( vertex, following ) if vertex < following else ( following, vertex )
+            edge = edges.get( key )
+            if edge is None:
+                edge = edges[key] = len( edges )
+                snapshot.edge_vertices.extend( key )
+            snapshot.loop_edge_index.append( edge )
+        length = ( nx * nx + ny * ny + nz * nz ) ** 0.5 or 1.0
+        normal = ( nx / length, ny / length, nz / length )
+        snapshot.polygon_normal.extend( normal )
+        for vertex in polygon:
+            for axis in range( 3 ):
+                sums[vertex * 3 + axis] += normal[axis]
+
+    for vertex in range( snapshot.vertex_count ):
+        x, y, z = sums[vertex * 3:vertex * 3 + 3]
+        length = ( x * x + y * y + z * z ) ** 0.5
+        if length:
+            snapshot.vertex_normal.extend( ( x / length, y / length, z / length ) )
+        else:
+            snapshot.vertex_normal.extend( ( 0.0, 0.0, 1.0 ) )
+
+    snapshot.loop_count = len( snapshot.loop_vertex_index )
+    snapshot.edge_count = len( edges )
+    snapshot.edge_crease = array( 'f', [0.0] ) * snapshot.edge_count
+    snapshot.edge_sharp = array( 'i', [0] ) * snapshot.edge_count
+    snapshot.polygon_material_index = array( 'i', [0] ) * snapshot.polygon_count
+    snapshot.loop_normal = array( 'f', [0.0] ) * ( snapshot.loop_count * 3 )
+    for loop, vertex in enumerate( snapshot.loop_vertex_index ):
+        snapshot.loop_normal[loop * 3:loop * 3 + 3] = snapshot.vertex_normal[vertex * 3:vertex * 3 + 3]
+    return snapshot
+
+#== Preparation ============================================================
+# Evaluate an object into a new temporary mesh with the export options
+# applied. The scene is never touched; free the result with
+# bpy.data.meshes.remove when done. Every step is timed into profile.
+def prepareMesh( object, scene, apply_modifiers = True, triangulate = True,
+                 remove_doubles = False, recalc_normals = False,
+                 apply_location = True, apply_rotation = True, apply_scale = True,
+                 shape_keys = False, profile = None ):
+    import bmesh
+
+    if profile is None:
+        profile = ExportProfile()
+
+    if shape_keys and object.data.shape_keys:
+        # Modifiers would drop the shape keys, so keep the raw mesh data
+        with profile.stage( 'duplicate' ):
+            mesh = object.data.copy()
+    else:
+        with profile.stage( 'modifiers' if apply_modifiers else 'duplicate' ):
+            mesh = object.to_mesh( scene, apply_modifiers, 'PREVIEW' )
+
+    if triangulate or remove_doubles or recalc_normals:
+        with profile.stage( 'bmesh' ):
+            bm = bmesh.new()
+            bm.from_mesh( mesh )
+        if remove_doubles:
+            with profile.stage( 'remove doubles' ):
+                bmesh.ops.remove_doubles( bm, verts = bm.verts, dist = 0.0001 )
+        if triangulate:
+            with profile.stage( 'triangulate' ):
+                bmesh.ops.triangulate( bm, faces = bm.faces )
+        if recalc_normals:
+            with profile.stage( 'recalc normals' ):
+                bmesh.ops.recalc_face_normals( bm, faces = bm.faces )
+        with profile.stage( 'bmesh' ):
+            bm.to_mesh( mesh )
+            bm.free()
+
+    with profile.stage( 'transform' ):
+        mesh.transform( transformMatrix( object, apply_location, apply_rotation, apply_scale ), shape_keys = True )
+        mesh.calc_normals()
+    return mesh
+
+# The part of the object's own transformation that gets baked into the mesh
+def transformMatrix( object, location = True, rotation = True, scale = True ):
+    from mathutils import Matrix
+
+    loc, rot, sca = object.matrix_basis.decompose()
+    matrix = Matrix.Identity( 4 )
+    if location:
+        matrix = Matrix.Translation( loc )
+    if rotation:
+        matrix = matrix * rot.to_matrix().to_4x4()
+    if scale:
+        matrix = matrix * Matrix.Scale( sca[0], 4, ( 1.0, 0.0, 0.0 ) )
+        matrix = matrix * Matrix.Scale( sca[1], 4, ( 0.0, 1.0, 0.0 ) )
+        matrix = matrix * Matrix.Scale( sca[2], 4, ( 0.0, 0.0, 1.0 ) )
+    return matrix
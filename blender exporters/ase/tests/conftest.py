@@ -0,0 +1,6 @@
+# The exporter modules are installed side by side rather than as a package,
+# so the tests import them from the folder above
+import os
+import sys
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
@@ -0,0 +1,81 @@
+from array import array
+
+import ase_core
+from mesh_snapshot import snapshotPolygons
+
+# count triangles fanned around vertex 0, neighbours sharing an edge, and
+# loose triangles that touch nothing
+def fanSnapshot( count, loose = 0 ):
+    co = array( 'f', [0.0, 0.0, 0.0] )
+    faces = []
+    for index in range( count + 1 ):
+        co.extend( ( float( index ), 1.0, 0.0 ) )
+    for index in range( count ):
+        faces.append( ( 0, index + 1, index + 2 ) )
+    for index in range( loose ):
+        first = len( co ) // 3
+        co.extend( [10.0 + index, 0.0, 0.0, 11.0 + index, 0.0, 0.0, 10.0 + index, 1.0, 0.0] )
+        faces.append( ( first, first + 1, first + 2 ) )
+    return snapshotPolygons( co, faces )
+
+# A quad split into two triangles along the edge from vertex 0 to 2, with
+# the given edges marked sharp
+def twoFaceSnapshot( sharp_edges ):
+    co = array( 'f', [0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 1, 0] )
+    snapshot = snapshotPolygons( co, [( 0, 1, 2 ), ( 0, 2, 3 )] )
+    for edge in range( snapshot.edge_count ):
+        if tuple( snapshot.edge_vertices[edge * 2:edge * 2 + 2] ) in sharp_edges:
+            snapshot.edge_sharp[edge] = 1
+    return snapshot
+
+#== Smoothing Groups =======================================================
+def test_sharp_edge_splits_islands( capsys ):
+    ids = ase_core.defineSmoothing( 'Quad', twoFaceSnapshot( [( 0, 2 )] ) )
+    assert ids[0] != ids[1]
+    assert '2 smoothing groups found' in capsys.readouterr().out
+
+def test_smooth_edge_merges_faces( capsys ):
+    # sharp outer edges do not separate anything
+    for sharp_edges in ( [], [( 0, 1 ), ( 2, 3 )] ):
+        ids = ase_core.defineSmoothing( 'Quad', twoFaceSnapshot( sharp_edges ) )
+        assert ids[0] == ids[1]
+        assert '1 smoothing groups found' in capsys.readouterr().out
+
+def test_islands_sharing_a_vertex_get_different_ids():
+    # islands 0 to 2 meet at vertex 0, 0 and 2 only there; island 3 is two
+    # loose triangles
+    snapshot = fanSnapshot( 4, loose = 2 )
+    ids = ase_core.compressSmoothing( snapshot, [0, 0, 1, 2, 3, 3], 4 )
+    assert len( set( ids[1:4] ) ) == 3
+    # the loose island reuses an id instead of taking a fourth one
+    assert set( ids ) == set( ids[1:4] )
+
+def test_every_face_of_an_island_gets_its_id():
+    snapshot = fanSnapshot( 6 )
+    ids = ase_core.compressSmoothing( snapshot, [0, 0, 0, 1, 1, 1], 2 )
+    assert ids[0] == ids[1] == ids[2]
+    assert ids[3] == ids[4] == ids[5]
+    assert ids[0] != ids[3]
+
+def test_more_than_32_neighbours_wrap_with_a_warning( capsys ):
+    # 34 islands all meeting at vertex 0 need 34 ids
+    snapshot = fanSnapshot( 34 )
+    ids = ase_core.compressSmoothing( snapshot, list( range( 34 ) ), 34 )
+    assert ids == list( range( 32 ) ) + [32 % 32, 33 % 32]
+    assert 'Warning: 2 smoothing groups could not be kept apart' in capsys.readouterr().out
+
+#== Collision Objects ======================================================
+def test_collision_owner_by_udk_name():
+    renders = ['Crate', 'Crate_Big', 'Barrel']
+    assert ase_core.collisionOwner( 'UCX_Crate_01', renders ) == 'Crate'
+    assert ase_core.collisionOwner( 'UBX_Crate', renders ) == 'Crate'
+    assert ase_core.collisionOwner( 'UCX_Crate.001', renders ) == 'Crate'
+    # The longest render name that matches wins
+    assert ase_core.collisionOwner( 'UCX_Crate_Big_01', renders ) == 'Crate_Big'
+
+def test_collision_without_owner():
+    renders = ['Crate', 'Barrel']
+    assert ase_core.collisionOwner( 'UCX_Box_01', renders ) is None
+    assert ase_core.collisionOwner( 'UCX_Crates_01', renders ) is None
+    assert ase_core.collisionOwner( 'Crate', renders ) is None
+    assert ase_core.collisionOwner( 'collision_Crate', renders ) is None
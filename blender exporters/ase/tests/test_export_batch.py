@@ -0,0 +1,23 @@
+import sys
+
+import lwo_core
+from export_batch import batchName, batchConflicts, openPool
+
+def test_batch_name():
+    assert batchName( 'Crate.001' ) == 'Crate_001'
+
+def test_batch_conflicts():
+    names = ['Barrel', 'Crate.001', 'Crate_001', 'Crate', 'Lamp.a', 'Lamp_a', 'Lamp.a.']
+    assert batchConflicts( names ) == [['Crate.001', 'Crate_001'], ['Lamp.a', 'Lamp_a']]
+    assert batchConflicts( ['Crate', 'Crate.001'] ) == []
+
+def test_pool_runs_the_cores():
+    pool = openPool( sys.executable )
+    assert pool is not None
+    try:
+        assert pool.submit( lwo_core.generate_nstring, 'abc' ).result() == 'abc\0'
+    finally:
+        pool.shutdown()
+
+def test_no_pool_without_python():
+    assert openPool( '' ) is None
@@ -0,0 +1,46 @@
+import os
+
+from export_cache import ExportCache
+
+def storeText( cache, key, digest, text ):
+    with cache.openText( key ) as file:
+        file.write( text )
+    cache.putText( key, digest, pieces = 1 )
+
+def test_text_is_kept_outside_the_sidecar( tmp_path ):
+    path = str( tmp_path / 'scene.ase.cache.json' )
+    cache = ExportCache( path, prune = True )
+    storeText( cache, 'Crate', 'a1', '*GEOMOBJECT { Crate }' )
+    cache.save()
+
+    cache = ExportCache( path, prune = True )
+    entry = cache.getText( 'Crate', 'a1' )
+    assert entry['pieces'] == 1
+    with open( cache.textFile( 'Crate' ), 'r' ) as file:
+        assert file.read() == '*GEOMOBJECT { Crate }'
+    with open( path, 'r' ) as file:
+        assert 'GEOMOBJECT' not in file.read()
+    assert cache.getText( 'Crate', 'b2' ) is None
+
+def test_changed_text_file_is_not_reused( tmp_path ):
+    cache = ExportCache( str( tmp_path / 'scene.ase.cache.json' ) )
+    storeText( cache, 'Crate', 'a1', '*GEOMOBJECT { Crate }' )
+    with open( cache.textFile( 'Crate' ), 'a' ) as file:
+        file.write( ' partial' )
+    assert cache.getText( 'Crate', 'a1' ) is None
+    os.remove( cache.textFile( 'Crate' ) )
+    assert cache.getText( 'Crate', 'a1' ) is None
+
+def test_prune_removes_text_of_unused_entries( tmp_path ):
+    path = str( tmp_path / 'scene.ase.cache.json' )
+    cache = ExportCache( path, prune = True )
+    storeText( cache, 'Crate', 'a1', 'crate' )
+    storeText( cache, 'Barrel', 'b1', 'barrel' )
+    cache.save()
+
+    # the next export only has the crate
+    cache = ExportCache( path, prune = True )
+    assert cache.getText( 'Crate', 'a1' ) is not None
+    cache.save()
+    assert os.path.isfile( cache.textFile( 'Crate' ) )
+    assert not os.path.exists( cache.textFile( 'Barrel' ) )
@@ -0,0 +1,42 @@
+import os
+
+import export_cli
+
+def touch( path ):
+    path.parent.mkdir( parents = True, exist_ok = True )
+    path.write_bytes( b'' )
+    return str( path )
+
+def test_out_mirrors_blend_folders( tmp_path ):
+    a = touch( tmp_path / 'lib' / 'a.blend' )
+    b = touch( tmp_path / 'lib' / 'props' / 'b.blend' )
+    c = touch( tmp_path / 'lib' / 'props' / 'small' / 'c.blend' )
+    out = str( tmp_path / 'out' )
+
+    # b is found again below another root, the first pattern wins
+    patterns = [str( tmp_path / 'lib' / '**' / '*.blend' ), str( tmp_path / 'lib' / 'props' / '*.blend' )]
+    directories, conflicts = export_cli.outputDirectories( patterns, out )
+    assert directories == { a: out,
+                            b: os.path.join( out, 'props' ),
+                            c: os.path.join( out, 'props', 'small' ) }
+    assert conflicts == []
+
+def test_same_name_below_two_roots_conflicts( tmp_path ):
+    x = touch( tmp_path / 'x' / 'level.blend' )
+    y = touch( tmp_path / 'y' / 'level.blend' )
+    touch( tmp_path / 'y' / 'other.blend' )
+    out = str( tmp_path / 'out' )
+
+    patterns = [str( tmp_path / 'x' / '*.blend' ), str( tmp_path / 'y' / '*.blend' )]
+    directories, conflicts = export_cli.outputDirectories( patterns, out )
+    assert directories[x] == directories[y] == out
+    assert conflicts == [sorted( [x, y] )]
+
+def test_conflicts_stop_before_any_blender_runs( tmp_path, capsys ):
+    touch( tmp_path / 'x' / 'level.blend' )
+    touch( tmp_path / 'y' / 'level.blend' )
+    argv = ['--blend', str( tmp_path / 'x' / '*.blend' ), str( tmp_path / 'y' / '*.blend' ),
+            '--out', str( tmp_path / 'out' ), '--blender', str( tmp_path / 'no-blender' )]
+    assert export_cli.runBlenders( argv ) == 1
+    assert 'would be exported to the same file' in capsys.readouterr().out
+    assert not ( tmp_path / 'out' ).exists()
@@ -0,0 +1,112 @@
+# Whole files written by the bpy-free cores for the benchmark meshes,
+# compared with the output committed in tests/data, set up the way the
+# exporters set up the cores. The exporters as they were before the cores
+# (036bf8c), run on the same scenes through a stand-in for bpy, wrote the
+# same .ase files and idTech .lwo files byte for byte. The other .lwo
+# files only differ in their weight map and morph VMAPs: these now leave
+# out vertices without weight or offset, and the base shape key. After an
+# intended format change, regenerate them with:
+#     python tests/test_golden_output.py
+import os
+import sys
+from array import array
+from collections import OrderedDict
+
+import pytest
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+import ase_core
+import lwo_core
+from export_benchmark import cases, gridSnapshot
+
+dataFolder = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'data' )
+goldenSize = 6
+
+#== Output =================================================================
+def caseSnapshot( case ):
+    return gridSnapshot( goldenSize, **cases[case] )
+
+def materialNames( case ):
+    return ['textures/golden/m%d' % index for index in range( cases[case].get( 'materials', 1 ) )]
+
+# The case mesh and a small collision mesh, with a material list of one
+# material per slot, or one material with submaterials
+def writeAseCase( filename, case, submaterials = False ):
+    names = materialNames( case )
+    materials = [ase_core.cMaterialData( name ) for name in names]
+    multi = len( names ) > 1
+    material_list = ase_core.cSubMaterials( materials ) if submaterials else ase_core.cMultiMaterials( materials )
+    preamble = str( ase_core.cHeader() ) + str( ase_core.cScene( case + '.blend' ) ) + str( material_list )
+
+    record = ase_core.cExportObject( 'Golden', caseSnapshot( case ) )
+    record.material_ids = list( range( len( names ) ) )
+    collision = ase_core.cExportObject( 'collision_golden', gridSnapshot( 2 ) )
+    collision.material_ids = [0]
+    collision.material_id = 1 % len( names )   # every object takes the next material
+    options = ase_core.cOptions( scale = 16.0, smoothing_groups = True, allow_multi_mats = multi and not submaterials )
+    ase_core.writeAse( filename, preamble, [record, collision], options )
+
+# The case mesh with a weight map and a morph, a second layer, a textured
+# surface and the built-in default surface
+def writeLwoCase( filename, case, idtech ):
+    snapshot = caseSnapshot( case )
+    layer = lwo_core.LwoLayer( 'Golden', 0, ( 0.5, 0.25, 0.0 ), snapshot )
+    names = materialNames( case )
+    layer.surfaces = list( range( len( names ) ) )
+    half = list( range( 0, snapshot.vertex_count, 2 ) )
+    layer.weight_maps = [( 'Group', half, [0.5] * len( half ) )]
+    moved = array( 'f', snapshot.co )
+    for vertex in half:
+        moved[vertex * 3 + 2] += 0.1
+    layer.morphs = [( 'Key 1', moved )]
+    second = lwo_core.LwoLayer( 'Small', 1, ( 0.0, 0.0, 0.0 ), gridSnapshot( 2 ) )
+    second.surfaces = [len( names )]
+
+    surfaces = [lwo_core.LwoSurface( name ) for name in names]
+    for surface in surfaces:
+        surface.sman = 0.5                       # the smoothing angle of the mesh
+    surfaces[0].texture_slots = 1
+    texture = lwo_core.LwoTexture( names[0] + '.tga', 'UVMap' )
+    texture.channels = [( 'COLR', 1.0 )]
+    surfaces[0].textures = [texture]
+    if snapshot.vertex_colors:
+        surfaces[0].vcol = 'Col'
+    default = lwo_core.LwoSurface( 'Default' )
+    default.default = True
+    surfaces.append( default )
+
+    tags = lwo_core.generate_tags( [surface.name for surface in surfaces] )
+    lwo_core.write_lwo( filename, tags, [layer, second], surfaces, lwo_core.LwoOptions( idtech = idtech, scale = 2.0 ) )
+
+# golden file name -> function writing it to a given file name
+def goldenOutputs():
+    outputs = OrderedDict()
+    for case in sorted( cases ):
+        outputs[case + '.ase'] = lambda filename, case = case: writeAseCase( filename, case )
+        outputs[case + '.lwo'] = lambda filename, case = case: writeLwoCase( filename, case, False )
+        outputs[case + '.idtech.lwo'] = lambda filename, case = case: writeLwoCase( filename, case, True )
+    outputs['multi_material.submaterials.ase'] = lambda filename: writeAseCase( filename, 'multi_material', True )
+    return outputs
+
+def readOutput( filename ):
+    # .ase files are text, written with the platform's line endings
+    if filename.endswith( '.ase' ):
+        with open( filename, 'r' ) as file:
+            return file.read()
+    with open( filename, 'rb' ) as file:
+        return file.read()
+
+#== Tests ==================================================================
+@pytest.mark.parametrize( 'name', list( goldenOutputs() ) )
+def test_output_matches_golden_file( name, tmp_path ):
+    filename = str( tmp_path / name )
+    goldenOutputs()[name]( filename )
+    assert readOutput( filename ) == readOutput( os.path.join( dataFolder, name ) )
+
+if __name__ == '__main__':
+    if not os.path.isdir( dataFolder ):
+        os.makedirs( dataFolder )
+    for name, write in goldenOutputs().items():
+        write( os.path.join( dataFolder, name ) )
+        print( 'Wrote ' + os.path.join( dataFolder, name ) )
@@ -0,0 +1,80 @@
+import os
+
+import ase_core
+import lwo_ase_convert
+from export_benchmark import gridSnapshot
+
+# An ASE file as the ASE exporter writes it, without a material list
+def writeAse( filename, size = 3 ):
+    record = ase_core.cExportObject( 'Grid', gridSnapshot( size ) )
+    preamble = str( ase_core.cHeader() ) + str( ase_core.cScene( 'grid.blend' ) )
+    ase_core.writeAse( filename, preamble, [record], ase_core.cOptions() )
+
+def temporaryFiles( folder ):
+    return [name for name in os.listdir( folder ) if name.endswith( '.tmp' )]
+
+def test_ase_without_materials( tmp_path ):
+    source = str( tmp_path / 'grid.ase' )
+    writeAse( source )
+    out = str( tmp_path / 'out' )
+
+    assert lwo_ase_convert.main( [source, '--out', out, '--idtech'] ) == 0
+    tags, surfaces, layers = lwo_ase_convert.readLwo( os.path.join( out, 'grid.lwo' ) )
+    assert tags == ['']
+    assert len( layers ) == 1
+    assert len( layers[0].co ) == 16 * 3
+    assert len( layers[0].polygons ) == 18
+
+def test_truncated_file_fails_alone( tmp_path ):
+    writeAse( str( tmp_path / 'good.ase' ) )
+    ( tmp_path / 'bad.lwo' ).write_bytes( b'FORM\0\0\0\x20LWO2PNTS\0\0\xff\xff' )
+
+    assert lwo_ase_convert.main( [str( tmp_path / '*.*' ), '-j', '1'] ) == 1
+    assert os.path.exists( str( tmp_path / 'good.lwo' ) )
+    assert not os.path.exists( str( tmp_path / 'bad.ase' ) )
+    assert not temporaryFiles( str( tmp_path ) )
+
+def test_unexpected_error_leaves_no_output( tmp_path, monkeypatch ):
+    def failing( source, target, arguments ):
+        with open( target, 'w' ) as file:
+            file.write( 'partial' )
+        raise TypeError( 'broken converter' )
+    monkeypatch.setitem( lwo_ase_convert.conversions, '.lwo', ( '.ase', failing ) )
+    writeAse( str( tmp_path / 'good.ase' ) )
+    ( tmp_path / 'bad.lwo' ).write_bytes( b'' )
+
+    assert lwo_ase_convert.main( [str( tmp_path / '*.*' ), '-j', '1'] ) == 1
+    assert os.path.exists( str( tmp_path / 'good.lwo' ) )
+    assert not os.path.exists( str( tmp_path / 'bad.ase' ) )
+    assert not temporaryFiles( str( tmp_path ) )
+
+def test_input_is_never_overwritten( tmp_path ):
+    writeAse( str( tmp_path / 'model.ase' ) )
+    assert lwo_ase_convert.main( [str( tmp_path / 'model.ase' )] ) == 0
+    before = dict( ( name, ( tmp_path / name ).read_bytes() ) for name in ( 'model.ase', 'model.lwo' ) )
+
+    # model.lwo -> model.ase and model.ase -> model.lwo would replace each other
+    assert lwo_ase_convert.main( [str( tmp_path / '*.*' ), '-j', '1'] ) == 1
+    for name, data in before.items():
+        assert ( tmp_path / name ).read_bytes() == data
+
+def test_out_mirrors_folders( tmp_path ):
+    for folder in ( 'a', 'b' ):
+        ( tmp_path / folder ).mkdir()
+        writeAse( str( tmp_path / folder / 'package.ase' ) )
+    out = tmp_path / 'out'
+
+    assert lwo_ase_convert.main( [str( tmp_path / '**' / 'package.ase' ), '--out', str( out ), '-j', '1'] ) == 0
+    assert ( out / 'a' / 'package.lwo' ).exists()
+    assert ( out / 'b' / 'package.lwo' ).exists()
+
+def test_shared_target_is_rejected( tmp_path ):
+    for folder in ( 'a', 'b' ):
+        ( tmp_path / folder ).mkdir()
+        writeAse( str( tmp_path / folder / 'package.ase' ) )
+    out = tmp_path / 'out'
+
+    # Each pattern starts at its own folder, so both map to out/package.lwo
+    patterns = [str( tmp_path / folder / '*.ase' ) for folder in ( 'a', 'b' )]
+    assert lwo_ase_convert.main( patterns + ['--out', str( out ), '-j', '1'] ) == 1
+    assert not out.exists()
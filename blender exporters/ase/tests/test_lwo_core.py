@@ -0,0 +1,241 @@
+import io
+import struct
+from array import array
+
+import lwo_core
+from export_benchmark import gridSnapshot
+from mesh_snapshot import snapshotPolygons
+
+#== Baseline Generators ====================================================
+# mathutils.Vector == of Blender 2.79, EXPP_VectorsAreEqual with one ulp,
+# ported from its C code
+def vectorsAreEqual( a, b ):
+    for x, y in zip( a, b ):
+        x, y = struct.unpack( '<2i', struct.pack( '<2f', x, y ) )
+        test = -1 if ( x ^ y ) < 0 else 0
+        diff = ( ( x ^ ( test & 0x7fffffff ) ) - y + 2 ** 31 ) % 2 ** 32 - 2 ** 31
+        if 1 + diff < 0 or 1 - diff < 0:
+            return False
+    return True
+
+# generate_vmad_uv as it was before the snapshots, walking every loop of
+# every polygon, to check the fast version writes the same bytes
+def baselineVmadUv( snapshot ):
+    alldata = []
+    for name, uvs in snapshot.uv_layers:
+        data = io.BytesIO()
+        data.write( b'TXUV' )
+        data.write( struct.pack( '>H', 2 ) )
+        data.write( bytes( lwo_core.generate_nstring( name ), 'UTF-8' ) )
+
+        found = False
+        for i in range( snapshot.polygon_count ):
+            start = snapshot.polygon_loop_start[i]
+            loop_indices = list( range( start, start + snapshot.polygon_loop_total[i] ) )
+            for loop in loop_indices:
+                searchl = loop_indices * 2
+                pos = searchl.index( loop )
+                prevl = searchl[pos - 1]
+                nextl = searchl[pos + 1]
+                youv = ( uvs[loop * 2], uvs[loop * 2 + 1] )
+                if vectorsAreEqual( uvs[prevl * 2:prevl * 2 + 2], youv ) and \
+                   vectorsAreEqual( youv, uvs[nextl * 2:nextl * 2 + 2] ):
+                    continue
+                data.write( lwo_core.generate_vx( snapshot.loop_vertex_index[loop] ) )
+                data.write( lwo_core.generate_vx( i ) )
+                data.write( struct.pack( '>ff', youv[0], youv[1] ) )
+                found = True
+        if found:
+            alldata.append( data.getvalue() )
+    return alldata
+
+# Every third polygon gets one UV on all of its loops, which the VMAD skips
+def collapseUVs( snapshot ):
+    for name, uvs in snapshot.uv_layers:
+        for polygon in range( 0, snapshot.polygon_count, 3 ):
+            start = snapshot.polygon_loop_start[polygon]
+            for loop in range( start, start + snapshot.polygon_loop_total[polygon] ):
+                uvs[loop * 2:loop * 2 + 2] = array( 'f', ( 0.25, 0.75 ) )
+    return snapshot
+
+# A quad with one UV on all of its loops, a pentagon whose loops equal one
+# neighbour or whose neighbours equal each other, and a triangle whose loops
+# only share U, none of which are skipped
+def mixedSnapshot():
+    co = array( 'f', [0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 1, 0, 2, 0, 0, 2, 1, 0, 1.5, 2, 0] )
+    snapshot = snapshotPolygons( co, [( 0, 1, 2, 3 ), ( 1, 4, 5, 6, 2 ), ( 0, 4, 6 )] )
+    uvs = array( 'f', [0.5, 0.5] * 4 +
+                      [0.1, 0.1, 0.1, 0.1, 0.9, 0.9, 0.3, 0.9, 0.9, 0.9] +
+                      [0.2, 0.1, 0.2, 0.2, 0.2, 0.3] )
+    snapshot.uv_layers.append( ( 'UVMap', uvs ) )
+    return snapshot
+
+# The float32 steps ulps above a positive value
+def ulpsAbove( value, steps ):
+    bits = struct.unpack( '<i', struct.pack( '<f', value ) )[0]
+    return struct.unpack( '<f', struct.pack( '<i', bits + steps ) )[0]
+
+# Quads whose loops alternate between the U values of a pair
+def alternatingSnapshot( pairs ):
+    co = array( 'f', [0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 1, 0] )
+    snapshot = snapshotPolygons( co, [( 0, 1, 2, 3 )] * len( pairs ) )
+    uvs = array( 'f' )
+    for first, second in pairs:
+        uvs.extend( [first, 0.5, second, 0.5] * 2 )
+    snapshot.uv_layers.append( ( 'UVMap', uvs ) )
+    return snapshot
+
+#== VMAD TXUV ==============================================================
+def test_vmad_uv_matches_baseline():
+    for snapshot in ( collapseUVs( gridSnapshot( 6, uv_layers = 2 ) ), mixedSnapshot() ):
+        assert lwo_core.generate_vmad_uv( snapshot ) == baselineVmadUv( snapshot )
+
+def test_vmad_uv_matches_baseline_with_long_indices():
+    # More than 0xFF00 vertices, so some VX indices take four bytes
+    snapshot = collapseUVs( gridSnapshot( 256 ) )
+    assert snapshot.vertex_count > 0xFF00
+    assert lwo_core.generate_vmad_uv( snapshot ) == baselineVmadUv( snapshot )
+
+def test_vmad_uv_skips_collapsed_polygons():
+    snapshot = mixedSnapshot()
+    chunk = lwo_core.generate_vmad_uv( snapshot )[0]
+    header = len( b'TXUV' ) + 2 + len( lwo_core.generate_nstring( 'UVMap' ) )
+    # Only the quad collapses to one UV
+    assert ( len( chunk ) - header ) // 12 == 5 + 3
+
+def test_vmad_uv_skips_uvs_one_ulp_apart():
+    # Vector == takes one ulp and -0.0 as equal, two ulps as different
+    snapshot = alternatingSnapshot( [( 0.5, ulpsAbove( 0.5, 1 ) ), ( 0.0, -0.0 ),
+                                     ( 0.5, ulpsAbove( 0.5, 2 ) )] )
+    chunk = lwo_core.generate_vmad_uv( snapshot )[0]
+    header = len( b'TXUV' ) + 2 + len( lwo_core.generate_nstring( 'UVMap' ) )
+    assert ( len( chunk ) - header ) // 12 == 4
+    assert chunk == baselineVmadUv( snapshot )[0]
+
+#== Surfaces ===============================================================
+def texturedSurface( name, path ):
+    surface = lwo_core.LwoSurface( name )
+    surface.texture_slots = 1
+    texture = lwo_core.LwoTexture( path, 'UVMap' )
+    texture.channels = [( 'COLR', 1.0 )]
+    surface.textures = [texture]
+    return surface
+
+# Clip id of the image of every texture BLOK in a SURF chunk
+def imageClipIds( surf ):
+    ids = []
+    offset = surf.find( b'IMAG\0\x02' )
+    while offset >= 0:
+        ids.append( struct.unpack_from( '>H', surf, offset + 6 )[0] )
+        offset = surf.find( b'IMAG\0\x02', offset + 1 )
+    return ids
+
+def test_surfaces_sharing_an_image_share_its_clip( tmp_path ):
+    import lwo_ase_convert
+
+    surfaces = [texturedSurface( 'a', '//tex.tga' ), texturedSurface( 'b', '//tex.tga' ),
+                texturedSurface( 'c', '//other.tga' )]
+    filename = str( tmp_path / 'clips.lwo' )
+    layer = lwo_core.LwoLayer( 'Grid', 0, ( 0.0, 0.0, 0.0 ), gridSnapshot( 2 ) )
+    layer.surfaces = [0, 1, 2]
+    lwo_core.write_lwo( filename, lwo_core.generate_tags( ['a', 'b', 'c'] ), [layer], surfaces,
+                        lwo_core.LwoOptions( idtech = False ) )
+
+    with open( filename, 'rb' ) as file:
+        chunks = list( lwo_ase_convert.lwoChunks( file ) )
+    clips = [struct.unpack_from( '>L', data, 0 )[0] for name, data in chunks if name == b'CLIP']
+    images = [imageClipIds( data ) for name, data in chunks if name == b'SURF']
+    assert clips == [1, 2]
+    assert images == [[1], [1], [2]]
+
+#== Materials ==============================================================
+# Surface index of every polygon in a PTAG chunk, all grids < 0xFF00 faces
+def polygonTags( ptag ):
+    return list( struct.unpack( '>%dH' % ( ( len( ptag ) - 4 ) // 2 ), ptag[4:] ) )[1::2]
+
+def test_meshes_without_materials_get_builtin_surfaces( tmp_path ):
+    import lwo_ase_convert
+
+    # one mesh with an empty slot, one without materials, one with only
+    # vertex colors
+    meshes = [( ['a', None, 'b'], False ), ( [], False ), ( [], True )]
+    owners, names = lwo_core.used_surface_names( meshes )
+    assert owners == [0, 0, 1, 2]
+    assert names == ['a', 'b', lwo_core.DEFAULT_NAME, lwo_core.VCOL_NAME]
+
+    layers = []
+    for index, ( slot_names, vertex_colors ) in enumerate( meshes ):
+        layer = lwo_core.LwoLayer( 'Mesh%d' % index, index, ( 0.0, 0.0, 0.0 ), gridSnapshot( 1 ) )
+        layer.surfaces = lwo_core.slot_surfaces( slot_names, vertex_colors, names )
+        layers.append( layer )
+    assert [layer.surfaces for layer in layers] == [[0, 0, 1], [2], [3]]
+
+    surfaces = [lwo_core.LwoSurface( name ) for name in names]
+    surfaces[2].default = True
+    filename = str( tmp_path / 'plain.lwo' )
+    lwo_core.write_lwo( filename, lwo_core.generate_tags( names ), layers, surfaces, lwo_core.LwoOptions() )
+    with open( filename, 'rb' ) as file:
+        ptags = [polygonTags( data ) for name, data in lwo_ase_convert.lwoChunks( file ) if name == b'PTAG']
+    assert ptags == [[0, 0], [2, 2], [3, 3]]
+
+#== Morphs =================================================================
+# vertex -> ( x, z, y ) offset of the records of a VMAP chunk, all grids
+# < 0xFF00 vertices
+def morphOffsets( vmap, name ):
+    header = len( b'MORF' ) + 2 + len( lwo_core.generate_nstring( name ) )
+    records = vmap[header:]
+    return dict( ( struct.unpack_from( '>H', records, offset )[0], struct.unpack_from( '>3f', records, offset + 2 ) )
+                 for offset in range( 0, len( records ), 14 ) )
+
+def test_morph_writes_moved_vertices_only():
+    snapshot = gridSnapshot( 2 )
+    keyco = array( 'f', snapshot.co )
+    keyco[0 * 3 + 0] += 0.5          # x of vertex 0
+    keyco[1 * 3 + 1] += 0.0000005    # below the epsilon on every axis
+    keyco[1 * 3 + 2] -= 0.0000005
+    keyco[2 * 3 + 2] += 0.25         # z of vertex 2, written before y
+    keyco[3 * 3 + 1] += 0.0000025    # just above the epsilon
+    vmaps = lwo_core.generate_vmap_morph( snapshot, [( 'Key 1', keyco )] )
+    assert len( vmaps ) == 1
+    offsets = morphOffsets( vmaps[0], 'Key 1' )
+    assert sorted( offsets ) == [0, 2, 3]
+    assert offsets[0] == ( 0.5, 0.0, 0.0 )
+    assert offsets[2] == ( 0.0, 0.25, 0.0 )
+    assert offsets[3][2] > 0.000001
+
+def test_morph_without_offsets_is_not_written():
+    snapshot = gridSnapshot( 2 )
+    moved = array( 'f', snapshot.co )
+    moved[0] += 1.0
+    morphs = [( 'Basis', array( 'f', snapshot.co ) ), ( 'Key 1', moved ), ( 'Tiny', array( 'f', snapshot.co ) )]
+    morphs[2][1][4] += 0.0000001
+    vmaps = lwo_core.generate_vmap_morph( snapshot, morphs )
+    assert [vmap[6:6 + len( 'Key 1' )] for vmap in vmaps] == [b'Key 1']
+
+#== Weight Maps ============================================================
+# ( vertex, weight ) records of a WGHT VMAP, with 2 or 4 byte VX indices
+def weightRecords( vmap, name ):
+    offset = len( b'WGHT' ) + 2 + len( lwo_core.generate_nstring( name ) )
+    records = []
+    while offset < len( vmap ):
+        if vmap[offset] == 0xFF:
+            vertex = struct.unpack_from( '>L', vmap, offset )[0] & 0x00FFFFFF
+            offset += 4
+        else:
+            vertex = struct.unpack_from( '>H', vmap, offset )[0]
+            offset += 2
+        records.append( ( vertex, struct.unpack_from( '>f', vmap, offset )[0] ) )
+        offset += 4
+    return records
+
+def test_weight_maps_write_members_only():
+    weight_maps = [( 'Arm', [1, 4, 0x10000], [0.5, 1.0, 0.25] ),
+                   ( 'Empty', [], [] ),
+                   ( 'Leg', [2], [0.75] )]
+    vmaps = lwo_core.generate_vmap_weight( weight_maps )
+    # every group gets its map, also one without members
+    assert len( vmaps ) == 3
+    assert weightRecords( vmaps[0], 'Arm' ) == [( 1, 0.5 ), ( 4, 1.0 ), ( 0x10000, 0.25 )]
+    assert weightRecords( vmaps[1], 'Empty' ) == []
+    assert vmaps[1] == b'WGHT' + struct.pack( '>H', 1 ) + bytes( lwo_core.generate_nstring( 'Empty' ), 'UTF-8' )
+    assert weightRecords( vmaps[2], 'Leg' ) == [( 2, 0.75 )]